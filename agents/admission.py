@@ -0,0 +1,309 @@
+"""
+Admission control for pipeline runs: a cap on concurrent runs, a bounded
+per-client fair queue, and load shedding.
+
+Without it a traffic spike starts every run at once, and all of them slow
+down together until their LLM calls time out. Here a run needs one of
+ADMISSION_MAX_IN_FLIGHT slots. When none is free the request waits in a
+queue. The queue is served round-robin across clients, so one client
+sending a burst doesn't push everyone else back. A finished run hands its
+slot straight to the next ticket. The queue holds at most ADMISSION_MAX_QUEUE
+runs, and at most ADMISSION_MAX_QUEUED_PER_CLIENT from one client. Past that
+the request is shed at once: run_stream answers 503 with a Retry-After
+estimated from recent run times.
+
+A queued run streams {"type": "queued", "data": {"position", "queue_depth"}}
+whenever its position changes (checked every ADMISSION_POLL_S), and an
+"error" event if it is still queued after ADMISSION_MAX_WAIT_S. Every route
+that runs the graph is gated: run_stream, resume_stream (when the session
+still has nodes to run), regen_stream, and each profile of a batch (call()). In-flight
+runs, queue depth and queue wait are exported as metrics and in /health.
+"""
+
+from asyncio import TimeoutError as AsyncTimeoutError, get_running_loop, shield, wait_for
+from collections import deque
+from math import ceil
+from threading import Event, Lock
+from time import monotonic
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+
+from agents.config import (
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_MAX_QUEUED_PER_CLIENT,
+    ADMISSION_MAX_WAIT_S,
+    ADMISSION_POLL_S,
+)
+from agents.telemetry import record_admission, record_admission_load, record_admission_wait
+
+T = TypeVar("T")
+
+
+class Ticket:
+    """
+    One run's place: "queued", then "admitted" (holding a slot), then "done".
+    """
+
+    __slots__ = ("client", "state", "enqueued_at", "admitted_at", "started_at", "_event", "_loop", "_future")
+
+    def __init__(self, client: str, state: str) -> None:
+        self.client = client
+        self.state = state
+        self.enqueued_at = monotonic()
+        self.admitted_at = self.enqueued_at if state == "admitted" else None
+        # When its run started; a ticket closed before that ran nothing.
+        self.started_at: float | None = None
+        self._event: Event | None = None
+        self._loop = None
+        self._future = None
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        max_queued_per_client: int = ADMISSION_MAX_QUEUED_PER_CLIENT,
+        max_wait_s: float = ADMISSION_MAX_WAIT_S,
+        poll_s: float = ADMISSION_POLL_S,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queued_per_client = max_queued_per_client
+        self.max_wait_s = max_wait_s
+        self.poll_s = poll_s
+
+        self.in_flight = 0
+        # Waiting tickets per client; dict order is the round-robin order.
+        self._queues: dict[str, deque[Ticket]] = {}
+        self._queued = 0
+        self._lock = Lock()
+        self._run_s: deque[float] = deque(maxlen=200)
+        self._wait_ms: deque[float] = deque(maxlen=500)
+        self._counters = {"admitted": 0, "queued": 0, "shed": 0, "timed_out": 0}
+
+    # --- tickets -----------------------------------------------------------
+
+    def enter(self, client: str, *, asynchronous: bool = False) -> Ticket | None:
+        """
+        A ticket holding a slot, or queued for one; None when the request is
+        shed (the queue, or the client's share of it, is full).
+        """
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._queued:
+                self.in_flight += 1
+                ticket, outcome = Ticket(client, "admitted"), "admitted"
+            else:
+                queue = self._queues.get(client)
+                if self._queued >= self.max_queue or (
+                        queue is not None and len(queue) >= self.max_queued_per_client):
+                    ticket, outcome = None, "shed"
+                else:
+                    ticket, outcome = Ticket(client, "queued"), "queued"
+                    if asynchronous:
+                        ticket._loop = get_running_loop()
+                        ticket._future = ticket._loop.create_future()
+                    else:
+                        ticket._event = Event()
+                    if queue is None:
+                        queue = self._queues[client] = deque()
+                    queue.append(ticket)
+                    self._queued += 1
+            self._counters[outcome] += 1
+            in_flight, queued = self.in_flight, self._queued
+        record_admission(outcome)
+        record_admission_load(in_flight, queued)
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """
+        1-based place of a queued ticket in the round-robin order; 0 once admitted.
+        """
+        with self._lock:
+            if ticket.state != "queued":
+                return 0
+            queue = self._queues[ticket.client]
+            k = queue.index(ticket)
+            ahead = 0
+            before = True
+            for q in self._queues.values():
+                if q is queue:
+                    before = False
+                # Each round serves one ticket per client, in dict order.
+                ahead += min(len(q), k) + (1 if before and len(q) > k else 0)
+            return ahead + 1
+
+    def close(self, ticket: Ticket) -> None:
+        """
+        Leaves the queue, or frees the slot for the next ticket. Idempotent.
+        """
+        handed = None
+        with self._lock:
+            if ticket.state == "queued":
+                self._unqueue(ticket)
+            elif ticket.state == "admitted":
+                if ticket.started_at is not None:
+                    self._run_s.append(monotonic() - ticket.started_at)
+                handed = self._next()
+                if handed is None:
+                    self.in_flight -= 1
+            ticket.state = "done"
+            in_flight, queued = self.in_flight, self._queued
+        if handed is not None:
+            self._wake(handed)
+        record_admission_load(in_flight, queued)
+
+    def _expire(self, ticket: Ticket) -> bool:
+        """
+        Drops a ticket that is still queued; False if it was admitted meanwhile.
+        """
+        with self._lock:
+            if ticket.state != "queued":
+                return False
+            self._unqueue(ticket)
+            ticket.state = "done"
+            self._counters["timed_out"] += 1
+            in_flight, queued = self.in_flight, self._queued
+        record_admission("timed_out")
+        record_admission_load(in_flight, queued)
+        return True
+
+    def _unqueue(self, ticket: Ticket) -> None:
+        queue = self._queues[ticket.client]
+        queue.remove(ticket)
+        if not queue:
+            del self._queues[ticket.client]
+        self._queued -= 1
+
+    def _next(self) -> Ticket | None:
+        # Caller holds the lock. The first client in order is served and
+        # moves to the back if it has more waiting.
+        if not self._queues:
+            return None
+        client = next(iter(self._queues))
+        queue = self._queues.pop(client)
+        ticket = queue.popleft()
+        if queue:
+            self._queues[client] = queue
+        self._queued -= 1
+        ticket.state = "admitted"
+        ticket.admitted_at = monotonic()
+        self._wait_ms.append((ticket.admitted_at - ticket.enqueued_at) * 1000)
+        return ticket
+
+    def _wake(self, ticket: Ticket) -> None:
+        record_admission_wait(ticket.admitted_at - ticket.enqueued_at)
+        if ticket._event is not None:
+            ticket._event.set()
+        else:
+            ticket._loop.call_soon_threadsafe(
+                lambda: ticket._future.done() or ticket._future.set_result(None))
+
+    def retry_after_s(self) -> int:
+        """
+        Seconds until the queue has likely drained a slot's worth, for Retry-After.
+        """
+        with self._lock:
+            runs = list(self._run_s)
+            queued = self._queued
+        mean_s = sum(runs) / len(runs) if runs else 1.0
+        return max(1, min(60, ceil(mean_s * (queued + 1) / max(1, self.max_in_flight))))
+
+    # --- streaming ---------------------------------------------------------
+
+    def _queued_event(self, position: int) -> dict:
+        return {"type": "queued", "data": {"position": position, "queue_depth": self._queued}}
+
+    def _timeout_event(self) -> dict:
+        return {"type": "error", "error": "QUEUE_TIMEOUT",
+                "data": {"message": "The server is busy; try again shortly.",
+                         "retry_after_s": self.retry_after_s()}}
+
+    def events(self, ticket: Ticket, make_events: Callable[[], Iterator[dict]]) -> Iterator[dict]:
+        """
+        "queued" events until the ticket holds a slot, then make_events()'s
+        events; the slot is freed when they end (or the stream is closed).
+        """
+        try:
+            deadline = ticket.enqueued_at + self.max_wait_s
+            last = None
+            while ticket.state == "queued":
+                position = self.position(ticket)
+                if position and position != last:
+                    last = position
+                    yield self._queued_event(position)
+                remaining = deadline - monotonic()
+                if remaining <= 0 and self._expire(ticket):
+                    yield self._timeout_event()
+                    return
+                ticket._event.wait(max(0.0, min(self.poll_s, remaining)))
+            ticket.started_at = monotonic()
+            yield from make_events()
+        finally:
+            self.close(ticket)
+
+    async def aevents(self, ticket: Ticket,
+                      make_events: Callable[[], AsyncIterator[dict]]) -> AsyncIterator[dict]:
+        """
+        Async variant of events(), for tickets from enter(asynchronous=True).
+        """
+        try:
+            deadline = ticket.enqueued_at + self.max_wait_s
+            last = None
+            while ticket.state == "queued":
+                position = self.position(ticket)
+                if position and position != last:
+                    last = position
+                    yield self._queued_event(position)
+                remaining = deadline - monotonic()
+                if remaining <= 0 and self._expire(ticket):
+                    yield self._timeout_event()
+                    return
+                try:
+                    await wait_for(shield(ticket._future), max(0.0, min(self.poll_s, remaining)))
+                except AsyncTimeoutError:
+                    pass
+            ticket.started_at = monotonic()
+            async for ev in make_events():
+                yield ev
+        finally:
+            self.close(ticket)
+
+    def call(self, client: str, fn: Callable[[], T]) -> T | None:
+        """
+        fn() holding a slot, blocking while the ticket is queued; None if the
+        request is shed or still queued after max_wait_s. For work without a
+        stream of its own (one profile of a cohort batch).
+        """
+        ticket = self.enter(client)
+        if ticket is None:
+            return None
+        try:
+            if ticket.state == "queued":
+                remaining = ticket.enqueued_at + self.max_wait_s - monotonic()
+                if not ticket._event.wait(max(0.0, remaining)) and self._expire(ticket):
+                    return None
+            ticket.started_at = monotonic()
+            return fn()
+        finally:
+            self.close(ticket)
+
+    # --- metrics -----------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            # Copied under the lock: _next() appends to it concurrently.
+            waits = list(self._wait_ms)
+            out = dict(self._counters)
+            out["in_flight"] = self.in_flight
+            out["queue_depth"] = self._queued
+            out["clients_queued"] = len(self._queues)
+        waits.sort()
+        out["max_in_flight"] = self.max_in_flight
+        out["wait_p50_ms"] = round(waits[len(waits) // 2], 2) if waits else 0.0
+        out["wait_p95_ms"] = round(waits[int(len(waits) * 0.95)], 2) if waits else 0.0
+        return out
+
+
+admission = AdmissionController()
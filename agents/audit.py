@@ -0,0 +1,194 @@
+"""
+Audit events: a compact record type, a bounded per-run log, and a background sink.
+
+Events are AuditEvent records (slots, interned agent/event names) instead of
+one dict each. PipelineState.audit_log keeps only the last
+AUDIT_LOG_MAX_EVENTS of a run (add_audit drops the oldest), so the reducer
+copies and the checkpoints stay bounded however long the repair and regen
+loops run. The stream forwards every event from the node patches
+(agents/streaming.py), so it doesn't need the full log in state.
+
+With AUDIT_SINK ("jsonl" or "sqlite") every event is also queued to a
+background thread that appends them, in batches, to AUDIT_SINK_PATH with the
+run's thread id. Logging never blocks: past AUDIT_SINK_MAX_QUEUE queued
+events, new ones are dropped and counted. Session replays read the full
+history from the sink.
+"""
+
+from dataclasses import dataclass
+from json import loads
+from os import getpid
+from pathlib import Path
+from queue import Empty, Full, Queue
+from sys import intern
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Any
+import sqlite3
+
+from agents.config import (
+    AUDIT_LOG_MAX_EVENTS,
+    AUDIT_SINK,
+    AUDIT_SINK_BATCH_SIZE,
+    AUDIT_SINK_FLUSH_MS,
+    AUDIT_SINK_MAX_QUEUE,
+    AUDIT_SINK_PATH,
+)
+from agents.serializer import ndjson
+
+
+@dataclass(frozen=True, slots=True)
+class AuditEvent:
+    ts_ms: int
+    agent: str
+    event: str
+    data: dict[str, Any]
+
+    def __post_init__(self) -> None:
+        # A handful of names repeat across every run (and every checkpoint load).
+        object.__setattr__(self, "agent", intern(self.agent))
+        object.__setattr__(self, "event", intern(self.event))
+
+
+def add_audit(left: list[AuditEvent] | None, right: list[AuditEvent] | None) -> list[AuditEvent]:
+    """
+    The audit_log reducer: appends, keeping the last AUDIT_LOG_MAX_EVENTS.
+    """
+    out = [*(left or ()), *(right or ())]
+    return out[-AUDIT_LOG_MAX_EVENTS:] if len(out) > AUDIT_LOG_MAX_EVENTS else out
+
+
+class AuditSink:
+    """
+    Appends (thread_id, event) pairs to a JSONL file or an SQLite table from a
+    background thread, up to batch_size per write or every flush_ms.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        path: str | None = AUDIT_SINK_PATH,
+        *,
+        batch_size: int = AUDIT_SINK_BATCH_SIZE,
+        flush_ms: float = AUDIT_SINK_FLUSH_MS,
+        max_queue: int = AUDIT_SINK_MAX_QUEUE,
+    ) -> None:
+        if backend not in ("jsonl", "sqlite"):
+            raise ValueError(f"Unknown audit sink: {backend}")
+        self.backend = backend
+        self.path = Path(path or ("audit.jsonl" if backend == "jsonl" else "audit.sqlite3"))
+        self.batch_size = batch_size
+        self.flush_s = flush_ms / 1000
+        self._queue: Queue = Queue(maxsize=max_queue)
+        self._lock = Lock()
+        self._pid: int | None = None
+        self._counters = {"events": 0, "batches": 0, "dropped": 0, "errors": 0}
+
+    def put(self, thread_id: str | None, ev: AuditEvent) -> None:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((thread_id, ev))
+        except Full:
+            self._counters["dropped"] += 1
+
+    def flush(self) -> None:
+        """
+        Blocks until every queued event has been written.
+        """
+        if self._pid == getpid():
+            self._queue.join()
+
+    def _ensure_worker(self) -> None:
+        # Threads don't survive fork, so (re)start lazily in the process that uses us.
+        if self._pid == getpid():
+            return
+        with self._lock:
+            if self._pid != getpid():
+                Thread(target=self._loop, name="audit-sink", daemon=True).start()
+                self._pid = getpid()
+
+    def _collect(self) -> list[tuple]:
+        batch = [self._queue.get()]
+        deadline = perf_counter() + self.flush_s
+        while len(batch) < self.batch_size:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        conn = self._connect() if self.backend == "sqlite" else None
+        while True:
+            batch = self._collect()
+            try:
+                if conn is not None:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO audit_events (thread_id, ts_ms, agent, event, data) VALUES (?, ?, ?, ?, ?)",
+                            [(tid, ev.ts_ms, ev.agent, ev.event, ndjson(ev.data).decode()) for tid, ev in batch],
+                        )
+                else:
+                    with self.path.open("ab") as f:
+                        f.write(b"".join(
+                            ndjson({"thread_id": tid, "ts_ms": ev.ts_ms, "agent": ev.agent,
+                                    "event": ev.event, "data": ev.data})
+                            for tid, ev in batch
+                        ))
+                self._counters["events"] += len(batch)
+                self._counters["batches"] += 1
+            except Exception:
+                self._counters["errors"] += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS audit_events ("
+            "thread_id TEXT, ts_ms INTEGER, agent TEXT, event TEXT, data TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS audit_events_thread ON audit_events (thread_id)")
+        conn.commit()
+        return conn
+
+    def read(self, thread_id: str) -> list[AuditEvent]:
+        """
+        Every event written for a session, oldest first.
+        """
+        self.flush()
+        if not self.path.exists():
+            return []
+        if self.backend == "sqlite":
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT ts_ms, agent, event, data FROM audit_events WHERE thread_id = ? ORDER BY rowid",
+                    (thread_id,),
+                ).fetchall()
+            finally:
+                conn.close()
+            return [AuditEvent(ts, agent, event, loads(data)) for ts, agent, event, data in rows]
+        out = []
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                if thread_id not in line:
+                    continue
+                rec = loads(line)
+                if rec.get("thread_id") == thread_id:
+                    out.append(AuditEvent(rec["ts_ms"], rec["agent"], rec["event"], rec["data"]))
+        return out
+
+    def stats(self) -> dict[str, Any]:
+        return {**self._counters, "backend": self.backend, "queue_depth": self._queue.qsize()}
+
+
+audit_sink = AuditSink(AUDIT_SINK) if AUDIT_SINK else None
+
+
+def audit_stats() -> dict[str, Any]:
+    return audit_sink.stats() if audit_sink is not None else {"backend": None}
@@ -0,0 +1,136 @@
+"""
+Content-addressed cache for structured LLM responses.
+
+Keys are a stable hash of (model name, temperature, prompt messages, output schema),
+so identical scholarship + resume inputs skip the Cohere round-trip.
+Entries live in an in-memory LRU, optionally backed by a SQLite file.
+"""
+
+from collections import OrderedDict
+from hashlib import sha256
+from json import dumps
+from threading import Lock
+from time import time
+from typing import Any
+import sqlite3
+
+from pydantic import BaseModel
+
+from agents.config import (
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_S,
+    CACHE_SQLITE_PATH,
+    CACHE_SQLITE_MAX_ENTRIES,
+)
+
+
+def cache_key(model: str, temperature: float, messages: list[dict], schema: type[BaseModel]) -> str:
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": messages,
+        "schema": schema.model_json_schema(),
+    }
+    blob = dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache: in-memory LRU in front of an optional SQLite table.
+    Values are JSON strings (model_dump_json output); both tiers honour the TTL
+    and evict the oldest entries past their size limit.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl_s: float = CACHE_TTL_S,
+        sqlite_path: str | None = CACHE_SQLITE_PATH,
+        sqlite_max_entries: int = CACHE_SQLITE_MAX_ENTRIES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.sqlite_max_entries = sqlite_max_entries
+        self._mem: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = Lock()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses(created)")
+            self._db.commit()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl_s is not None and time() - created > self.ttl_s
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                created, value = hit
+                if not self._expired(created):
+                    self._mem.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created):
+                        self._put_mem(key, created, value)
+                        self._counters["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        created = time()
+        with self._lock:
+            self._put_mem(key, created, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, created),
+                )
+                # Size-based eviction: keep the newest sqlite_max_entries rows.
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.sqlite_max_entries,),
+                )
+                self._db.commit()
+
+    def _put_mem(self, key: str, created: float, value: str) -> None:
+        self._mem[key] = (created, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "size": len(self._mem)}
+
+
+response_cache = ResponseCache()
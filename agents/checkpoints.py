@@ -0,0 +1,74 @@
+"""
+Checkpointers for the pipeline graph, so a run can be resumed, replayed or
+partially regenerated by its session (thread) id.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from uuid import uuid4
+import sqlite3
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from agents.config import (
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_SQLITE_PATH,
+    CHECKPOINT_MAX_THREADS,
+)
+
+
+class BoundedInMemorySaver(InMemorySaver):
+    """
+    InMemorySaver that drops the least recently written sessions past max_threads,
+    so a long-running server doesn't keep every session forever.
+    """
+
+    def __init__(self, max_threads: int = CHECKPOINT_MAX_THREADS) -> None:
+        super().__init__()
+        self.max_threads = max_threads
+        self._recent: OrderedDict[str, None] = OrderedDict()
+        self._recent_lock = Lock()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        with self._recent_lock:
+            self._recent[thread_id] = None
+            self._recent.move_to_end(thread_id)
+            evicted = []
+            while len(self._recent) > self.max_threads:
+                evicted.append(self._recent.popitem(last=False)[0])
+        for old in evicted:
+            self.delete_thread(old)
+        return super().put(config, checkpoint, metadata, new_versions)
+
+
+def make_checkpointer(backend: str = CHECKPOINT_BACKEND, *, use_async: bool = False):
+    """
+    Returns a checkpointer for create_graph(), or None when backend is "none".
+    The async SQLite saver must be built inside the running event loop.
+    """
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return BoundedInMemorySaver()
+    if backend == "sqlite":
+        if use_async:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+            return AsyncSqliteSaver(aiosqlite.connect(CHECKPOINT_SQLITE_PATH))
+
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        saver = SqliteSaver(sqlite3.connect(CHECKPOINT_SQLITE_PATH, check_same_thread=False))
+        saver.setup()
+        return saver
+    raise ValueError(f"Unknown checkpoint backend: {backend}")
+
+
+def new_thread_id() -> str:
+    return uuid4().hex
+
+
+def session_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
@@ -0,0 +1,315 @@
+"""
+Batch runs of the pipeline over a cohort of profiles: JSONL in, JSONL out.
+
+Each input line is a UserInput record, optionally with an "id" (otherwise the
+id is a hash of the record, so the same file gets the same ids every time).
+Profiles run on up to COHORT_CONCURRENCY threads through the shared sync
+graph, so concurrent redactor calls coalesce in the redaction micro-batcher
+(agents/redaction.py) and every run goes through the same response cache and
+LLM scheduler. Results are yielded, and written, one line per profile as each
+finishes, in completion order.
+
+Resuming: run_cohort() appends to its output file and first reads the ids
+already in it; profiles whose line has status "ok" or "invalid" are skipped,
+so an interrupted cohort picks up where it stopped and failed runs are retried.
+A batch_id runs at most once at a time in this process (batch_events), so two
+posts of the same batch can't interleave their appends or both resume.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
+from hashlib import sha256
+from json import JSONDecodeError, dumps, loads
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import Any, BinaryIO
+import re
+
+from pydantic import ValidationError
+
+from agents.checkpoints import new_thread_id, session_config
+from agents.config import COHORT_CONCURRENCY, COHORT_OUTPUT_DIR
+from agents.models import UserInput
+from agents.registry import registry
+from agents.serializer import RESULT_FIELDS, ndjson, result_payload
+from agents.streaming import initial_state
+from agents.validation_utils import create_custom_errors
+
+# Statuses that are final; "error" lines are retried on resume.
+DONE_STATUSES = frozenset({"ok", "invalid"})
+_BATCH_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# batch_ids with a batch_events() stream in progress.
+_running_batches: set[str] = set()
+_batches_lock = Lock()
+
+
+def record_id(record: dict[str, Any]) -> str:
+    if record.get("id") is not None:
+        return str(record["id"])
+    blob = dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def read_records(lines: Iterable[str | bytes]) -> Iterator[dict[str, Any]]:
+    """
+    Parses JSONL lines; blank lines are skipped. A line that is not a JSON
+    object is yielded as {"id": "line-<n>", "_error": ...} so it gets an
+    "invalid" result instead of stopping the cohort.
+    """
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except JSONDecodeError as e:
+            yield {"id": f"line-{n}", "_error": f"Invalid JSON: {e.msg}."}
+            continue
+        if not isinstance(record, dict):
+            yield {"id": f"line-{n}", "_error": "Expected a JSON object."}
+            continue
+        yield record
+
+
+def completed_ids(path: str | Path) -> set[str]:
+    """
+    Ids with a final result in an existing output file (empty if it doesn't exist).
+    A partly written last line (an interrupted write) is ignored.
+    """
+    done: set[str] = set()
+    path = Path(path)
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                out = loads(line)
+            except JSONDecodeError:
+                continue
+            if isinstance(out, dict) and out.get("status") in DONE_STATUSES:
+                done.add(str(out.get("id")))
+    return done
+
+
+def output_path(batch_id: str) -> Path:
+    """
+    Where the HTTP batch endpoint keeps a cohort's results.
+    Raises ValueError for ids that are not a safe file name.
+    """
+    if not _BATCH_ID_RE.match(batch_id):
+        raise ValueError("batch_id must be 1-64 letters, digits, '-' or '_'.")
+    return Path(COHORT_OUTPUT_DIR) / f"{batch_id}.jsonl"
+
+
+@dataclass
+class CohortStats:
+    ok: int = 0
+    error: int = 0
+    invalid: int = 0
+    skipped: int = 0
+    t0: float = field(default_factory=perf_counter)
+
+    def add(self, out: dict[str, Any]) -> None:
+        setattr(self, out["status"], getattr(self, out["status"]) + 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        elapsed = perf_counter() - self.t0
+        processed = self.ok + self.error + self.invalid
+        return {
+            "ok": self.ok,
+            "error": self.error,
+            "invalid": self.invalid,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 2),
+            "profiles_per_min": round(processed / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        }
+
+
+def run_profile(rid: str, record: dict[str, Any], *,
+                generation_mode: str | None = None,
+                speculative_planning: bool | None = None,
+                fields: tuple[str, ...] = RESULT_FIELDS) -> dict[str, Any]:
+    """
+    One profile through the graph; returns its output line (never raises).
+    """
+    t0 = perf_counter()
+    out: dict[str, Any] = {"id": rid}
+    if "_error" in record:
+        return {**out, "status": "invalid", "error": record["_error"]}
+    try:
+        user_input = UserInput.model_validate({k: v for k, v in record.items() if k != "id"})
+    except ValidationError as e:
+        return {**out, "status": "invalid", "error": create_custom_errors(e)}
+
+    graph = registry.get("graph")
+    thread_id = new_thread_id()
+    try:
+        state = graph.invoke(initial_state(user_input, generation_mode, speculative_planning),
+                             session_config(thread_id))
+    except Exception as e:
+        out.update(status="error", error=f"{type(e).__name__}: {e}")
+    else:
+        out.update(status="ok", result=result_payload(state, fields))
+        if graph.checkpointer is not None:
+            # The session can be regenerated per beat (regen_stream) while it is kept.
+            out["thread_id"] = thread_id
+    out["ms"] = round((perf_counter() - t0) * 1000, 2)
+    return out
+
+
+def iter_cohort(
+    records: Iterable[dict[str, Any]],
+    *,
+    concurrency: int = COHORT_CONCURRENCY,
+    skip: set[str] | frozenset[str] = frozenset(),
+    stats: CohortStats | None = None,
+    generation_mode: str | None = None,
+    speculative_planning: bool | None = None,
+    fields: tuple[str, ...] = RESULT_FIELDS,
+    admit: Callable[[Callable[[], dict[str, Any]]], dict[str, Any] | None] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Runs the records with at most `concurrency` in flight and yields each
+    output line as it finishes. Records whose id is in `skip` (or repeats an
+    id already seen) are not run. Input is read lazily: at most
+    2 * concurrency records are held at a time.
+    With `admit` (the HTTP endpoint's admission control), each profile runs
+    through admit(run); None means it was refused, and its line is an
+    "error", retried on resume.
+    """
+    stats = stats if stats is not None else CohortStats()
+    seen = set(skip)
+    pending: set = set()
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cohort")
+
+    def run(rid: str, record: dict[str, Any]) -> dict[str, Any]:
+        job = partial(run_profile, rid, record, generation_mode=generation_mode,
+                      speculative_planning=speculative_planning, fields=fields)
+        if admit is None:
+            return job()
+        out = admit(job)
+        return out if out is not None else {"id": rid, "status": "error", "error": "The server is busy."}
+
+    def drain(block_until: int) -> Iterator[dict[str, Any]]:
+        nonlocal pending
+        while len(pending) > block_until:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                out = fut.result()
+                stats.add(out)
+                yield out
+
+    try:
+        for record in records:
+            rid = record_id(record)
+            if rid in seen:
+                stats.skipped += 1
+                continue
+            seen.add(rid)
+            pending.add(pool.submit(run, rid, record))
+            yield from drain(2 * concurrency - 1)
+        yield from drain(0)
+    finally:
+        # If the consumer stops early (e.g. a client disconnects), queued
+        # profiles are dropped; they run again on resume.
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _open_append(path: Path) -> BinaryIO:
+    """
+    Opens an output file for appending, first ending a line cut short by an
+    interruption so the next result starts on its own line.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists() and path.stat().st_size:
+        with path.open("rb") as f:
+            f.seek(-1, 2)
+            cut = f.read(1) != b"\n"
+        if cut:
+            with path.open("ab") as f:
+                f.write(b"\n")
+    return path.open("ab")
+
+
+def write_results(results: Iterable[dict[str, Any]], out: BinaryIO) -> None:
+    for line in results:
+        out.write(ndjson(line))
+        # One line per finished profile survives an interruption.
+        out.flush()
+
+
+def run_cohort(
+    in_path: str | Path,
+    out_path: str | Path,
+    *,
+    concurrency: int = COHORT_CONCURRENCY,
+    resume: bool = True,
+    generation_mode: str | None = None,
+    speculative_planning: bool | None = None,
+    fields: tuple[str, ...] = RESULT_FIELDS,
+) -> dict[str, Any]:
+    """
+    Runs every profile of a JSONL file and appends one result line per profile
+    to out_path. With resume, profiles already finished in out_path are skipped;
+    without it out_path is overwritten. Returns the counts and profiles/min.
+    """
+    out_path = Path(out_path)
+    skip = completed_ids(out_path) if resume else set()
+    stats = CohortStats()
+    if not resume:
+        out_path.unlink(missing_ok=True)
+    with open(in_path, encoding="utf-8") as f, _open_append(out_path) as out:
+        write_results(iter_cohort(read_records(f), concurrency=concurrency, skip=skip, stats=stats,
+                                  generation_mode=generation_mode,
+                                  speculative_planning=speculative_planning, fields=fields), out)
+    return stats.as_dict()
+
+
+def batch_running(batch_id: str) -> bool:
+    with _batches_lock:
+        return batch_id in _running_batches
+
+
+def batch_events(
+    lines: Iterable[str | bytes],
+    batch_id: str,
+    *,
+    concurrency: int = COHORT_CONCURRENCY,
+    generation_mode: str | None = None,
+    speculative_planning: bool | None = None,
+    fields: tuple[str, ...] = RESULT_FIELDS,
+    admit: Callable[[Callable[[], dict[str, Any]]], dict[str, Any] | None] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    NDJSON events of the HTTP batch endpoint: a "batch" event, one "profile"
+    event per finished profile (also appended to output_path(batch_id)), and a
+    closing "summary". Posting the same file again with the same batch_id
+    resumes it. While the batch_id is already running, the only event is a
+    "BATCH_RUNNING" error (the endpoints answer 409 before streaming; this
+    covers two posts racing past that check).
+    """
+    path = output_path(batch_id)
+    with _batches_lock:
+        claimed = batch_id not in _running_batches
+        _running_batches.add(batch_id)
+    if not claimed:
+        yield {"type": "error", "error": "BATCH_RUNNING",
+               "data": {"message": f"Batch {batch_id} is already running."}}
+        return
+    try:
+        skip = completed_ids(path)
+        stats = CohortStats()
+        yield {"type": "batch", "data": {"batch_id": batch_id, "already_done": len(skip)}}
+        with _open_append(path) as out:
+            for line in iter_cohort(read_records(lines), concurrency=concurrency, skip=skip, stats=stats,
+                                    generation_mode=generation_mode,
+                                    speculative_planning=speculative_planning, fields=fields,
+                                    admit=admit):
+                write_results([line], out)
+                yield {"type": "profile", "data": line}
+        yield {"type": "summary", "data": stats.as_dict()}
+    finally:
+        with _batches_lock:
+            _running_batches.discard(batch_id)
@@ -1,10 +1,169 @@
 ALL_BEATS = ["A", "B", "C", "D", "E"]
 
+LLM_MODEL = "command-a-03-2025"
+# Chat model backend: "cohere", or "fake" for offline runs and load tests
+# (agents/fake_llm.py). The LLM_BACKEND environment variable overrides it.
+LLM_BACKEND = "cohere"
+FAKE_LLM = {
+    "latency_dist": "lognormal",
+    "latency_s": 0.8,
+    "sigma": 0.4,
+    "error_rate": 0.0,
+    "server_error_rate": 0.0,
+    "seed": None,
+}
+
 # At most two questions per beat for demo consistency
 PLANNER_TEMP = 0
 MAX_PER_BEAT = 2
 
 
 GENERATOR_TEMP = 0.7
+# Near-duplicate questions (agents/dedupe.py): after the exact dedupe, a
+# question is dropped when its cosine similarity to one already kept reaches
+# DEDUPE_THRESHOLD. Embedding: "hashed" (character n-grams, no model) or
+# "spacy" (en_core_web_lg vectors).
+SEMANTIC_DEDUPE = True
+DEDUPE_EMBEDDING = "hashed"
+DEDUPE_THRESHOLD = 0.8
+DEDUPE_HASH_DIM = 1024
+
 # Upper bound of regenerations
 MAX_ATTEMPT = 3
+
+# "fanout": one generator call per beat (parallel Sends).
+# "batched": all beats from one structured call; fewer round-trips and input
+# tokens. Requests can override it with "generation_mode".
+GENERATION_MODE = "fanout"
+
+# Start generating from a generic per-program plan (prompts.default_beat_plan)
+# while the planner runs, instead of waiting for it. The validator then
+# regenerates, with the planner's plan, only the beats that fail. Requests can
+# override it with "speculative_planning".
+SPECULATIVE_PLANNING = False
+
+# LLM scheduler (agents/llm_scheduler.py). None disables a rate limit.
+LLM_RPM = 500
+LLM_TPM = None
+LLM_MAX_CONCURRENCY = 32
+# A run fans out up to 6 calls; cap how many one session has in flight.
+LLM_MAX_PER_SESSION = 6
+LLM_MAX_RETRIES = 4
+LLM_BACKOFF_BASE_S = 0.5
+LLM_BACKOFF_MAX_S = 20
+# Expected completion size, added to the prompt estimate for the tokens/min bucket.
+LLM_EST_OUTPUT_TOKENS = 500
+# Hedge slow generator calls with a duplicate request. The duplicate goes out
+# after LLM_HEDGE_AFTER_S, or after the recent p95 latency when that is None.
+LLM_HEDGE = False
+LLM_HEDGE_AFTER_S = None
+
+# Response cache (agents/cache.py).
+# The planner runs at temperature 0, so its output is safe to reuse;
+# generator caching trades question variety for cost, so it is opt-in.
+PLANNER_CACHE = True
+GENERATOR_CACHE = False
+CACHE_MAX_ENTRIES = 1024
+CACHE_TTL_S = 24 * 60 * 60
+# Set to a file path (e.g. "llm_cache.sqlite3") to persist entries across restarts.
+CACHE_SQLITE_PATH = None
+CACHE_SQLITE_MAX_ENTRIES = 50_000
+
+# Session checkpoints (agents/checkpoints.py): "memory", "sqlite" or "none".
+CHECKPOINT_BACKEND = "memory"
+CHECKPOINT_SQLITE_PATH = "checkpoints.sqlite3"
+# The in-memory backend forgets the least recently used sessions past this count.
+CHECKPOINT_MAX_THREADS = 1000
+
+# Redaction micro-batching (agents/redaction.py): concurrent requests are
+# coalesced into one nlp.pipe call of up to REDACTION_BATCH_SIZE texts,
+# waiting at most REDACTION_MAX_WAIT_MS for the batch to fill.
+REDACTION_BATCHING = True
+REDACTION_BATCH_SIZE = 16
+REDACTION_MAX_WAIT_MS = 5
+# Cache Presidio results per line of the canonical input (scholarship name,
+# goal, each resume point, template lines), so a resubmit with one edited
+# bullet only analyzes that line. First-seen input is still analyzed whole.
+# Adjacent changed lines are analyzed together, and lines under a result that
+# crosses a line break are never cached. A changed run is still analyzed without
+# its unchanged neighbours, which can change NER and context scores at its
+# edges; keep this off until benchmarks/redaction_resubmit.py reports no
+# mismatches with en_core_web_lg. Keys are hashes; no input text is stored.
+REDACTION_SEGMENT_CACHE = False
+REDACTION_SEGMENT_CACHE_MAX_ENTRIES = 4096
+
+# PII pre-screen (agents/pii_prescreen.py): only the pattern recognizers whose
+# trigger appears in the text run. NER always runs.
+PII_PRESCREEN = True
+
+# Process pool for CPU-bound redaction/validation (agents/executor.py).
+# 0 runs the work inline in the request thread.
+CPU_POOL_SIZE = 0
+# "spawn"/"forkserver" keep workers independent of the server's threads;
+# each worker preloads CPU_POOL_MODELS once at start.
+CPU_POOL_START_METHOD = "forkserver"
+CPU_POOL_MODELS = ["analyzer", "anonymizer", "ner_model"]
+
+# Validator entity grounding (agents/validator_engine.py): named entities in a
+# question must appear in the redacted input. spaCy NER runs over the uncached
+# questions in sub-batches of ENTITY_CHECK_BATCH_SIZE; once the budget is spent
+# no further sub-batch starts and the rest are not entity-checked (nor is any
+# question without a NER model), so a validation can take the budget plus one
+# sub-batch and never fails a question on a guess.
+VALIDATOR_ENTITY_CHECK = True
+ENTITY_CHECK_BUDGET_MS = 10
+ENTITY_CHECK_BATCH_SIZE = 4
+ENTITY_CACHE_MAX_ENTRIES = 4096
+
+# Admission control for run_stream (agents/admission.py): at most
+# ADMISSION_MAX_IN_FLIGHT graph runs at once. Others wait in a queue served
+# round-robin across clients (ADMISSION_CLIENT_HEADER, else the remote
+# address), up to ADMISSION_MAX_QUEUE runs and ADMISSION_MAX_QUEUED_PER_CLIENT
+# per client; beyond that requests get 503 with Retry-After. Queued runs
+# stream their position every ADMISSION_POLL_S and give up after
+# ADMISSION_MAX_WAIT_S.
+ADMISSION = True
+ADMISSION_MAX_IN_FLIGHT = 16
+ADMISSION_MAX_QUEUE = 64
+ADMISSION_MAX_QUEUED_PER_CLIENT = 8
+ADMISSION_MAX_WAIT_S = 30
+ADMISSION_POLL_S = 1.0
+ADMISSION_CLIENT_HEADER = "X-Client-Id"
+
+# Single-flight run_stream (agents/singleflight.py): identical requests (same
+# Idempotency-Key header, or same input and options) share one run. Finished
+# runs are replayed to repeats for SINGLEFLIGHT_WINDOW_S.
+SINGLEFLIGHT = True
+SINGLEFLIGHT_WINDOW_S = 10
+SINGLEFLIGHT_MAX_COMPLETED = 256
+
+# Cohort batch runs (agents/cohort.py, POST /api/pipeline/batch): profiles run
+# concurrently through one process, sharing its redaction batcher, response
+# cache and LLM scheduler. The endpoint keeps each batch's results in
+# COHORT_OUTPUT_DIR/<batch_id>.jsonl.
+COHORT_CONCURRENCY = 8
+COHORT_OUTPUT_DIR = "cohorts"
+
+# Audit log (agents/audit.py). Graph state keeps the last AUDIT_LOG_MAX_EVENTS
+# events of a run; the stream forwards every event as it is logged.
+AUDIT_LOG_MAX_EVENTS = 200
+# Background sink for every event: None, "jsonl" or "sqlite". AUDIT_SINK_PATH
+# defaults to audit.jsonl / audit.sqlite3. Events are written in batches of up
+# to AUDIT_SINK_BATCH_SIZE, at least every AUDIT_SINK_FLUSH_MS; past
+# AUDIT_SINK_MAX_QUEUE queued events new ones are dropped.
+AUDIT_SINK = None
+AUDIT_SINK_PATH = None
+AUDIT_SINK_BATCH_SIZE = 256
+AUDIT_SINK_FLUSH_MS = 200
+AUDIT_SINK_MAX_QUEUE = 10_000
+
+# Stream generated question text to the client as it is produced
+# (question_delta events; see agents/streaming.py).
+STREAM_QUESTIONS = True
+
+# Per-node telemetry (agents/telemetry.py), served on /metrics.
+TELEMETRY = True
+# Also open an OpenTelemetry span per node (needs opentelemetry-api and an SDK).
+TELEMETRY_OTEL = False
+# Node latency histogram buckets, in seconds.
+TELEMETRY_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
@@ -0,0 +1,123 @@
+"""
+Near-duplicate filtering of questions by vector similarity.
+
+The assembler's exact dedupe (_norm_q) misses paraphrases, which then take the
+MAX_PER_BEAT slots of more useful questions. Here every candidate is embedded,
+the cosine-similarity matrix is computed in one product, and candidates are
+kept greedily, in order, while they stay below DEDUPE_THRESHOLD against
+everything already kept.
+
+Embeddings (DEDUPE_EMBEDDING):
+  "hashed"  character 3- and 4-grams hashed into DEDUPE_HASH_DIM buckets,
+            computed for all texts at once with NumPy; needs no model;
+  "spacy"   mean word vectors from the analyzer's spaCy model (en_core_web_lg),
+            all pipes disabled.
+benchmarks/semantic_dedupe.py times it and shows what it drops.
+"""
+
+import re
+
+import numpy as np
+
+from agents.config import DEDUPE_EMBEDDING, DEDUPE_HASH_DIM, DEDUPE_THRESHOLD
+from agents.registry import registry
+
+_STRIP_RE = re.compile(r"[^\w\s]+")
+_NGRAMS = (3, 4)
+_BASE = np.uint64(257)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _clean(text: str) -> str:
+    return " " + " ".join(_STRIP_RE.sub(" ", text.lower()).split()) + " "
+
+
+def hashed_vectors(texts: list[str], dim: int = DEDUPE_HASH_DIM) -> np.ndarray:
+    """
+    (len(texts), dim) counts of hashed character n-grams. dim must be a power
+    of two. All texts are hashed in one pass over their concatenation.
+    """
+    encoded = [_clean(t).encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    buf = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    row = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+    mask = np.uint64(dim - 1)
+
+    buckets = []
+    for n in _NGRAMS:
+        m = len(buf) - n + 1
+        if m <= 0:
+            continue
+        h = np.zeros(m, dtype=np.uint64)
+        for k in range(n):
+            h = h * _BASE + buf[k:k + m]
+        # Tag the n-gram length so 3- and 4-grams land in different buckets.
+        h = ((h + np.uint64(n)) * _MIX) >> np.uint64(32) & mask
+        # Drop n-grams that span two texts.
+        inside = row[:m] == row[n - 1:n - 1 + m]
+        buckets.append(row[:m][inside] * dim + h[inside].astype(np.int64))
+
+    flat = np.concatenate(buckets) if buckets else np.zeros(0, dtype=np.int64)
+    counts = np.bincount(flat, minlength=len(texts) * dim)
+    return counts.reshape(len(texts), dim).astype(np.float32)
+
+
+def spacy_vectors(texts: list[str]) -> np.ndarray:
+    nlp = registry.get("analyzer").nlp_engine.get_nlp("en")
+    docs = nlp.pipe(texts, disable=nlp.pipe_names)
+    return np.array([doc.vector for doc in docs], dtype=np.float32)
+
+
+def embed(texts: list[str], embedding: str = DEDUPE_EMBEDDING) -> np.ndarray:
+    """
+    L2-normalized rows, so X @ X.T is the cosine-similarity matrix.
+    """
+    if embedding == "spacy":
+        vectors = spacy_vectors(texts)
+    elif embedding == "hashed":
+        vectors = hashed_vectors(texts)
+    else:
+        raise ValueError(f"Unknown embedding {embedding!r}.")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def select_diverse(
+    kept: list[str],
+    groups: list[list[str]],
+    *,
+    threshold: float = DEDUPE_THRESHOLD,
+    limit: int | None = None,
+    embedding: str = DEDUPE_EMBEDDING,
+) -> list[list[int]]:
+    """
+    Greedy near-duplicate filter. `kept` are already selected; each group's
+    candidates are taken in order and selected while their similarity to every
+    selected text is below threshold, up to `limit` per group.
+    Returns the selected indices of each group.
+    """
+    n_candidates = sum(len(g) for g in groups)
+    if not n_candidates:
+        return [[] for _ in groups]
+    texts = kept + [t for g in groups for t in g]
+    vectors = embed(texts, embedding)
+    sim = vectors @ vectors.T
+
+    # blocked[i]: i is too similar to something already selected.
+    blocked = np.zeros(len(texts), dtype=bool)
+    for i in range(len(kept)):
+        blocked |= sim[i] >= threshold
+    out: list[list[int]] = []
+    pos = len(kept)
+    for group in groups:
+        chosen: list[int] = []
+        for j in range(len(group)):
+            if limit is not None and len(chosen) >= limit:
+                break
+            if blocked[pos + j]:
+                continue
+            blocked |= sim[pos + j] >= threshold
+            chosen.append(j)
+        pos += len(group)
+        out.append(chosen)
+    return out
@@ -0,0 +1,101 @@
+"""
+Runs CPU-bound pipeline work (redaction, validation) inline or in a warm process pool.
+
+Under the GIL, spaCy/Presidio and the validator's regex work from concurrent
+sessions serialize on one core. With CPU_POOL_SIZE > 0 that work is shipped to
+worker processes which load the models once at start-up.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os import getpid
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable
+
+from agents.config import CPU_POOL_SIZE, CPU_POOL_START_METHOD, CPU_POOL_MODELS
+
+
+def _init_worker(models: list[str]) -> None:
+    from agents.registry import registry
+
+    if models:
+        registry.warmup(models)
+
+
+def _ping() -> int:
+    return getpid()
+
+
+class CpuExecutor:
+    def __init__(
+        self,
+        pool_size: int = CPU_POOL_SIZE,
+        *,
+        start_method: str = CPU_POOL_START_METHOD,
+        models: list[str] | None = None,
+    ) -> None:
+        self.pool_size = pool_size
+        self.start_method = start_method
+        self.models = CPU_POOL_MODELS if models is None else models
+        self._pool: ProcessPoolExecutor | None = None
+        self._pid: int | None = None
+        self._lock = Lock()
+        self._counters = {"tasks": 0, "busy_ms": 0.0}
+
+    @property
+    def pooled(self) -> bool:
+        return self.pool_size > 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # A pool created before a fork is unusable in the child; make one per process.
+        if self._pool is None or self._pid != getpid():
+            with self._lock:
+                if self._pool is None or self._pid != getpid():
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.pool_size,
+                        mp_context=get_context(self.start_method),
+                        initializer=_init_worker,
+                        initargs=(self.models,),
+                    )
+                    self._pid = getpid()
+        return self._pool
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        fn(*args, **kwargs), in a worker process when pooled.
+        fn and its arguments must be picklable (module-level functions, pydantic models).
+        """
+        t0 = perf_counter()
+        try:
+            if not self.pooled:
+                return fn(*args, **kwargs)
+            return self._get_pool().submit(fn, *args, **kwargs).result()
+        finally:
+            self._counters["tasks"] += 1
+            self._counters["busy_ms"] += (perf_counter() - t0) * 1000
+
+    def warmup(self) -> list[int]:
+        """
+        Starts every worker (and its model loading) up front; returns their pids.
+        """
+        if not self.pooled:
+            return []
+        pool = self._get_pool()
+        return sorted({f.result() for f in [pool.submit(_ping) for _ in range(self.pool_size * 2)]})
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "tasks": self._counters["tasks"],
+            "busy_ms": round(self._counters["busy_ms"], 2),
+        }
+
+
+cpu_executor = CpuExecutor()
@@ -0,0 +1,181 @@
+"""
+Local stand-in for the chat model: no network, no API key.
+
+FakeChatModel answers the planner and generator tool calls with schema-valid
+BeatPlanOut/QuestionsOut arguments that pass the validator, after a simulated
+latency drawn from a configurable distribution, and can inject rate-limit
+(429) and overload (503) errors. Select it with LLM_BACKEND=fake (settings in
+FAKE_LLM), or directly:
+
+    from agents.workflow import set_llm_backend
+    set_llm_backend(lambda: FakeChatModel(latency_s=0.4, error_rate=0.1))
+"""
+
+from asyncio import sleep as asleep
+from json import dumps
+from random import Random
+from time import sleep
+from typing import Any, AsyncIterator, Iterator, Literal
+import re
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from agents.config import ALL_BEATS, FAKE_LLM
+
+_QUESTIONS = {
+    "A": ("What first drew you to this opportunity, and what would you give up to pursue it?",
+          "Which part of your experience inventory shows you are ready for this program?"),
+    "B": ("Which project best shows the quality of your work, and what tradeoff did you make?",
+          "What feedback or result convinced you that project actually worked?"),
+    "C": ("Who benefited from your work, and how did their situation change?",
+          "How would you show that change to someone who was not there?"),
+    "D": ("When did you have to lead without formal authority, and what did you decide?",
+          "What did a teammate say about how you handled that moment?"),
+    "E": ("What setback changed how you approach your work?",
+          "What would you do differently if you started that project again?"),
+}
+
+_BEAT_RE = re.compile(r"^Beat: ([A-E])$", re.MULTILINE)
+
+
+class RateLimitError(Exception):
+    """
+    What the fake raises for an injected 429; carries status_code and headers
+    like the provider SDK errors.
+    """
+
+    def __init__(self, retry_after_s: float | None = None) -> None:
+        super().__init__("429 Too Many Requests (injected)")
+        self.status_code = 429
+        self.headers = {"retry-after": str(retry_after_s)} if retry_after_s is not None else {}
+
+
+class ServiceUnavailableError(Exception):
+    """
+    What the fake raises for an injected 503.
+    """
+
+    def __init__(self) -> None:
+        super().__init__("503 Service Unavailable (injected)")
+        self.status_code = 503
+
+
+class FakeChatModel(BaseChatModel):
+    # "fixed": latency_s; "exponential": mean latency_s;
+    # "lognormal": median latency_s with shape sigma (a long right tail).
+    latency_dist: Literal["fixed", "exponential", "lognormal"] = "fixed"
+    latency_s: float = 0.0
+    sigma: float = 0.5
+    # Uniform extra latency in [0, jitter_s]
+    jitter_s: float = 0.0
+    # Probability that a call fails with RateLimitError before answering
+    error_rate: float = 0.0
+    retry_after_s: float | None = None
+    # Probability of an injected 503 instead
+    server_error_rate: float = 0.0
+    # Characters of tool-call arguments per streamed chunk
+    chunk_chars: int = 16
+    seed: int | None = None
+
+    _rng: Random = PrivateAttr(default_factory=Random)
+    calls: int = 0
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    # --- answers -----------------------------------------------------------
+
+    def _delay(self) -> float:
+        self.calls += 1
+        roll = self._rng.random()
+        if roll < self.error_rate:
+            raise RateLimitError(self.retry_after_s)
+        if roll < self.error_rate + self.server_error_rate:
+            raise ServiceUnavailableError()
+        if self.latency_dist == "exponential":
+            base = self._rng.expovariate(1 / self.latency_s) if self.latency_s > 0 else 0.0
+        elif self.latency_dist == "lognormal":
+            base = self.latency_s * self._rng.lognormvariate(0, self.sigma)
+        else:
+            base = self.latency_s
+        return base + self._rng.uniform(0, self.jitter_s)
+
+    def _answer(self, messages, tools) -> tuple[str, dict]:
+        name = tools[0]["function"]["name"] if tools else "QuestionsOut"
+        prompt = messages[-1].content if messages else ""
+        if name == "BeatPlanOut":
+            args = {"items": [
+                {"beat": b, "missing": ["a concrete example", "why it matters here"],
+                 "guidance": "Tie the story to the opportunity."}
+                for b in ALL_BEATS
+            ]}
+        else:
+            beats = _BEAT_RE.findall(prompt if isinstance(prompt, str) else str(prompt)) or ["A"]
+            args = {"items": [
+                {"beat": b, "question": q, "intent": "tests motivation and evidence"}
+                for b in beats for q in _QUESTIONS[b]
+            ]}
+        return name, args
+
+    @staticmethod
+    def _usage(messages, raw: str) -> dict:
+        # Roughly 4 characters per token, like the scheduler's estimate.
+        n_in = sum(len(str(m.content)) for m in messages) // 4
+        n_out = len(raw) // 4
+        return {"input_tokens": n_in, "output_tokens": n_out, "total_tokens": n_in + n_out}
+
+    def _message(self, messages, kwargs) -> AIMessage:
+        name, args = self._answer(messages, kwargs.get("tools"))
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": "call_0"}],
+                         usage_metadata=self._usage(messages, dumps(args)))
+
+    def _chunks(self, messages, kwargs) -> Iterator[ChatGenerationChunk]:
+        name, args = self._answer(messages, kwargs.get("tools"))
+        raw = dumps(args)
+        for i in range(0, len(raw), self.chunk_chars):
+            last = i + self.chunk_chars >= len(raw)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": name if i == 0 else None,
+                "args": raw[i:i + self.chunk_chars],
+                "id": "call_0" if i == 0 else None,
+                "index": 0,
+            }], usage_metadata=self._usage(messages, raw) if last else None))
+
+    # --- BaseChatModel -----------------------------------------------------
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, kwargs))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, kwargs))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        delay = self._delay()
+        chunks = list(self._chunks(messages, kwargs))
+        for chunk in chunks:
+            sleep(delay / len(chunks))
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        delay = self._delay()
+        chunks = list(self._chunks(messages, kwargs))
+        for chunk in chunks:
+            await asleep(delay / len(chunks))
+            yield chunk
+
+
+def fake_llm_from_config() -> FakeChatModel:
+    return FakeChatModel(**FAKE_LLM)
@@ -0,0 +1,550 @@
+"""
+Central scheduler for chat-model calls.
+
+Every LLM call in the pipeline goes through llm_scheduler.call/acall, which
+  * caps concurrent calls globally and per session (graph thread id), FIFO;
+  * paces requests and estimated tokens through requests/min and tokens/min
+    token buckets;
+  * retries rate-limit/overload/transient errors with jittered exponential
+    backoff (honouring Retry-After), releasing its slots while it waits;
+  * optionally hedges a slow call with a duplicate once it runs past the
+    recent p95 latency (or LLM_HEDGE_AFTER_S), keeping whichever finishes first.
+    A hedge is only sent if a slot and rate budget are free right away.
+stats() reports queue depth, wait times, retries and hedges.
+"""
+
+from asyncio import FIRST_COMPLETED, create_task, get_running_loop, sleep as asleep, wait as await_tasks
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED as FUTURE_FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from contextvars import copy_context
+from random import uniform
+from threading import Event, Lock
+from time import monotonic, perf_counter, sleep
+from typing import Any, Awaitable, Callable
+
+from agents.config import (
+    LLM_RPM,
+    LLM_TPM,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_PER_SESSION,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_S,
+    LLM_BACKOFF_MAX_S,
+    LLM_HEDGE,
+    LLM_HEDGE_AFTER_S,
+)
+from agents.telemetry import record_retry
+
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+_RETRYABLE_TYPES = (TimeoutError, ConnectionError)
+# Latency samples needed before the adaptive hedge delay kicks in.
+_HEDGE_MIN_SAMPLES = 20
+
+
+def _status_code(e: BaseException) -> int | None:
+    for attr in ("status_code", "status"):
+        code = getattr(e, attr, None)
+        if isinstance(code, int):
+            return code
+    response = getattr(e, "response", None)
+    code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(e: BaseException) -> bool:
+    """
+    Rate limits, overload and transient network/server errors.
+    """
+    if isinstance(e, _RETRYABLE_TYPES):
+        return True
+    code = _status_code(e)
+    if code is not None:
+        return code in _RETRYABLE_STATUS
+    name = type(e).__name__
+    return any(k in name for k in ("RateLimit", "TooManyRequests", "ServiceUnavailable", "Timeout"))
+
+
+def _retry_after_s(e: BaseException) -> float | None:
+    headers = getattr(e, "headers", None) or getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def estimate_tokens(messages: Any, output_tokens: int = 0) -> int:
+    """
+    Rough token count of a prompt (~4 characters per token) plus expected output.
+    """
+    if isinstance(messages, str):
+        chars = len(messages)
+    else:
+        chars = sum(len(m.get("content", "")) if isinstance(m, dict) else len(str(m)) for m in messages)
+    return chars // 4 + output_tokens
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute up to one minute's worth.
+    reserve() always succeeds and returns how long the caller must wait;
+    the balance may go negative, which queues later callers behind it.
+    """
+
+    def __init__(self, per_minute: float | None) -> None:
+        self.rate = per_minute / 60 if per_minute else None
+        self.capacity = per_minute or 0
+        self.tokens = float(self.capacity)
+        self.updated = monotonic()
+        self._lock = Lock()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, n: float) -> float:
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self.tokens -= n
+            return max(0.0, -self.tokens / self.rate)
+
+    def try_reserve(self, n: float) -> bool:
+        if self.rate is None:
+            return True
+        with self._lock:
+            self._refill()
+            if self.tokens < n:
+                return False
+            self.tokens -= n
+            return True
+
+
+class Slots:
+    """
+    A FIFO counting semaphore usable from threads and from event loops.
+    A released slot is handed straight to the oldest waiter.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.used = 0
+        self._lock = Lock()
+        self._waiters: deque = deque()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.used < self.limit and not self._waiters:
+                self.used += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self.used < self.limit and not self._waiters:
+                self.used += 1
+                return
+            event = Event()
+            self._waiters.append((None, event))
+        try:
+            event.wait()
+        except BaseException:
+            self._forfeit((None, event))
+            raise
+
+    async def aacquire(self) -> None:
+        with self._lock:
+            if self.used < self.limit and not self._waiters:
+                self.used += 1
+                return
+            loop = get_running_loop()
+            fut = loop.create_future()
+            self._waiters.append((loop, fut))
+        try:
+            await fut
+        except BaseException:
+            # A cancelled future is released by _hand_over; one that was
+            # already handed a slot when the task got cancelled is not.
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def _forfeit(self, waiter) -> None:
+        """
+        An interrupted thread waiter: leaves the queue, or (once popped by
+        release(), which hands it the slot) returns the slot.
+        """
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                return
+        self.release()
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self.used -= 1
+                return
+            loop, waiter = self._waiters.popleft()
+        # The slot stays counted as used; ownership moves to the waiter.
+        if loop is None:
+            waiter.set()
+        else:
+            loop.call_soon_threadsafe(self._hand_over, waiter)
+
+    def _hand_over(self, fut) -> None:
+        if fut.cancelled():
+            self.release()
+        else:
+            fut.set_result(None)
+
+    @property
+    def idle(self) -> bool:
+        return self.used == 0 and not self._waiters
+
+
+class _Release:
+    """
+    Frees one call's slots: when the call returns, or, if its request is still
+    running in a hedge thread, only once that request has returned too.
+    """
+
+    def __init__(self, release: Callable[[], None]) -> None:
+        self._release = release
+        self._deferred = False
+
+    def defer_to(self, future) -> None:
+        self._deferred = True
+        future.add_done_callback(lambda _: self._release())
+
+    def __call__(self) -> None:
+        if not self._deferred:
+            self._release()
+
+
+def _session_id() -> str | None:
+    """
+    The graph thread id of the run this call belongs to, if any.
+    """
+    try:
+        from langgraph.config import get_config
+
+        return get_config().get("configurable", {}).get("thread_id")
+    except RuntimeError:
+        return None
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        *,
+        rpm: int | None = LLM_RPM,
+        tpm: int | None = LLM_TPM,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_per_session: int = LLM_MAX_PER_SESSION,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base_s: float = LLM_BACKOFF_BASE_S,
+        backoff_max_s: float = LLM_BACKOFF_MAX_S,
+        hedge: bool = LLM_HEDGE,
+        hedge_after_s: float | None = LLM_HEDGE_AFTER_S,
+    ) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.slots = Slots(max_concurrency)
+        self.max_per_session = max_per_session
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge = hedge
+        self.hedge_after_s = hedge_after_s
+
+        self._sessions: dict[str, Slots] = {}
+        self._lock = Lock()
+        self._latency_s: deque[float] = deque(maxlen=500)
+        self._wait_ms: deque[float] = deque(maxlen=500)
+        self._counters = {
+            "calls": 0, "failures": 0, "retries": 0, "throttled": 0,
+            "hedges": 0, "hedge_wins": 0, "waiting": 0, "in_flight": 0,
+        }
+        self._hedge_pool: ThreadPoolExecutor | None = None
+
+    # --- admission ---------------------------------------------------------
+
+    def _session_slots(self, session: str | None) -> Slots | None:
+        if session is None or self.max_per_session <= 0:
+            return None
+        with self._lock:
+            slots = self._sessions.get(session)
+            if slots is None:
+                slots = self._sessions[session] = Slots(self.max_per_session)
+            return slots
+
+    def _drop_session(self, session: str | None, slots: Slots | None) -> None:
+        if slots is not None:
+            with self._lock:
+                if slots.idle and self._sessions.get(session) is slots:
+                    del self._sessions[session]
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[key] += n
+
+    def _admit(self, session: str | None, est_tokens: int) -> Slots | None:
+        t0 = perf_counter()
+        self._count("waiting")
+        session_slots = self._session_slots(session)
+        held: list[Slots] = []
+        try:
+            if session_slots is not None:
+                session_slots.acquire()
+                held.append(session_slots)
+            self.slots.acquire()
+            held.append(self.slots)
+            delay = max(self.requests.reserve(1), self.tokens.reserve(est_tokens))
+            if delay:
+                sleep(delay)
+        except BaseException:
+            self._abandon(session, session_slots, held)
+            raise
+        finally:
+            self._count("waiting", -1)
+        self._wait_ms.append((perf_counter() - t0) * 1000)
+        self._count("in_flight")
+        return session_slots
+
+    async def _aadmit(self, session: str | None, est_tokens: int) -> Slots | None:
+        t0 = perf_counter()
+        self._count("waiting")
+        session_slots = self._session_slots(session)
+        held: list[Slots] = []
+        try:
+            if session_slots is not None:
+                await session_slots.aacquire()
+                held.append(session_slots)
+            await self.slots.aacquire()
+            held.append(self.slots)
+            delay = max(self.requests.reserve(1), self.tokens.reserve(est_tokens))
+            if delay:
+                await asleep(delay)
+        except BaseException:
+            # Cancelled (a sibling branch failed, the client went away) or
+            # interrupted: give back whatever was already acquired.
+            self._abandon(session, session_slots, held)
+            raise
+        finally:
+            self._count("waiting", -1)
+        self._wait_ms.append((perf_counter() - t0) * 1000)
+        self._count("in_flight")
+        return session_slots
+
+    def _abandon(self, session: str | None, session_slots: Slots | None, held: list[Slots]) -> None:
+        for slots in reversed(held):
+            slots.release()
+        self._drop_session(session, session_slots)
+
+    def _release(self, session: str | None, session_slots: Slots | None) -> None:
+        self._count("in_flight", -1)
+        self.slots.release()
+        if session_slots is not None:
+            session_slots.release()
+            self._drop_session(session, session_slots)
+
+    def _try_admit_hedge(self, est_tokens: int) -> bool:
+        # Never queue for a hedge: it only goes out if there is spare capacity now.
+        if not self.slots.try_acquire():
+            return False
+        if not (self.requests.try_reserve(1) and self.tokens.try_reserve(est_tokens)):
+            self.slots.release()
+            return False
+        self._count("in_flight")
+        return True
+
+    # --- retry / hedge policy ----------------------------------------------
+
+    def _backoff_s(self, attempt: int, e: BaseException) -> float:
+        delay = uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+        retry_after = _retry_after_s(e)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _should_retry(self, attempt: int, e: BaseException, retry_if) -> bool:
+        if _status_code(e) == 429 or "RateLimit" in type(e).__name__:
+            self._count("throttled")
+        return (
+            attempt < self.max_retries
+            and is_retryable(e)
+            and (retry_if is None or retry_if())
+        )
+
+    def _hedge_delay_s(self) -> float | None:
+        if self.hedge_after_s is not None:
+            return self.hedge_after_s
+        samples = sorted(self._latency_s)
+        if len(samples) < _HEDGE_MIN_SAMPLES:
+            return None
+        return samples[int(len(samples) * 0.95)]
+
+    def _record(self, t0: float) -> None:
+        self._latency_s.append(perf_counter() - t0)
+
+    # --- sync --------------------------------------------------------------
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        *,
+        est_tokens: int = 0,
+        hedge: bool = False,
+        retry_if: Callable[[], bool] | None = None,
+    ) -> Any:
+        """
+        Runs fn() under the scheduler's limits, retrying retryable errors.
+        hedge=True allows a duplicate request for a slow call (if enabled);
+        retry_if (e.g. "nothing streamed yet") can veto a retry.
+        """
+        self._count("calls")
+        session = _session_id()
+        attempt = 0
+        while True:
+            session_slots = self._admit(session, est_tokens)
+            release = _Release(lambda: self._release(session, session_slots))
+            try:
+                t0 = perf_counter()
+                if hedge and self.hedge:
+                    out = self._hedged(fn, est_tokens, release)
+                else:
+                    out = fn()
+                self._record(t0)
+                return out
+            except Exception as e:
+                if not self._should_retry(attempt, e, retry_if):
+                    self._count("failures")
+                    raise
+                backoff = self._backoff_s(attempt, e)
+            finally:
+                release()
+            attempt += 1
+            self._count("retries")
+            record_retry()
+            sleep(backoff)
+
+    def _hedged(self, fn: Callable[[], Any], est_tokens: int, release: _Release) -> Any:
+        delay = self._hedge_delay_s()
+        if delay is None:
+            return fn()
+        if self._hedge_pool is None:
+            with self._lock:
+                if self._hedge_pool is None:
+                    self._hedge_pool = ThreadPoolExecutor(thread_name_prefix="llm-hedge")
+        # Copy the context so callbacks/config still reach the model call.
+        primary = self._hedge_pool.submit(copy_context().run, fn)
+        done, _ = wait_futures([primary], timeout=delay)
+        if done or not self._try_admit_hedge(est_tokens):
+            return primary.result()
+
+        self._count("hedges")
+        backup = self._hedge_pool.submit(copy_context().run, fn)
+        backup.add_done_callback(lambda _: (self._count("in_flight", -1), self.slots.release()))
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait_futures(pending, return_when=FUTURE_FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    if f is backup:
+                        self._count("hedge_wins")
+                        # A thread can't be cancelled: the primary request keeps
+                        # its slot until it actually returns.
+                        if not primary.done():
+                            release.defer_to(primary)
+                    return f.result()
+                error = f.exception()
+        raise error
+
+    # --- async -------------------------------------------------------------
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        *,
+        est_tokens: int = 0,
+        hedge: bool = False,
+        retry_if: Callable[[], bool] | None = None,
+    ) -> Any:
+        """
+        Async variant of call; fn returns a fresh awaitable on each invocation.
+        """
+        self._count("calls")
+        session = _session_id()
+        attempt = 0
+        while True:
+            session_slots = await self._aadmit(session, est_tokens)
+            try:
+                t0 = perf_counter()
+                if hedge and self.hedge:
+                    out = await self._ahedged(fn, est_tokens)
+                else:
+                    out = await fn()
+                self._record(t0)
+                return out
+            except Exception as e:
+                if not self._should_retry(attempt, e, retry_if):
+                    self._count("failures")
+                    raise
+                backoff = self._backoff_s(attempt, e)
+            finally:
+                self._release(session, session_slots)
+            attempt += 1
+            self._count("retries")
+            record_retry()
+            await asleep(backoff)
+
+    async def _ahedged(self, fn: Callable[[], Awaitable[Any]], est_tokens: int) -> Any:
+        delay = self._hedge_delay_s()
+        if delay is None:
+            return await fn()
+        primary = create_task(fn())
+        done, _ = await await_tasks({primary}, timeout=delay)
+        if done or not self._try_admit_hedge(est_tokens):
+            return await primary
+
+        self._count("hedges")
+        backup = create_task(fn())
+        pending = {primary, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = await await_tasks(pending, return_when=FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None:
+                        if t is backup:
+                            self._count("hedge_wins")
+                        return t.result()
+                    error = t.exception()
+            raise error
+        finally:
+            for t in pending:
+                t.cancel()
+            self._count("in_flight", -1)
+            self.slots.release()
+
+    # --- metrics -----------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        waits = sorted(self._wait_ms)
+        with self._lock:
+            out = dict(self._counters)
+            out["sessions"] = len(self._sessions)
+        out["queue_depth"] = out.pop("waiting")
+        out["wait_p50_ms"] = round(waits[len(waits) // 2], 2) if waits else 0.0
+        out["wait_p95_ms"] = round(waits[int(len(waits) * 0.95)], 2) if waits else 0.0
+        hedge_after = self._hedge_delay_s()
+        out["hedge_after_s"] = round(hedge_after, 3) if hedge_after is not None else None
+        return out
+
+
+llm_scheduler = LLMScheduler()
@@ -1,25 +1,33 @@
+from agents.audit import AuditEvent, audit_sink
 from agents.models import PipelineState
 
 from time import time
 from typing import Any
 
+from langgraph.config import get_config
+
 
 def _now_ms() -> int:
     return int(time() * 1000)
 
+def _thread_id() -> str | None:
+    try:
+        return get_config().get("configurable", {}).get("thread_id")
+    except RuntimeError:
+        # Outside a graph run
+        return None
+
 def log_event_patch(agent: str, event: str, data: dict | None = None) -> dict[str, Any]:
     """
     Returns a patch that can be merged into PipelineState via the audit_log reducer.
     Use this in workers too (since it doesn't need state).
+    With an audit sink the event is also queued for it here, so events of
+    patches that never reach the state (e.g. a failed worker's) are kept too.
     """
-    return {
-        "audit_log": [{
-            "ts_ms": _now_ms(),
-            "agent": agent,
-            "event": event,
-            "data": data or {},
-        }]
-    }
+    ev = AuditEvent(_now_ms(), agent, event, data or {})
+    if audit_sink is not None:
+        audit_sink.put(_thread_id(), ev)
+    return {"audit_log": [ev]}
 
 def log_event(state: PipelineState, agent: str, event: str, data: dict | None = None) -> dict[str, Any]:
     """
@@ -5,9 +5,11 @@ Stores all the data models used by each agent.
 from typing import Optional, Literal, List
 from typing_extensions import TypedDict, Annotated
 from pydantic import BaseModel, Field
-from operator import add
+from agents.audit import AuditEvent, add_audit
 
 Beat = Literal["A", "B", "C", "D", "E"]
+# "fanout": one generator call per beat; "batched": one call for all beats.
+GenerationMode = Literal["fanout", "batched"]
 
 class UserInput(BaseModel) :
     scholarship_name: str = Field(...,
@@ -64,10 +66,26 @@ class ValidationReport(BaseModel):
     repairs_applied: list[str] = Field(default_factory=list)
 
 
+class BeatValidation(BaseModel):
+    """
+    Memoized validator result for one beat, keyed by a fingerprint
+    of the assembled questions it was computed from.
+    """
+    fingerprint: str
+    reasons: list[str] = Field(default_factory=list)
+
+
 def merge_questions_by_beat(left: dict[Beat, List[QuestionObject]], right: dict[Beat, List[QuestionObject]]):
+    """
+    Workers append to their beat; an empty list resets the beat
+    (used to clear beats before they are regenerated).
+    """
     out = dict(left or {})
     for beat, qs in (right or {}).items():
-        out.setdefault(beat, []).extend(qs)
+        if not qs:
+            out[beat] = []
+        else:
+            out[beat] = [*out.get(beat, []), *qs]
     return out
 
 class PipelineState(TypedDict, total=False):
@@ -81,6 +99,10 @@ class PipelineState(TypedDict, total=False):
 
     # Planning
     beat_plan: list[BeatPlanItem]
+    # Per-run override of GENERATION_MODE
+    generation_mode: GenerationMode
+    # Per-run override of SPECULATIVE_PLANNING
+    speculative_planning: bool
 
     # Map outputs (per beat)
     
@@ -88,10 +110,15 @@ class PipelineState(TypedDict, total=False):
 
     # Reduce outputs
     final_questions_by_beat: dict[Beat, list[QuestionObject]]
+    # Fingerprint of the raw questions each beat was last assembled from,
+    # so a repair cycle only re-assembles the beats that changed.
+    assembled_fingerprints: dict[Beat, str]
     
     # Validation outputs
     failed_beats: list[Beat]
     failed_reasons: dict[Beat, list[str]]
+    # Per-beat validation memo; unchanged beats are not re-validated.
+    beat_validation: dict[Beat, BeatValidation]
 
     # Repair loop
     validation_report: ValidationReport
@@ -103,4 +130,5 @@ class PipelineState(TypedDict, total=False):
     # communications
     # Note that I use Annotated here to ensure
     # concurrent workers do not overwrite each other.
-    audit_log: Annotated[list[dict], add]
+    # add_audit keeps only the last AUDIT_LOG_MAX_EVENTS (see agents/audit.py).
+    audit_log: Annotated[list[AuditEvent], add_audit]
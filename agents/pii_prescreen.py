@@ -0,0 +1,78 @@
+"""
+Single-pass regex pre-screen that narrows the pattern recognizers Presidio runs.
+
+One compiled pattern walks the text once and records which pattern-based
+entity types could possibly match: an '@' for emails, a dotted host for
+URLs, a long digit run for phones/cards. The triggers over-approximate
+Presidio's recognizers, so an untriggered type can never have matched and
+dropping it leaves the results unchanged.
+
+The redactor then picks a tier:
+  "skip"     nothing to look for, Presidio is not called;
+  "patterns" only the triggered pattern recognizers, spaCy run without NER/parser
+             (lemmas are still needed for Presidio's context scoring);
+  "full"     NER plus the triggered pattern recognizers.
+NER types (PERSON, LOCATION) are never screened out: no cheap test on
+capitalization tells a sentence-initial name from any other first word, and
+the redactor's input always carries free text. tests/test_pii_prescreen.py
+checks that the tiers give the same spans as full analysis.
+"""
+
+
+from dataclasses import dataclass, field
+import re
+
+from agents.registry import registry
+
+PATTERN_ENTITIES = frozenset({"EMAIL_ADDRESS", "URL", "PHONE_NUMBER", "CREDIT_CARD"})
+
+_SCREEN_RE = re.compile(
+    r"(?P<email>@)"
+    r"|(?P<url>://|[A-Za-z0-9-]+\.[A-Za-z]{2,})"
+    r"|(?P<digits>[+(]?\d(?:[^\w\n]{0,3}\d)+)"
+)
+
+
+@dataclass
+class Screen:
+    pattern_entities: set[str] = field(default_factory=set)
+
+
+def screen(text: str) -> Screen:
+    out = Screen()
+    for m in _SCREEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == "email":
+            out.pattern_entities.update(("EMAIL_ADDRESS", "URL"))
+        elif kind == "url":
+            out.pattern_entities.add("URL")
+        elif sum(c.isdigit() for c in m.group()) >= 5:
+            out.pattern_entities.update(("PHONE_NUMBER", "CREDIT_CARD"))
+    return out
+
+
+def plan(text: str, entities: list[str]) -> tuple[str, list[str]]:
+    """
+    Returns (tier, entities to ask Presidio for).
+    Entity types outside PATTERN_ENTITIES are always kept and force "full".
+    """
+    s = screen(text)
+    wanted = [e for e in entities if e not in PATTERN_ENTITIES or e in s.pattern_entities]
+    if not wanted:
+        return "skip", []
+    if all(e in PATTERN_ENTITIES for e in wanted):
+        return "patterns", wanted
+    return "full", wanted
+
+
+def analyze_patterns_only(text: str, language: str, entities: list[str]) -> list:
+    """
+    Pattern recognizers only; spaCy still tokenizes/lemmatizes for context
+    scoring, but NER and the parser are skipped.
+    """
+    analyzer = registry.get("analyzer")
+    nlp_engine = analyzer.nlp_engine
+    nlp = nlp_engine.get_nlp(language)
+    doc = nlp(text, disable=[p for p in ("parser", "ner") if p in nlp.pipe_names])
+    artifacts = nlp_engine._doc_to_nlp_artifact(doc, language)
+    return analyzer.analyze(text=text, language=language, entities=entities, nlp_artifacts=artifacts)
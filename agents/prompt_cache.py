@@ -0,0 +1,56 @@
+"""
+Provider-agnostic hook for prompt-prefix caching.
+
+Prompts from agents/prompts.py are laid out as a stable prefix (system prompt,
+rules, program definitions, redacted input) followed by the per-call part
+(beat context). The prefix is byte-identical across the beats of a run, so
+providers that cache prefixes automatically reuse it as is. Providers that need
+an explicit marker can register a hook that rewrites the messages, given how
+many leading characters of the last message belong to the prefix.
+"""
+
+from typing import Callable
+
+PrefixHook = Callable[[list[dict], int], list]
+
+
+class Prompt(list):
+    """
+    Chat messages (a plain list of role/content dicts) that remember where the
+    shared prefix of the last message ends.
+    """
+
+    def __init__(self, messages: list[dict], prefix_chars: int) -> None:
+        super().__init__(messages)
+        self.prefix_chars = prefix_chars
+
+
+_hook: PrefixHook | None = None
+
+
+def set_prefix_hook(hook: PrefixHook | None) -> None:
+    global _hook
+    _hook = hook
+
+
+def apply_prefix_hook(messages: list) -> list:
+    """
+    The messages to send to the model (unchanged unless a hook is set).
+    """
+    if _hook is None or not isinstance(messages, Prompt):
+        return messages
+    return _hook(list(messages), messages.prefix_chars)
+
+
+def cache_control_blocks(messages: list[dict], prefix_chars: int) -> list[dict]:
+    """
+    Example hook for providers that take content blocks with a "cache_control"
+    breakpoint: splits the last message into the cached prefix and the rest.
+    """
+    *head, last = messages
+    content = last["content"]
+    blocks = [
+        {"type": "text", "text": content[:prefix_chars], "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": content[prefix_chars:]},
+    ]
+    return [*head, {**last, "content": blocks}]
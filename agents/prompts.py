@@ -1,7 +1,12 @@
+from dataclasses import dataclass
+from functools import lru_cache
 from textwrap import dedent
+from typing import get_args
+
 from agents.models import BeatPlanItem, UserInput
+from agents.prompt_cache import Prompt
 
-from textwrap import dedent
+PROGRAM_TYPES: tuple[str, ...] = get_args(UserInput.model_fields["program_type"].annotation)
 
 def _program_slots(program_type: str) -> str:
     if program_type == "Graduate":
@@ -43,6 +48,7 @@ def _build_canonical_input(user_input: UserInput) -> str:
         f"{resume_block}\n"
     )
 
+@lru_cache(maxsize=64)
 def _beat_defs(program_type: str) -> str:
 
     if program_type == "Community Grant":
@@ -114,20 +120,39 @@ def _beat_defs(program_type: str) -> str:
         )
 
 
-def beat_planner_messages(program_type: str, redacted_input: str):
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A prompt precompiled for one program type. Everything up to the redacted
+    input is static, so calls that share the input share a byte-identical
+    prefix; per-call content goes in the tail.
+    """
+    system: str
+    head: str
+
+    def messages(self, redacted_input: str, tail: str = "") -> Prompt:
+        prefix = self.head + redacted_input + "\n"
+        return Prompt(
+            [
+                {"role": "system", "content": self.system},
+                {"role": "user", "content": prefix + tail},
+            ],
+            prefix_chars=len(prefix),
+        )
 
-    system = dedent(
-        """\
+
+_PLANNER_SYSTEM = dedent(
+    """\
     You are a beat planner for a Statement of Purpose writing assistant. \
       A beat is a point or story to write around.
     The writing assistant generates questions based on the user's current writing, \
       inspired by the snowflake method of writing.
     Return structured data only. No prose.
     """
-    )
+)
 
-    rules = dedent(
-        """\
+_PLANNER_RULES = dedent(
+    """\
     Create a plan for beats A–E.
 
     For each beat, output:
@@ -150,39 +175,18 @@ def beat_planner_messages(program_type: str, redacted_input: str):
       persistence, and so on. \
       For guidance, you may give a hint such as `
     """
-    )
-
-    user_ctx = dedent(
-        f"""\
-    {_beat_defs(program_type)}
-    Redacted canonical input (source of truth):
-    {redacted_input}
+)
 
-    Return a beat plan.
-    """
-    )
-
-    return [
-        {"role": "system", "content": system},
-        {"role": "user", "content": rules + "\n\n" + user_ctx},
-    ]
-
-
-def question_generator_messages(
-    task: BeatPlanItem, program_type: str, redacted_input: str
-):
-    system = dedent(
-        """\
+_GENERATOR_SYSTEM = dedent(
+    """\
     You generate tailored questions to help an applicant write their Statement of Purpose.
     Return structured data only. No prose.
     """
-    )
+)
 
-    regen_mode = bool(task.guidance and "Regenerate questions" in task.guidance)
-
-    base_rules = dedent(
-        """\
-    Generate exactly 2 questions for the given beat.
+_GENERATOR_RULES = dedent(
+    """\
+    Generate exactly 2 questions for the beat given at the end.
 
     Output format:
     {
@@ -204,19 +208,45 @@ def question_generator_messages(
       * Q1: narrative/decision/tradeoff
       * Q2: evidence/validation/comparison/feedback signal
     """
-    )
+)
+
+_MULTI_BEAT_RULES = dedent(
+    """\
+    Generate exactly 2 questions for each of the beats given at the end.
+
+    Output format:
+    {
+      "items": [
+        {"beat": "A|B|C|D|E", "question": "...?", "intent": "..."},
+        ...
+      ]
+    }
 
-    grounding_rules = dedent(
-        """\
+    Constraints:
+    - Structured data only.
+    - Questions only: each question must be a single line ending with '?'.
+    - Do NOT include any PII or placeholders like <NAME>, <EMAIL>, <PHONE>, [ORG_1].
+    - intent must be <= 12 words and describe what the question tests.
+    - beat must equal the beat the question was written for; list the beats in order.
+    - Keep wording concise.
+    - The two questions of a beat must be meaningfully different:
+      * Q1: narrative/decision/tradeoff
+      * Q2: evidence/validation/comparison/feedback signal
+    - Questions must not repeat across beats.
+    """
+)
+
+_GROUNDING_RULES = dedent(
+    """\
     Grounding rules:
     - Do NOT introduce specific names, organizations, dates, locations, or numbers
       unless they appear verbatim in the provided redacted input.
     - If a specific detail is missing, ask for it instead of assuming it.
     """
-    )
+)
 
-    anti_generic_rules = dedent(
-        """\
+_ANTI_GENERIC_RULES = dedent(
+    """\
     Anti-generic rules:
     - Each question must be anchored: it must include an exact short phrase from task.anchors
       (verbatim) OR explicitly reference a specific section/item from the redacted input
@@ -224,48 +254,128 @@ def question_generator_messages(
     - Avoid generic openers like “Tell me about a time…” unless tied to a named anchor.
     - No filler: every question must point to a concrete story, decision, or evidence.
     """
-    )
+)
 
-    regen_rules = (
-        dedent(
-            """\
+_REGEN_RULES = dedent(
+    """\
     Regeneration rule:
     - Previous output failed validation. Make questions more grounded and less assumption-heavy.
     - Prefer asking for missing details rather than stating facts.
     """
+)
+
+
+@lru_cache(maxsize=64)
+def planner_template(program_type: str) -> PromptTemplate:
+    return PromptTemplate(
+        system=_PLANNER_SYSTEM,
+        head=(
+            _PLANNER_RULES + "\n\n"
+            + _beat_defs(program_type) + "\n"
+            + "Redacted canonical input (source of truth):\n"
+        ),
+    )
+
+
+@lru_cache(maxsize=64)
+def generator_template(program_type: str, multi_beat: bool = False) -> PromptTemplate:
+    return PromptTemplate(
+        system=_GENERATOR_SYSTEM,
+        head=(
+            (_MULTI_BEAT_RULES if multi_beat else _GENERATOR_RULES)
+            + _GROUNDING_RULES
+            + _ANTI_GENERIC_RULES
+            + "\n\n"
+            + _beat_defs(program_type) + "\n"
+            + "Redacted input (source of truth):\n"
+        ),
+    )
+
+
+# What a beat plan typically asks for, used before (or instead of) the planner's
+# answer (SPECULATIVE_PLANNING in agents/config.py).
+_DEFAULT_PLAN: dict[str, tuple[list[str], str]] = {
+    "A": (["why this opportunity specifically", "how past experience leads here"],
+          "Connect the applicant's motivation to what this program offers."),
+    "B": (["a concrete result", "the applicant's own contribution"],
+          "Probe the strongest piece of evidence in the input."),
+    "C": (["who benefited", "what changed because of the work"],
+          "Ask for the effect of the work on other people."),
+    "D": (["a decision the applicant made", "how they handled disagreement"],
+          "Ask about initiative and responsibility in a specific situation."),
+    "E": (["a setback or mistake", "what the applicant does differently now"],
+          "Ask what the applicant learned and how it changed them."),
+}
+
+
+@lru_cache(maxsize=64)
+def default_beat_plan(program_type: str) -> tuple[BeatPlanItem, ...]:
+    """
+    A generic A-E plan for a program type, independent of the input.
+    """
+    research = program_type in ("Graduate", "Undergrad")
+    return tuple(
+        BeatPlanItem(
+            beat=beat,
+            missing=missing,
+            guidance=guidance + (" Tie it to research fit." if research and beat == "A" else ""),
         )
-        if regen_mode
-        else ""
+        for beat, (missing, guidance) in _DEFAULT_PLAN.items()
+    )
+
+
+def precompile_templates() -> None:
+    """
+    Builds every program type's templates up front (called at import).
+    """
+    for program_type in PROGRAM_TYPES:
+        planner_template(program_type)
+        generator_template(program_type)
+        generator_template(program_type, multi_beat=True)
+
+
+def _is_regen(task: BeatPlanItem) -> bool:
+    return bool(task.guidance and "Regenerate questions" in task.guidance)
+
+
+def _beat_ctx(task: BeatPlanItem) -> str:
+    return (
+        f"Beat: {task.beat}\n"
+        f"Missing: {task.missing}\n"
+        f"Guidance: {task.guidance}\n"
+        f"Anchors: {getattr(task, 'anchors', [])}\n"
     )
 
-    beat_ctx = dedent(
-        f"""\
-    Beat: {task.beat}
-    Missing: {task.missing}
-    Guidance: {task.guidance}
-    Anchors: {getattr(task, "anchors", [])}
+
+def beat_planner_messages(program_type: str, redacted_input: str) -> Prompt:
+    return planner_template(program_type).messages(redacted_input, "\nReturn a beat plan.\n")
+
+
+def question_generator_messages(
+    task: BeatPlanItem, program_type: str, redacted_input: str
+) -> Prompt:
     """
+    Static rules and the redacted input first (shared by all five beats of a
+    run), then the regeneration rule if any and the beat's own context.
+    """
+    regen_rules = _REGEN_RULES if _is_regen(task) else ""
+    return generator_template(program_type).messages(
+        redacted_input, "\n" + regen_rules + _beat_ctx(task)
     )
 
-    user = dedent(
-        f"""\
-    {_beat_defs(program_type)}
-    {beat_ctx}
 
-    Redacted input (source of truth):
-    {redacted_input}
+def multi_beat_generator_messages(
+    tasks: list[BeatPlanItem], program_type: str, redacted_input: str
+) -> Prompt:
+    """
+    One prompt for several beats (GENERATION_MODE "batched"): the same rules as
+    question_generator_messages, with every beat's plan item listed.
     """
+    regen_rules = _REGEN_RULES if any(_is_regen(t) for t in tasks) else ""
+    beat_ctx = "\n".join(_beat_ctx(t) for t in tasks)
+    return generator_template(program_type, multi_beat=True).messages(
+        redacted_input, "\n" + regen_rules + beat_ctx
     )
 
-    return [
-        {"role": "system", "content": system},
-        {
-            "role": "user",
-            "content": base_rules
-            + grounding_rules
-            + anti_generic_rules
-            + regen_rules
-            + "\n\n"
-            + user,
-        },
-    ]
+
+precompile_templates()
@@ -0,0 +1,391 @@
+"""
+Redaction service that coalesces concurrent Presidio requests into micro-batches.
+
+Each caller blocks on analyze(); under load a background thread gathers requests
+for up to max_wait_ms (or batch_size items), runs them through spaCy's nlp.pipe via
+Presidio's BatchAnalyzerEngine, and hands each caller its own results.
+
+With REDACTION_SEGMENT_CACHE the redactor caches each line's results
+(SegmentCache). Input with no line seen before is analyzed as a whole text,
+as without the cache, and its results are split into the cache by line. A
+resubmit that shares lines with an earlier input reuses those lines and only
+analyzes the changed ones, each run of adjacent changed lines as one text;
+offsets are shifted back into the full text. Lines touched by a result that
+crosses a line break are never cached, so they are re-analyzed together. What
+the cache cannot reproduce is context from an unchanged neighbour: spaCy NER
+and Presidio's context words don't see past the edges of a changed run.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from hashlib import sha256
+from os import getpid
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Any
+
+from presidio_analyzer import RecognizerResult
+
+from agents.config import (
+    REDACTION_BATCHING,
+    REDACTION_BATCH_SIZE,
+    REDACTION_MAX_WAIT_MS,
+    REDACTION_SEGMENT_CACHE,
+    REDACTION_SEGMENT_CACHE_MAX_ENTRIES,
+    PII_PRESCREEN,
+)
+from agents.models import PiiSpan
+from agents.pii_prescreen import plan, analyze_patterns_only
+from agents.registry import registry
+
+DEFAULT_PII_ENTITIES = [
+    "PERSON",
+    "PHONE_NUMBER",
+    "EMAIL_ADDRESS",
+    "LOCATION",
+    "CREDIT_CARD",
+    "URL",
+]
+
+
+def analyze_batch(
+    texts: list[str], language: str, entities: list[list[str]], batch_size: int
+) -> list[list]:
+    """
+    Presidio analysis of several texts with a single nlp.pipe pass.
+    Each text has its own entity list (the pre-screen may narrow it).
+    """
+    analyzer = registry.get("analyzer")
+    artifacts = analyzer.nlp_engine.process_batch(texts, language, batch_size=batch_size)
+    return [
+        analyzer.analyze(text=text, language=language, entities=ents, nlp_artifacts=art)
+        for (text, art), ents in zip(artifacts, entities)
+    ]
+
+
+class RedactionService:
+    def __init__(
+        self,
+        *,
+        batch_size: int = REDACTION_BATCH_SIZE,
+        max_wait_ms: float = REDACTION_MAX_WAIT_MS,
+    ) -> None:
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self._queue: Queue = Queue()
+        self._lock = Lock()
+        self._pid: int | None = None
+        self._counters = {"requests": 0, "batches": 0, "max_batch": 0}
+
+    def analyze(self, text: str, *, language: str = "en", entities: list[str] | None = None) -> list:
+        """
+        Presidio RecognizerResults for one text; blocks until its batch has run.
+        """
+        return self.analyze_many([text], language=language, entities=[entities])[0]
+
+    def analyze_many(
+        self, texts: list[str], *, language: str = "en", entities: list[list[str] | None]
+    ) -> list[list]:
+        """
+        Several texts (one entity list each), queued together so they can share
+        a batch; blocks until all have run.
+        """
+        self._ensure_worker()
+        futs: list[Future] = []
+        for text, ents in zip(texts, entities):
+            fut: Future = Future()
+            self._queue.put((text, language, tuple(ents or DEFAULT_PII_ENTITIES), fut))
+            futs.append(fut)
+        return [fut.result() for fut in futs]
+
+    def _ensure_worker(self) -> None:
+        # Threads don't survive fork, so (re)start lazily in the process that uses us.
+        if self._pid == getpid():
+            return
+        with self._lock:
+            if self._pid != getpid():
+                Thread(target=self._loop, name="redaction-batcher", daemon=True).start()
+                self._pid = getpid()
+
+    def _collect(self) -> list[tuple]:
+        batch = [self._queue.get()]
+        # A lone request runs right away; we only wait for stragglers when
+        # others are already queued (i.e. under concurrent load).
+        if self._queue.empty():
+            return batch
+        deadline = perf_counter() + self.max_wait_s
+        while len(batch) < self.batch_size:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            self._counters["requests"] += len(batch)
+            self._counters["batches"] += 1
+            self._counters["max_batch"] = max(self._counters["max_batch"], len(batch))
+
+            # One pipe call per language; normally there is one group.
+            groups: dict[str, list[tuple]] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            for language, items in groups.items():
+                try:
+                    results = analyze_batch(
+                        [text for text, *_ in items], language,
+                        [list(ents) for _, _, ents, _ in items], self.batch_size,
+                    )
+                except Exception as e:
+                    for *_, fut in items:
+                        fut.set_exception(e)
+                    continue
+                for (*_, fut), res in zip(items, results):
+                    fut.set_result(res)
+
+    def stats(self) -> dict[str, Any]:
+        out = dict(self._counters)
+        out["avg_batch"] = round(out["requests"] / out["batches"], 2) if out["batches"] else 0.0
+        out["queue_depth"] = self._queue.qsize()
+        return out
+
+
+redaction_service = RedactionService()
+
+
+def analyze_text(
+    text: str,
+    *,
+    language: str = "en",
+    entities: list[str] | None = None,
+    batch: bool = REDACTION_BATCHING,
+) -> tuple[list, str]:
+    """
+    Presidio results for the redactor, plus the tier that produced them
+    ("skip", "patterns" or "full"; see agents/pii_prescreen.py).
+    """
+    entities = entities or DEFAULT_PII_ENTITIES
+    tier = "full"
+    if PII_PRESCREEN:
+        tier, entities = plan(text, entities)
+        if tier == "skip":
+            return [], tier
+        if tier == "patterns":
+            return analyze_patterns_only(text, language, entities), tier
+
+    if batch:
+        # Coalesced with concurrent requests into one nlp.pipe batch.
+        return redaction_service.analyze(text, language=language, entities=entities), tier
+    return registry.get("analyzer").analyze(text=text, language=language, entities=entities), tier
+
+
+class SegmentCache:
+    """
+    LRU of Presidio results per text segment. Keys hash (language, entities,
+    pre-screen settings, segment); values are the pre-screen tier and
+    (entity_type, start, end, score) tuples relative to the segment.
+    """
+
+    def __init__(self, max_entries: int = REDACTION_SEGMENT_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._mem: OrderedDict[str, tuple[str, tuple]] = OrderedDict()
+        self._lock = Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(segment: str, language: str, entities: list[str]) -> str:
+        screen = "on" if PII_PRESCREEN else "off"
+        blob = "\x1f".join((language, ",".join(entities), screen, segment))
+        return sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> tuple[str, tuple] | None:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is None:
+                self._counters["misses"] += 1
+                return None
+            self._mem.move_to_end(key)
+            self._counters["hits"] += 1
+            return hit
+
+    def set(self, key: str, tier: str, results: list) -> tuple[str, tuple]:
+        value = (tier, tuple((r.entity_type, r.start, r.end, r.score) for r in results))
+        with self._lock:
+            self._mem[key] = value
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+                self._counters["evictions"] += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._mem)}
+
+
+segment_cache = SegmentCache()
+
+_TIER_RANK = {"skip": 0, "patterns": 1, "full": 2}
+
+
+def _segments(text: str) -> list[tuple[int, str]]:
+    """
+    (offset, line) for every non-blank line of text.
+    """
+    out, offset = [], 0
+    for line in text.split("\n"):
+        if line.strip():
+            out.append((offset, line))
+        offset += len(line) + 1
+    return out
+
+
+def _fill(cache: SegmentCache, segments: list[tuple[int, str]], keys: list[str],
+          tier: str, results: list) -> None:
+    """
+    Caches a whole-text analysis line by line. A line touched by a result
+    that crosses into another line is not cached.
+    """
+    for (offset, segment), key in zip(segments, keys):
+        end = offset + len(segment)
+        inside = [r for r in results if offset <= r.start and r.end <= end]
+        if any(r.start < end and r.end > offset and not (offset <= r.start and r.end <= end)
+               for r in results):
+            continue
+        cache.set(key, tier, [
+            RecognizerResult(r.entity_type, r.start - offset, r.end - offset, r.score) for r in inside
+        ])
+
+
+def _runs(indices: list[int]) -> list[list[int]]:
+    """
+    Consecutive segment indices grouped into runs.
+    """
+    runs: list[list[int]] = []
+    for i in indices:
+        if runs and runs[-1][-1] == i - 1:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    return runs
+
+
+def analyze_segments(
+    text: str,
+    *,
+    language: str = "en",
+    entities: list[str] | None = None,
+    batch: bool = REDACTION_BATCHING,
+    cache: SegmentCache = segment_cache,
+) -> tuple[list, str, int]:
+    """
+    analyze_text, reusing the cached results of lines seen before. With no
+    line cached the whole text is analyzed (spaCy and Presidio's context
+    scoring see every line's neighbours) and its results fill the cache.
+    Otherwise each run of adjacent lines that miss is analyzed as one text,
+    the runs needing spaCy NER together in one nlp.pipe pass. A result that
+    crosses a line break is never cached, so both its lines miss again and
+    are analyzed together.
+    Returns (results with offsets into text, highest tier, cached lines).
+    """
+    entities = entities or DEFAULT_PII_ENTITIES
+    segments = _segments(text)
+    keys = [cache.key(segment, language, entities) for _, segment in segments]
+    found: dict[int, tuple[str, tuple]] = {
+        i: hit for i, key in enumerate(keys) if (hit := cache.get(key)) is not None
+    }
+    hits = len(found)
+    if not hits:
+        results, tier = analyze_text(text, language=language, entities=entities, batch=batch)
+        _fill(cache, segments, keys, tier, results)
+        return results, tier, 0
+
+    tier, merged = "skip", []
+    full: list[tuple[list[int], int, str, list[str]]] = []
+    for run in _runs([i for i in range(len(segments)) if i not in found]):
+        start = segments[run[0]][0]
+        end = segments[run[-1]][0] + len(segments[run[-1]][1])
+        chunk = text[start:end]
+        run_tier, wanted = plan(chunk, entities) if PII_PRESCREEN else ("full", entities)
+        if run_tier == "full":
+            full.append((run, start, chunk, wanted))
+            continue
+        results = analyze_patterns_only(chunk, language, wanted) if run_tier == "patterns" else []
+        tier = max(tier, run_tier, key=_TIER_RANK.__getitem__)
+        merged.extend(_merge_run(cache, segments, keys, run, start, run_tier, results))
+
+    if full:
+        texts = [chunk for _, _, chunk, _ in full]
+        wanted_lists = [wanted for *_, wanted in full]
+        if batch:
+            batch_results = redaction_service.analyze_many(texts, language=language, entities=wanted_lists)
+        else:
+            batch_results = analyze_batch(texts, language, wanted_lists, REDACTION_BATCH_SIZE)
+        tier = "full"
+        for (run, start, _, _), results in zip(full, batch_results):
+            merged.extend(_merge_run(cache, segments, keys, run, start, "full", results))
+
+    for i, (seg_tier, items) in found.items():
+        offset = segments[i][0]
+        tier = max(tier, seg_tier, key=_TIER_RANK.__getitem__)
+        merged.extend(
+            RecognizerResult(entity_type, start + offset, end + offset, score)
+            for entity_type, start, end, score in items
+        )
+    # Presidio's own result order (EntityRecognizer.remove_duplicates).
+    merged.sort(key=lambda r: (-r.score, r.start, -(r.end - r.start)))
+    return merged, tier, hits
+
+
+def _merge_run(cache: SegmentCache, segments: list[tuple[int, str]], keys: list[str],
+               run: list[int], start: int, tier: str, results: list) -> list:
+    """
+    Shifts a run's results into the full text and caches its lines.
+    """
+    shifted = [RecognizerResult(r.entity_type, r.start + start, r.end + start, r.score) for r in results]
+    _fill(cache, [segments[i] for i in run], [keys[i] for i in run], tier, shifted)
+    return shifted
+
+
+def redact(
+    text: str,
+    *,
+    language: str,
+    entities: list[str],
+    operators: dict,
+    batch: bool = REDACTION_BATCHING,
+    segment_cache: bool = REDACTION_SEGMENT_CACHE,
+) -> tuple[list[PiiSpan], str, str, int]:
+    """
+    Full redaction of one text: (pii_spans, redacted text, analysis tier,
+    lines served from the segment cache).
+    Module-level so it can run in a worker process (agents/executor.py).
+    """
+    if segment_cache:
+        results, tier, cached = analyze_segments(text, language=language, entities=entities, batch=batch)
+    else:
+        (results, tier), cached = analyze_text(text, language=language, entities=entities, batch=batch), 0
+
+    pii_spans = [
+        PiiSpan(
+            start=r.start, end=r.end, pii_type=r.entity_type,
+            confidence=float(r.score) if r.score is not None else None,
+        )
+        for r in results
+    ]
+
+    redacted = registry.get("anonymizer").anonymize(
+        text=text, analyzer_results=results, operators=operators
+    ).text
+    return pii_spans, redacted, tier, cached
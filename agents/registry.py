@@ -0,0 +1,141 @@
+"""
+Lazy registry for the heavy runtime objects (NER models, Presidio engines, chat model, graph).
+
+Nothing is loaded at import time. Each object is built on first `get()`,
+or up front with `warmup()` (used by the preload-then-fork startup mode).
+"""
+
+from os import environ
+from threading import RLock
+from time import perf_counter
+from typing import Any, Callable
+
+from agents.config import LLM_BACKEND, LLM_MODEL
+
+
+class ModelRegistry:
+    def __init__(self) -> None:
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._instances: dict[str, Any] = {}
+        self._load_ms: dict[str, float] = {}
+        self._lock = RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        # Fast path: no lock once loaded.
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"No model registered under '{name}'.")
+                t0 = perf_counter()
+                self._instances[name] = self._factories[name]()
+                self._load_ms[name] = round((perf_counter() - t0) * 1000, 2)
+            return self._instances[name]
+
+    def loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def reset(self, name: str) -> None:
+        """
+        Drop a loaded instance so the next get() rebuilds it
+        (e.g. network clients after a fork).
+        """
+        with self._lock:
+            self._instances.pop(name, None)
+            self._load_ms.pop(name, None)
+
+    def warmup(self, names: list[str] | None = None) -> dict[str, float]:
+        """
+        Load the given models (default: all registered) and return load latency in ms.
+        """
+        for name in names or list(self._factories):
+            self.get(name)
+        return dict(self._load_ms)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "registered": sorted(self._factories),
+            "loaded": sorted(self._instances),
+            "load_ms": dict(self._load_ms),
+        }
+
+
+def _load_analyzer():
+    # Importing presidio_analyzer pulls in spaCy; keep it off the import path.
+    from presidio_analyzer import AnalyzerEngine
+
+    return AnalyzerEngine()
+
+
+def _load_anonymizer():
+    from presidio_anonymizer import AnonymizerEngine
+
+    return AnonymizerEngine()
+
+
+def _load_ner_model():
+    try:
+        from spacy import load
+
+        return load("en_core_web_sm", disable=["parser", "lemmatizer"])
+    except Exception:
+        return None
+
+
+def _load_cohere_llm():
+    from langchain_cohere import ChatCohere
+
+    return ChatCohere(model=LLM_MODEL)
+
+
+def _load_fake_llm():
+    from agents.fake_llm import fake_llm_from_config
+
+    return fake_llm_from_config()
+
+
+# Chat model backends selectable with LLM_BACKEND (config or environment).
+LLM_BACKENDS: dict[str, Callable[[], Any]] = {
+    "cohere": _load_cohere_llm,
+    "fake": _load_fake_llm,
+}
+
+
+def _load_llm():
+    backend = environ.get("LLM_BACKEND") or LLM_BACKEND
+    if backend not in LLM_BACKENDS:
+        raise KeyError(f"Unknown LLM backend '{backend}'; expected one of {sorted(LLM_BACKENDS)}.")
+    return LLM_BACKENDS[backend]()
+
+
+def _load_graph():
+    from agents.workflow import GRAPH
+
+    return GRAPH
+
+
+def _load_agraph():
+    from agents.checkpoints import make_checkpointer
+    from agents.workflow import create_graph
+
+    return create_graph(use_async=True, checkpointer=make_checkpointer(use_async=True))
+
+
+registry = ModelRegistry()
+registry.register("analyzer", _load_analyzer)
+registry.register("anonymizer", _load_anonymizer)
+registry.register("ner_model", _load_ner_model)
+registry.register("llm", _load_llm)
+registry.register("graph", _load_graph)
+registry.register("agraph", _load_agraph)
+
+# Models that are safe to share copy-on-write across forked workers.
+# The chat model holds network connection pools, so it is rebuilt per worker.
+# "agraph" is built by asgi.py inside its event loop (the async checkpointer needs one).
+PRELOAD_MODELS = ["analyzer", "anonymizer", "ner_model", "graph"]
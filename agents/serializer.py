@@ -0,0 +1,67 @@
+"""
+JSON encoding of the NDJSON events and the run result.
+
+Events and results keep the pydantic models (PiiSpan, QuestionObject,
+ValidationReport, ...) as they are, and pydantic_core.to_json serializes them
+directly, without first building a dict tree with model_dump the way
+format_response + json.dumps did. Output is compact UTF-8 bytes.
+
+A run request can ask for only some result fields ("fields": [...]) or for
+"compact": true (what the results page renders), so clients that don't show
+the debug panels (canonical/redacted input, raw questions, beat plan) don't
+receive them. benchmarks/serialization.py measures bytes and encode time per run.
+"""
+
+from typing import Any
+
+from pydantic_core import to_json
+
+# Result fields and their defaults, as format_response builds them.
+_RESULT_DEFAULTS: dict[str, Any] = {
+    "final_questions_by_beat": {},
+    "pii_spans": [],
+    "redacted_input": "",
+    "canonical_input": "",
+    "beat_plan": [],
+    "questions_by_beat": {},
+    "validation_report": None,
+    "audit_timeline": [],
+    "fallback_used": False,
+}
+RESULT_FIELDS = tuple(_RESULT_DEFAULTS)
+COMPACT_FIELDS = ("final_questions_by_beat", "validation_report")
+
+
+def result_payload(state: dict[str, Any], fields: tuple[str, ...] = RESULT_FIELDS) -> dict[str, Any]:
+    """
+    format_response(state) restricted to `fields`, with the models left in place.
+    """
+    return {f: state.get(f, _RESULT_DEFAULTS[f]) for f in fields}
+
+
+def parse_result_fields(data: dict[str, Any]) -> tuple[str, ...]:
+    """
+    The result fields of a request: "fields" (a list, or a comma-separated
+    string in a query) or "compact" (true/"1"); all fields by default.
+    Raises ValueError for unknown fields or an invalid compact flag.
+    """
+    fields, compact = data.get("fields"), data.get("compact")
+    if isinstance(compact, str):
+        compact = {"1": True, "true": True, "0": False, "false": False}.get(compact.lower(), compact)
+    if compact is not None and not isinstance(compact, bool):
+        raise ValueError("compact must be true or false.")
+    if fields is None:
+        return COMPACT_FIELDS if compact else RESULT_FIELDS
+    if isinstance(fields, str):
+        fields = [f for f in fields.split(",") if f]
+    if not isinstance(fields, list) or not fields or any(f not in _RESULT_DEFAULTS for f in fields):
+        raise ValueError(f"fields must be a non-empty list of {list(RESULT_FIELDS)}.")
+    return tuple(dict.fromkeys(fields))
+
+
+def dumps(obj: Any) -> bytes:
+    return to_json(obj)
+
+
+def ndjson(obj: dict[str, Any]) -> bytes:
+    return to_json(obj) + b"\n"
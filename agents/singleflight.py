@@ -0,0 +1,325 @@
+"""
+Single-flight coalescing of identical run_stream requests.
+
+Double-clicks, client retries and refreshes of a shared link send the same
+input again while its run is still going (or has just finished). Requests are
+keyed by their Idempotency-Key header, or else by the client (the admission
+client header or address) and a hash of the validated input and run options. The first request of a key starts one run in the
+background (a thread for Flask, a task for ASGI), whose NDJSON lines are
+serialized once into a buffer; that request and every duplicate follow the
+buffer from the start, so late joiners replay what they missed and then
+continue live. Because the run doesn't belong to any one client, a
+disconnecting client doesn't cancel it for the others.
+
+Finished runs stay for SINGLEFLIGHT_WINDOW_S (at most SINGLEFLIGHT_MAX_COMPLETED
+of them), so an immediate repeat is served from the buffer. Runs that fail or
+end without a result (e.g. timed out in the admission queue) are not kept. Reusing an Idempotency-Key with a different request is a conflict.
+
+A running flight is also registered under its session's thread_id, so
+resume_stream attaches to it instead of starting a second run of the same
+session, and regen_stream refuses the session until it is done.
+
+Admission (agents/admission.py) applies to the request that starts a run
+only, through run()'s admit hook; a refused run is dropped at once. The
+run's "queued" events are transient: a follower that joins later skips the
+positions that were already superseded.
+Outcomes are counted in sopcopilot_run_requests_total and /health.
+"""
+
+from asyncio import Condition as AsyncCondition, create_task
+from collections import OrderedDict
+from hashlib import sha256
+from json import dumps
+from threading import Condition, Lock, Thread
+from time import monotonic
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from agents.config import SINGLEFLIGHT_MAX_COMPLETED, SINGLEFLIGHT_WINDOW_S
+from agents.models import UserInput
+from agents.serializer import ndjson
+from agents.telemetry import record_flight
+
+
+def request_fingerprint(user_input: UserInput, **options: Any) -> str:
+    """
+    Hash of the validated input and the options that change the run or its output.
+    """
+    blob = user_input.model_dump_json() + dumps(options, sort_keys=True, default=list)
+    return sha256(blob.encode("utf-8")).hexdigest()
+
+
+class Flight:
+    """
+    One run's NDJSON lines, followed by any number of readers (threads).
+    """
+
+    def __init__(self, fingerprint: str) -> None:
+        self.fingerprint = fingerprint
+        self.lines: list[bytes] = []
+        self.done = False
+        self.error: BaseException | None = None
+        # Whether the run ended with its "result" event.
+        self.complete = False
+        self.finished_at: float | None = None
+        # The session the run belongs to, if it has one.
+        self.thread_id: str | None = None
+        # Indexes of lines that only matter until the next one (queue positions).
+        self.transient: set[int] = set()
+        self._cond = Condition()
+
+    def publish(self, line: bytes, transient: bool = False) -> None:
+        with self._cond:
+            if transient:
+                self.transient.add(len(self.lines))
+            self.lines.append(line)
+            self._cond.notify_all()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        with self._cond:
+            self.error = error
+            self.done = True
+            self.finished_at = monotonic()
+            self._cond.notify_all()
+
+    def follow(self) -> Iterator[bytes]:
+        """
+        Every line from the first, then new ones as they come; re-raises the
+        run's error at the end, as the run itself would have. Transient lines
+        already followed by another one are skipped.
+        """
+        i = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: i < len(self.lines) or self.done)
+                new, done = self._fresh(i), self.done
+            i += len(new)
+            yield from (line for line in new if line is not None)
+            if done and i == len(self.lines):
+                if self.error is not None:
+                    raise self.error
+                return
+
+    def _fresh(self, i: int) -> list[bytes | None]:
+        # Lines from i on, with superseded transient ones as None. Caller holds the lock.
+        last = len(self.lines) - 1
+        return [None if j in self.transient and j < last else line
+                for j, line in enumerate(self.lines[i:], i)]
+
+
+class AsyncFlight(Flight):
+    """
+    The same, for readers and a producer on one event loop.
+    """
+
+    def __init__(self, fingerprint: str) -> None:
+        super().__init__(fingerprint)
+        self._acond = AsyncCondition()
+        # The producer task (the event loop only keeps a weak reference).
+        self.task = None
+
+    async def apublish(self, line: bytes, transient: bool = False) -> None:
+        async with self._acond:
+            if transient:
+                self.transient.add(len(self.lines))
+            self.lines.append(line)
+            self._acond.notify_all()
+
+    async def afinish(self, error: BaseException | None = None) -> None:
+        async with self._acond:
+            self.error = error
+            self.done = True
+            self.finished_at = monotonic()
+            self._acond.notify_all()
+
+    async def afollow(self) -> AsyncIterator[bytes]:
+        i = 0
+        while True:
+            async with self._acond:
+                await self._acond.wait_for(lambda: i < len(self.lines) or self.done)
+                new, done = self._fresh(i), self.done
+            i += len(new)
+            for line in new:
+                if line is not None:
+                    yield line
+            if done and i == len(self.lines):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SingleFlight:
+    """
+    Flights by key: running ones, and finished ones within the window.
+    """
+
+    def __init__(self, *, window_s: float = SINGLEFLIGHT_WINDOW_S,
+                 max_completed: int = SINGLEFLIGHT_MAX_COMPLETED) -> None:
+        self.window_s = window_s
+        self.max_completed = max_completed
+        self._running: dict[str, Flight] = {}
+        self._completed: OrderedDict[str, Flight] = OrderedDict()
+        # Running flights by the thread_id of the session they run.
+        self._threads: dict[str, Flight] = {}
+        self._lock = Lock()
+        self._counters = {"leader": 0, "joined": 0, "replayed": 0, "conflict": 0}
+
+    def _claim(self, key: str, fingerprint: str, flight_cls: type[Flight],
+               thread_id: str | None = None) -> tuple[Flight | None, str]:
+        """
+        (flight, outcome): "leader" for a new flight (the caller starts it),
+        "joined"/"replayed" for a running/finished one, (None, "conflict")
+        when the key was used for a different request.
+        """
+        with self._lock:
+            now = monotonic()
+            while self._completed:
+                oldest = next(iter(self._completed.values()))
+                if now - oldest.finished_at <= self.window_s and len(self._completed) <= self.max_completed:
+                    break
+                self._completed.popitem(last=False)
+
+            if key in self._running:
+                flight, outcome = self._running[key], "joined"
+            elif key in self._completed:
+                flight, outcome = self._completed[key], "replayed"
+            else:
+                flight, outcome = flight_cls(fingerprint), "leader"
+                flight.thread_id = thread_id
+                self._running[key] = flight
+                if thread_id is not None:
+                    self._threads[thread_id] = flight
+            if flight.fingerprint != fingerprint:
+                flight, outcome = None, "conflict"
+            self._counters[outcome] += 1
+        record_flight(outcome)
+        return flight, outcome
+
+    def _settle(self, key: str, flight: Flight) -> None:
+        with self._lock:
+            self._running.pop(key, None)
+            if flight.thread_id is not None and self._threads.get(flight.thread_id) is flight:
+                del self._threads[flight.thread_id]
+            if flight.complete and self.window_s > 0:
+                self._completed[key] = flight
+
+    def _produce(self, key: str, flight: Flight, make_events: Callable[[], Iterator[dict]]) -> None:
+        error = None
+        try:
+            for ev in make_events():
+                flight.complete = ev.get("type") == "result"
+                flight.publish(ndjson(ev), transient=ev.get("type") == "queued")
+        except Exception as e:
+            error = e
+        except BaseException:
+            error = RuntimeError("The run was interrupted.")
+            raise
+        finally:
+            # Always, so followers never wait on a run that is gone.
+            flight.finish(error)
+            self._settle(key, flight)
+
+    def _refuse(self, key: str, flight: Flight) -> tuple[None, str]:
+        # Anyone who joined in the meantime gets the error.
+        flight.finish(RuntimeError("The run was refused."))
+        self._settle(key, flight)
+        return None, "shed"
+
+    def run(self, key: str, fingerprint: str, make_events: Callable[[], Iterator[dict]],
+            *, thread_id: str | None = None,
+            admit: Callable[[Callable], Callable | None] | None = None) -> tuple[Iterator[bytes] | None, str]:
+        """
+        NDJSON lines of the key's run, starting it in a thread if there is
+        none; a new run is registered under thread_id while it runs.
+        admit is called only when this request starts the run: it wraps
+        make_events (e.g. in an admission ticket), or returns None to refuse
+        the run, which is then dropped. Returns (None, "conflict") on an
+        Idempotency-Key conflict and (None, "shed") on a refused run.
+        """
+        flight, outcome = self._claim(key, fingerprint, Flight, thread_id)
+        if flight is None:
+            return None, outcome
+        if outcome == "leader":
+            if admit is not None and (make_events := admit(make_events)) is None:
+                return self._refuse(key, flight)
+            Thread(target=self._produce, args=(key, flight, make_events),
+                   name="single-flight", daemon=True).start()
+        return flight.follow(), outcome
+
+    async def _aproduce(self, key: str, flight: AsyncFlight,
+                        make_events: Callable[[], AsyncIterator[dict]]) -> None:
+        error = None
+        try:
+            async for ev in make_events():
+                flight.complete = ev.get("type") == "result"
+                await flight.apublish(ndjson(ev), transient=ev.get("type") == "queued")
+        except Exception as e:
+            error = e
+        except BaseException:
+            # Cancelled: the task still ends cancelled; followers get a plain error.
+            error = RuntimeError("The run was cancelled.")
+            raise
+        finally:
+            await flight.afinish(error)
+            self._settle(key, flight)
+
+    def arun(self, key: str, fingerprint: str, make_events: Callable[[], AsyncIterator[dict]],
+             *, thread_id: str | None = None,
+             admit: Callable[[Callable], Callable | None] | None = None
+             ) -> tuple[AsyncIterator[bytes] | None, str]:
+        """
+        Async variant of run(); the run is a task on the current event loop.
+        """
+        flight, outcome = self._claim(key, fingerprint, AsyncFlight, thread_id)
+        if flight is None:
+            return None, outcome
+        if outcome == "leader":
+            if admit is not None and (make_events := admit(make_events)) is None:
+                return self._refuse(key, flight)
+            flight.task = create_task(self._aproduce(key, flight, make_events))
+        return flight.afollow(), outcome
+
+    def _running_thread(self, thread_id: str | None) -> Flight | None:
+        if thread_id is None:
+            return None
+        with self._lock:
+            flight = self._threads.get(thread_id)
+            if flight is not None:
+                self._counters["joined"] += 1
+        if flight is not None:
+            record_flight("joined")
+        return flight
+
+    def running(self, thread_id: str | None) -> bool:
+        """
+        Whether a run of the session is still going.
+        """
+        with self._lock:
+            return thread_id is not None and thread_id in self._threads
+
+    def attach(self, thread_id: str | None) -> Iterator[bytes] | None:
+        """
+        NDJSON lines of the session's running flight, from the start (as run()
+        gives a joiner); None when the session has no running flight.
+        """
+        flight = self._running_thread(thread_id)
+        return None if flight is None else flight.follow()
+
+    def aattach(self, thread_id: str | None) -> AsyncIterator[bytes] | None:
+        """
+        Async variant of attach(), for flights started by arun().
+        """
+        flight = self._running_thread(thread_id)
+        return None if flight is None else flight.afollow()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "running": len(self._running), "completed": len(self._completed)}
+
+
+def flight_key(idempotency_key: str | None, fingerprint: str, client: str) -> str:
+    """
+    Without an Idempotency-Key, only the same client's identical requests
+    coalesce: a joiner gets the run's thread_id, so another user's run (and
+    its session) must never be shared.
+    """
+    return f"key:{idempotency_key}" if idempotency_key else f"input:{client}:{fingerprint}"
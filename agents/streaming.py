@@ -0,0 +1,318 @@
+"""
+Turns graph runs into the NDJSON events the frontend consumes.
+Shared by the Flask (sync) and ASGI (async) entrypoints.
+
+Runs are streamed as node patches (stream_mode="updates"), so each patch is
+forwarded once and the final result is folded from them, instead of diffing a
+full-state snapshot after every step. benchmarks/stream_allocation.py compares
+the two per request.
+"""
+
+from asyncio import to_thread
+from collections import deque
+from time import perf_counter
+from typing import Any, AsyncIterator, Iterator, get_args, get_type_hints
+
+from agents.audit import audit_sink
+from agents.checkpoints import session_config
+from agents.config import ALL_BEATS
+from agents.models import GenerationMode, PipelineState, UserInput
+from agents.serializer import RESULT_FIELDS, ndjson, result_payload
+
+# Recent time-to-first-question samples (ms), for stream_stats().
+_TTFQ_MS: deque[float] = deque(maxlen=1000)
+
+
+def initial_state(
+    user_input: UserInput,
+    generation_mode: str | None = None,
+    speculative_planning: bool | None = None,
+) -> dict[str, Any]:
+    state = {
+        "user_input": user_input,
+        "attempt_count": 0,
+        "questions_by_beat": {},
+        "regen_request": [],
+        "audit_log": [],
+    }
+    if generation_mode:
+        state["generation_mode"] = generation_mode
+    if speculative_planning is not None:
+        state["speculative_planning"] = speculative_planning
+    return state
+
+
+def parse_generation_mode(data: dict[str, Any]) -> str | None:
+    """
+    The optional "generation_mode" of a run request.
+    Raises ValueError for anything but "fanout"/"batched".
+    """
+    mode = data.get("generation_mode")
+    if mode is not None and mode not in get_args(GenerationMode):
+        raise ValueError(f"generation_mode must be one of {list(get_args(GenerationMode))}.")
+    return mode
+
+
+def parse_speculative_planning(data: dict[str, Any]) -> bool | None:
+    """
+    The optional "speculative_planning" flag of a run request.
+    Raises ValueError if it is not a boolean.
+    """
+    flag = data.get("speculative_planning")
+    if flag is not None and not isinstance(flag, bool):
+        raise ValueError("speculative_planning must be true or false.")
+    return flag
+
+
+def session_snapshot(graph, thread_id: str | None):
+    """
+    The latest checkpoint of a session, or None if it is unknown
+    (or the graph has no checkpointer).
+    """
+    if not thread_id or graph.checkpointer is None:
+        return None
+    snapshot = graph.get_state(session_config(thread_id))
+    return snapshot if snapshot.values else None
+
+
+async def asession_snapshot(graph, thread_id: str | None):
+    if not thread_id or graph.checkpointer is None:
+        return None
+    snapshot = await graph.aget_state(session_config(thread_id))
+    return snapshot if snapshot.values else None
+
+
+def unfinished(snapshot) -> bool:
+    """
+    Whether a session still has steps to run. A run cut off right after a node
+    finished has an empty `next`: that node's task is still listed, with its
+    writes pending, and the steps after it are not scheduled yet.
+    """
+    return bool(snapshot.next or snapshot.tasks)
+
+
+def parse_regen_beats(data: dict[str, Any]) -> list[str] | None:
+    """
+    The beats named in a regen request body, or None if the list is empty/invalid.
+    """
+    beats = data.get("beats")
+    if not isinstance(beats, list) or not beats or any(b not in ALL_BEATS for b in beats):
+        return None
+    return [b for b in ALL_BEATS if b in beats]
+
+
+def stream_stats() -> dict[str, Any]:
+    """
+    Time-to-first-question over the recent streamed runs.
+    """
+    samples = sorted(_TTFQ_MS)
+    if not samples:
+        return {"runs": 0}
+    return {
+        "runs": len(samples),
+        "ttfq_p50_ms": round(samples[len(samples) // 2], 2),
+        "ttfq_p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+    }
+
+
+# State keys with a reducer (e.g. questions_by_beat); every other key in a
+# node's patch replaces the previous value.
+_REDUCERS = {
+    key: hint.__metadata__[0]
+    for key, hint in get_type_hints(PipelineState, include_extras=True).items()
+    if hasattr(hint, "__metadata__")
+}
+
+
+class _EventTracker:
+    """
+    Turns node patches (stream_mode="updates") into update events, each patch
+    handled once, and folds them into the run's state for the final result.
+    The audit log is forwarded but not kept: the result doesn't include it.
+    """
+
+    def __init__(self, fields: tuple[str, ...] = RESULT_FIELDS) -> None:
+        self.fields = fields
+        self.state: dict[str, Any] = {}
+        self.t0 = perf_counter()
+        self.ttfq_ms: float | None = None
+        self.seeded = False
+
+    def apply(self, patch: dict[str, Any]) -> None:
+        for key, value in patch.items():
+            if key == "audit_log":
+                continue
+            reducer = _REDUCERS.get(key)
+            self.state[key] = reducer(self.state.get(key), value) if reducer and key in self.state else value
+
+    def events(self, patch: dict[str, Any]) -> list[dict[str, Any]]:
+        self.apply(patch)
+        out = []
+
+        # 1) PII spans (the redactor runs once per run)
+        spans = patch.get("pii_spans")
+        if spans:
+            out.append({
+                "type": "update",
+                "data": {"pipeline": {"pii_spans": spans}}
+            })
+
+        # 2) The node's audit entries
+        new_events = patch.get("audit_log") or []
+        if new_events:
+            out.append({
+                "type": "update",
+                "data": {"pipeline": {"audit_log": new_events}}
+            })
+
+        # 3) After each validation, the reconciled (deduped, trimmed) questions;
+        # they replace whatever the client built from question_delta events.
+        if any(e.agent == "validator" for e in new_events):
+            memo = self.state.get("beat_validation") or {}
+            out.append({
+                "type": "questions",
+                "data": {
+                    "final_questions_by_beat": self.state.get("final_questions_by_beat") or {},
+                    "failed_beats": [b for b in ALL_BEATS if b in memo and memo[b].reasons],
+                },
+            })
+        return out
+
+    def updates(self, chunk: dict[str, Any]) -> list[dict[str, Any]]:
+        """
+        Events for one "updates" chunk: {node name: patch}.
+        """
+        out = []
+        # On resume, the writes of a node that finished before the cut are
+        # emitted again (marked cached); the seeded state already has them.
+        if self.seeded and (chunk.get("__metadata__") or {}).get("cached"):
+            return out
+        for node, patch in chunk.items():
+            # Nodes that return nothing, and interrupts, carry no state.
+            if isinstance(patch, dict) and not node.startswith("__"):
+                out.extend(self.events(patch))
+        return out
+
+    def custom(self, ev: dict[str, Any]) -> dict[str, Any]:
+        """
+        Passes through an event written by a node (question_reset/question_delta).
+        """
+        if ev.get("type") == "question_delta" and self.ttfq_ms is None:
+            self.ttfq_ms = (perf_counter() - self.t0) * 1000
+            _TTFQ_MS.append(self.ttfq_ms)
+        return ev
+
+    def metrics(self) -> dict[str, Any]:
+        ttfq = round(self.ttfq_ms, 2) if self.ttfq_ms is not None else None
+        return {"type": "metrics", "data": {
+            "time_to_first_question_ms": ttfq,
+            "total_ms": round((perf_counter() - self.t0) * 1000, 2),
+        }}
+
+    def seed(self, st: dict[str, Any], replay: bool) -> list[dict[str, Any]]:
+        """
+        Starts from a checkpointed state. With replay, returns the events a
+        client would have seen so far.
+        """
+        self.state = {}
+        self.seeded = True
+        events = self.events(st)
+        return events if replay else []
+
+    def result(self) -> dict[str, Any]:
+        return {"type": "result", "data": result_payload(self.state, self.fields)}
+
+
+def _with_full_audit(thread_id: str, state: dict[str, Any]) -> dict[str, Any]:
+    """
+    The state with its whole audit history from the audit sink, when there is
+    one; the state itself only keeps the last AUDIT_LOG_MAX_EVENTS.
+    """
+    history = audit_sink.read(thread_id) if audit_sink is not None else None
+    return {**state, "audit_log": history} if history else state
+
+
+def _session_event(thread_id: str) -> dict[str, Any]:
+    return {"type": "session", "data": {"thread_id": thread_id}}
+
+
+def _run_config(thread_id: str | None) -> dict[str, Any]:
+    config = session_config(thread_id) if thread_id is not None else {"configurable": {}}
+    config["configurable"]["stream_questions"] = True
+    return config
+
+
+def stream_events(
+    graph,
+    init_state: dict[str, Any] | None,
+    *,
+    thread_id: str | None = None,
+    seed_state: dict[str, Any] | None = None,
+    replay: bool = False,
+    fields: tuple[str, ...] = RESULT_FIELDS,
+) -> Iterator[dict[str, Any]]:
+    """
+    Runs the graph and yields NDJSON events. With a thread_id the first event
+    is a "session" event carrying it. Question text arrives as question_delta
+    events while it is generated; a "metrics" event precedes the result. init_state=None resumes the thread from
+    its last checkpoint; seed_state is that checkpoint's values.
+    """
+    tracker = _EventTracker(fields)
+    if thread_id is not None:
+        yield _session_event(thread_id)
+    if seed_state is not None:
+        if replay and thread_id is not None:
+            seed_state = _with_full_audit(thread_id, seed_state)
+        yield from tracker.seed(seed_state, replay)
+    if init_state:
+        tracker.apply(init_state)
+
+    for mode, chunk in graph.stream(init_state, _run_config(thread_id), stream_mode=["updates", "custom"]):
+        if mode == "custom":
+            yield tracker.custom(chunk)
+        else:
+            yield from tracker.updates(chunk)
+    yield tracker.metrics()
+    yield tracker.result()
+
+
+def replay_events(
+    thread_id: str, state: dict[str, Any], fields: tuple[str, ...] = RESULT_FIELDS
+) -> Iterator[dict[str, Any]]:
+    """
+    Events for a finished session, rebuilt from its checkpoint without running anything.
+    """
+    tracker = _EventTracker(fields)
+    yield _session_event(thread_id)
+    yield from tracker.seed(_with_full_audit(thread_id, state), replay=True)
+    yield tracker.result()
+
+
+async def astream_events(
+    graph,
+    init_state: dict[str, Any] | None,
+    *,
+    thread_id: str | None = None,
+    seed_state: dict[str, Any] | None = None,
+    replay: bool = False,
+    fields: tuple[str, ...] = RESULT_FIELDS,
+) -> AsyncIterator[dict[str, Any]]:
+    tracker = _EventTracker(fields)
+    if thread_id is not None:
+        yield _session_event(thread_id)
+    if seed_state is not None:
+        if replay and thread_id is not None:
+            seed_state = await to_thread(_with_full_audit, thread_id, seed_state)
+        for ev in tracker.seed(seed_state, replay):
+            yield ev
+    if init_state:
+        tracker.apply(init_state)
+
+    async for mode, chunk in graph.astream(init_state, _run_config(thread_id), stream_mode=["updates", "custom"]):
+        if mode == "custom":
+            yield tracker.custom(chunk)
+        else:
+            for ev in tracker.updates(chunk):
+                yield ev
+    yield tracker.metrics()
+    yield tracker.result()
@@ -0,0 +1,305 @@
+"""
+Per-node telemetry exported in the Prometheus text format (/metrics).
+
+create_graph() wraps every node with instrument(). The wrapper times the node
+and records the node name in a context variable, so the LLM helpers and the
+scheduler can attribute tokens, cache lookups and retries to the node that made
+the call without passing it around (tokens come from a LangChain callback
+registered for every run). Recording is a dict update under a lock
+(benchmarks/telemetry_overhead.py measures it). TELEMETRY = False leaves the
+nodes unwrapped.
+
+With TELEMETRY_OTEL and the opentelemetry-api package installed, each node
+also runs in an OpenTelemetry span ("node <name>").
+
+Counts are per process: under a pre-forking server each worker reports its own.
+"""
+
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from agents.config import TELEMETRY, TELEMETRY_LATENCY_BUCKETS, TELEMETRY_OTEL
+
+PREFIX = "sopcopilot_"
+
+_HELP = {
+    "node_latency_seconds": ("histogram", "Node wall time."),
+    "node_runs_total": ("counter", "Node executions by outcome."),
+    "llm_calls_total": ("counter", "Completed LLM requests (hedged duplicates included)."),
+    "llm_tokens_total": ("counter", "LLM tokens reported by the provider."),
+    "llm_retries_total": ("counter", "LLM requests retried by the scheduler."),
+    "cache_lookups_total": ("counter", "Response cache lookups."),
+    "repair_attempts_total": ("counter", "Repair cycles planned by the validator."),
+    "run_requests_total": ("counter", "run_stream requests by single-flight outcome."),
+    "admission_requests_total": ("counter", "Runs by admission outcome."),
+    "admission_wait_seconds": ("histogram", "Time queued runs waited for a slot."),
+    "admission_queue_depth": ("gauge", "Runs waiting for a slot."),
+    "admission_in_flight": ("gauge", "Runs holding a slot."),
+}
+
+current_node: ContextVar[str] = ContextVar("current_node", default="")
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, n_buckets: int) -> None:
+        # One slot per bucket plus +Inf; cumulated when rendered.
+        self.counts = [0] * (n_buckets + 1)
+        self.sum = 0.0
+
+
+class Metrics:
+    def __init__(self, buckets=TELEMETRY_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = Lock()
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._histograms: dict[tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(labels.items()))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """
+        A gauge: kept with the counters, typed by its _HELP entry.
+        """
+        with self._lock:
+            self._counters[(name, tuple(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self.observe_key((name, tuple(labels.items())), value)
+
+    def observe_key(self, key: tuple[str, Labels], value: float,
+                    counter: tuple[str, Labels] | None = None) -> None:
+        """
+        observe() with a prebuilt series key; optionally bumps a counter
+        under the same lock (the node wrapper's hot path).
+        """
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = Histogram(len(self.buckets))
+            h.counts[i] += 1
+            h.sum += value
+            if counter is not None:
+                self._counters[counter] = self._counters.get(counter, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Counters as {"name{labels}": value}; histograms as count/sum.
+        """
+        with self._lock:
+            out: dict[str, Any] = {_series(n, l): v for (n, l), v in self._counters.items()}
+            for (n, l), h in self._histograms.items():
+                out[_series(n, l)] = {"count": sum(h.counts), "sum": round(h.sum, 6)}
+        return out
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, (list(h.counts), h.sum)) for k, h in self._histograms.items())
+
+        lines: list[str] = []
+        seen: set[str] = set()
+
+        def header(name: str) -> None:
+            if name not in seen:
+                seen.add(name)
+                kind, text = _HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {PREFIX}{name} {text}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f"{PREFIX}{_series(name, labels)} {value:g}")
+        for (name, labels), (counts, total) in histograms:
+            header(name)
+            cumulative = 0
+            for le, n in zip((*(f"{b:g}" for b in self.buckets), "+Inf"), counts):
+                cumulative += n
+                lines.append(f"{PREFIX}{_series(name + '_bucket', labels + (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}{_series(name + '_sum', labels)} {total:g}")
+            lines.append(f"{PREFIX}{_series(name + '_count', labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _series(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+metrics = Metrics()
+
+
+# --- recording helpers (attributed to the current node) --------------------
+
+def record_cache(status: str) -> None:
+    """
+    status as returned by the structured-call helpers; "off" is not a lookup.
+    """
+    if status != "off":
+        metrics.inc("cache_lookups_total", node=current_node.get(), result=status)
+
+
+def record_retry() -> None:
+    metrics.inc("llm_retries_total", node=current_node.get())
+
+
+def record_repair() -> None:
+    metrics.inc("repair_attempts_total")
+
+
+def record_flight(outcome: str) -> None:
+    """
+    outcome: "leader" (started a run), "joined" (attached to a running one),
+    "replayed" (served a finished one) or "conflict".
+    """
+    metrics.inc("run_requests_total", outcome=outcome)
+
+
+def record_admission(outcome: str) -> None:
+    """
+    outcome: "admitted" (a slot was free), "queued", "shed" or "timed_out".
+    """
+    metrics.inc("admission_requests_total", outcome=outcome)
+
+
+def record_admission_wait(wait_s: float) -> None:
+    metrics.observe("admission_wait_seconds", wait_s)
+
+
+def record_admission_load(in_flight: int, queued: int) -> None:
+    metrics.set("admission_in_flight", in_flight)
+    metrics.set("admission_queue_depth", queued)
+
+
+def _usage(response) -> tuple[int, int] | None:
+    for gens in response.generations:
+        for gen in gens:
+            usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage")
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    return None
+
+
+class UsageCallback(BaseCallbackHandler):
+    """
+    Counts LLM requests and tokens. Registered as a configure hook, so every
+    callback manager includes it alongside the run's own callbacks.
+    """
+
+    # Run in the caller's thread/task so current_node is visible.
+    run_inline = True
+    # Only LLM events are of interest; skip dispatch for everything else.
+    ignore_chain = ignore_agent = ignore_retriever = ignore_chat_model = ignore_custom_event = True
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        node = current_node.get()
+        metrics.inc("llm_calls_total", node=node)
+        usage = _usage(response)
+        if usage is not None:
+            metrics.inc("llm_tokens_total", usage[0], node=node, direction="input")
+            metrics.inc("llm_tokens_total", usage[1], node=node, direction="output")
+
+
+usage_callback = UsageCallback()
+
+# A context variable whose default is the handler: set in every thread and
+# task without anyone entering a context. (Passing the handler through
+# with_config would replace the callbacks a run was started with.)
+_usage_hook: ContextVar[UsageCallback | None] = ContextVar(
+    "sopcopilot_usage_callback", default=usage_callback if TELEMETRY else None
+)
+register_configure_hook(_usage_hook, inheritable=True)
+
+
+# --- node wrapper ------------------------------------------------------------
+
+_tracer = None
+
+
+def _get_tracer():
+    global _tracer
+    if _tracer is None:
+        from opentelemetry import trace
+
+        _tracer = trace.get_tracer("sopcopilot")
+    return _tracer
+
+
+def instrument(name: str, fn: Callable, *, otel: bool = TELEMETRY_OTEL) -> Callable:
+    """
+    Wraps a graph node (sync or async) with latency/outcome metrics and, if
+    otel, an OpenTelemetry span. The signature is preserved, so LangGraph
+    still passes config to nodes that ask for it.
+    """
+    if not TELEMETRY:
+        return fn
+    tracer = _get_tracer() if otel else None
+
+    latency_key = ("node_latency_seconds", (("node", name),))
+    runs_keys = {s: ("node_runs_total", (("node", name), ("status", s))) for s in ("ok", "error")}
+
+    def done(t0: float, status: str) -> None:
+        metrics.observe_key(latency_key, perf_counter() - t0, runs_keys[status])
+
+    if iscoroutinefunction(fn):
+        @wraps(fn)
+        async def anode(*args, **kwargs):
+            token = current_node.set(name)
+            t0, status = perf_counter(), "error"
+            try:
+                if tracer is None:
+                    out = await fn(*args, **kwargs)
+                else:
+                    with tracer.start_as_current_span(f"node {name}"):
+                        out = await fn(*args, **kwargs)
+                status = "ok"
+                return out
+            finally:
+                done(t0, status)
+                current_node.reset(token)
+        return anode
+
+    @wraps(fn)
+    def node(*args, **kwargs):
+        token = current_node.set(name)
+        t0, status = perf_counter(), "error"
+        try:
+            if tracer is None:
+                out = fn(*args, **kwargs)
+            else:
+                with tracer.start_as_current_span(f"node {name}"):
+                    out = fn(*args, **kwargs)
+            status = "ok"
+            return out
+        finally:
+            done(t0, status)
+            current_node.reset(token)
+    return node
@@ -12,16 +12,13 @@ e.g. Institution name, research subdomains, research roles...
 
 import re
 
-try:
-    from spacy import load
-
-    NER_MODEL = load("en_core_web_sm", disable=["parser", "lemmatizer"])
-except Exception:
-    NER_MODEL = None
-
+from hashlib import sha1
 from typing import Union, Any
 from pydantic import BaseModel, ValidationError
 
+from agents.registry import registry
+from agents.validator_engine import check_beats, messages
+
 _num_re = re.compile(r"\b\d+(\.\d+)?%?\b")
 _placeholder_re = re.compile(
     r"<(NAME|EMAIL|PHONE|LOCATION|URL|REDACTED)>", re.IGNORECASE
@@ -43,6 +40,15 @@ def _norm_q(s: str) -> str:
     return s
 
 
+def _beat_fingerprint(questions: list) -> str:
+    # Stable identity of a beat's questions, used to skip unchanged beats.
+    h = sha1()
+    for q in questions or []:
+        h.update((q.question or "").encode("utf-8") + b"\x1f")
+        h.update((q.intent or "").encode("utf-8") + b"\x1e")
+    return h.hexdigest()
+
+
 def _ungrounded_numbers(question: str, source_norm: str) -> list[str]:
     nums = {m.group(0) for m in _num_re.finditer(question)}
     missing = []
@@ -56,8 +62,10 @@ def _ungrounded_numbers(question: str, source_norm: str) -> list[str]:
 def _ungrounded_entities(
     question: str, source_text: str, source_norm: str
 ) -> list[str]:
-    if NER_MODEL is not None:
-        doc = NER_MODEL(question)
+    # en_core_web_sm is loaded on first use; None if it is not installed.
+    ner_model = registry.get("ner_model")
+    if ner_model is not None:
+        doc = ner_model(question)
         suspects = []
         for ent in doc.ents:
             if ent.label_ in {
@@ -105,6 +113,48 @@ def _validate_question_text(q: str) -> list[str]:
     return reasons
 
 
+def _validate_beat(qs: list, source_norm: str) -> list[str]:
+    # Reference implementation of the rules; validate_beats runs the compiled
+    # engine (agents/validator_engine.py), checked against this for parity.
+    reasons = []
+    if not qs:
+        reasons.append("Missing questions for this beat.")
+    else:
+        for qo in qs:
+            qtext = (qo.question or "").strip()
+            reasons.extend(_validate_question_text(qtext))
+            intent = (qo.intent or "").strip()
+            if not intent:
+                reasons.append("Missing intent.")
+            missing_nums = _ungrounded_numbers(qtext, source_norm)
+            if missing_nums:
+                reasons.append(
+                    f"Ungrounded numbers not found in source: {missing_nums}"
+                )
+
+            # missing_entities = _ungrounded_entities(
+            #     qtext, source_text, source_norm
+            # )
+            # if missing_entities:
+            #     reasons.append(
+            #         f"Ungrounded entities not found in source: {missing_entities[0]}"
+            #     )
+
+            if "@" in qtext:
+                reasons.append("Email-like token detected in question.")
+            if re.search(r"\b\d{3}[-\s]?\d{3}[-\s]?\d{4}\b", qtext):
+                reasons.append("Phone-like token detected in question.")
+    return sorted(set(reasons))
+
+
+def validate_beats(beats: dict[str, list], source_norm: str) -> dict[str, list[str]]:
+    """
+    Failure reasons for each given beat's questions (empty list = pass).
+    Module-level so it can run in a worker process (agents/executor.py).
+    """
+    return {beat: messages(reasons) for beat, reasons in check_beats(beats, source_norm).items()}
+
+
 #  function to format the response
 # args being the pydantic model from the pipeline and the result will be a JSON
 # union is basically specifying thta state cam either be a dict or a base model
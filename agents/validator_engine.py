@@ -0,0 +1,290 @@
+"""
+Single-pass question validator with structured reason codes.
+
+The rules of validation_utils._validate_beat, with the work moved out of the
+per-question loop:
+  * every pattern is compiled once, at import;
+  * the source text is indexed once per run (and cached for the repair loop):
+    a number is grounded iff it is a substring of a run of digits/'.'/'%' in the
+    source, so the index is the set of substrings of those runs, and each
+    number is a set lookup instead of a scan of the whole source;
+  * each question is stripped once and scanned by the number pattern once; the
+    phone pattern only runs when a number was found (a phone match always
+    contains one).
+Reason.message is the legacy text, so validate_beats() returns exactly what it
+did; benchmarks/validator_engine.py checks parity and measures the speedup.
+
+Entity grounding (VALIDATOR_ENTITY_CHECK) is a batched stage after the
+per-question rules: the entities of every question in the run come from one
+nlp.pipe pass over the questions not already in the entity cache, with only
+the NER pipes enabled. If that pass exceeds ENTITY_CHECK_BUDGET_MS, or there
+is no NER model, the remaining questions are not entity-checked at all (a
+guess such as capitalized words would fail good questions and trigger the
+repair loop). benchmarks/entity_grounding.py measures the time it adds per run.
+"""
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import lru_cache
+from statistics import quantiles
+from threading import Lock
+from time import perf_counter
+from typing import NamedTuple
+import re
+
+from agents.config import (
+    ENTITY_CACHE_MAX_ENTRIES,
+    ENTITY_CHECK_BATCH_SIZE,
+    ENTITY_CHECK_BUDGET_MS,
+    VALIDATOR_ENTITY_CHECK,
+)
+from agents.registry import registry
+
+# code -> message; UNGROUNDED_NUMBERS is formatted with the missing numbers.
+MESSAGES = {
+    "MISSING_QUESTIONS": "Missing questions for this beat.",
+    "EMPTY_QUESTION": "Empty question text.",
+    "MULTILINE": "Question must be single-line.",
+    "NO_QUESTION_MARK": "Questions must end with '?'.",
+    "LIST_ITEM": "Looks like a list item, not a standalone question.",
+    "PLACEHOLDER": "Question references redaction placeholders (e.g., <NAME>).",
+    "MISSING_INTENT": "Missing intent.",
+    "UNGROUNDED_NUMBERS": "Ungrounded numbers not found in source: {}",
+    "EMAIL_LIKE": "Email-like token detected in question.",
+    "PHONE_LIKE": "Phone-like token detected in question.",
+    "UNGROUNDED_ENTITIES": "Ungrounded entities not found in source: {}",
+}
+
+# Same matches as validation_utils._num_re; non-capturing so findall returns them.
+_NUM_RE = re.compile(r"\b\d+(?:\.\d+)?%?\b")
+_PHONE_RE = re.compile(r"\b\d{3}[-\s]?\d{3}[-\s]?\d{4}\b")
+_PLACEHOLDER_RE = re.compile(r"<(NAME|EMAIL|PHONE|LOCATION|URL|REDACTED)>", re.IGNORECASE)
+_NUMERIC_RUN_RE = re.compile(r"[\d.%]+")
+_LIST_PREFIXES = ("1)", "2)", "-", "*")
+# Runs longer than this are scanned instead of expanded into substrings.
+_MAX_INDEXED_RUN = 48
+
+
+class Reason(NamedTuple):
+    code: str
+    # Position of the question within its beat; None for beat-level reasons.
+    index: int | None = None
+    detail: tuple[str, ...] = ()
+
+    @property
+    def message(self) -> str:
+        if self.code == "UNGROUNDED_NUMBERS":
+            return MESSAGES[self.code].format(list(self.detail))
+        if self.code == "UNGROUNDED_ENTITIES":
+            return MESSAGES[self.code].format(self.detail[0])
+        return MESSAGES[self.code]
+
+
+@dataclass(frozen=True, slots=True)
+class SourceIndex:
+    numbers: frozenset[str]
+    long_runs: tuple[str, ...]
+
+    def grounded(self, number: str) -> bool:
+        return number in self.numbers or any(number in run for run in self.long_runs)
+
+
+@lru_cache(maxsize=256)
+def index_source(source_norm: str) -> SourceIndex:
+    numbers: set[str] = set()
+    long_runs: list[str] = []
+    for m in _NUMERIC_RUN_RE.finditer(source_norm):
+        run = m.group()
+        if len(run) > _MAX_INDEXED_RUN:
+            long_runs.append(run)
+            continue
+        for i in range(len(run)):
+            for j in range(i + 1, len(run) + 1):
+                numbers.add(run[i:j])
+    return SourceIndex(frozenset(numbers), tuple(long_runs))
+
+
+def check_question(question: str, intent: str, index: int, source: SourceIndex) -> list[Reason]:
+    """
+    question and intent already stripped.
+    """
+    out: list[Reason] = []
+    if not question:
+        out.append(Reason("EMPTY_QUESTION", index))
+    else:
+        if "\n" in question:
+            out.append(Reason("MULTILINE", index))
+        if not question.endswith("?"):
+            out.append(Reason("NO_QUESTION_MARK", index))
+        if question.startswith(_LIST_PREFIXES):
+            out.append(Reason("LIST_ITEM", index))
+        if "<" in question and _PLACEHOLDER_RE.search(question):
+            out.append(Reason("PLACEHOLDER", index))
+    if not intent:
+        out.append(Reason("MISSING_INTENT", index))
+
+    numbers = set(_NUM_RE.findall(question))
+    if numbers:
+        missing = sorted(n for n in numbers if not source.grounded(n))
+        if missing:
+            out.append(Reason("UNGROUNDED_NUMBERS", index, tuple(missing)))
+    if "@" in question:
+        out.append(Reason("EMAIL_LIKE", index))
+    if numbers and _PHONE_RE.search(question):
+        out.append(Reason("PHONE_LIKE", index))
+    return out
+
+
+def check_beat(questions: list, source: SourceIndex) -> list[Reason]:
+    if not questions:
+        return [Reason("MISSING_QUESTIONS")]
+    out: list[Reason] = []
+    for i, qo in enumerate(questions):
+        out.extend(check_question((qo.question or "").strip(), (qo.intent or "").strip(), i, source))
+    return out
+
+
+# --- entity grounding ----------------------------------------------------------
+
+ENTITY_LABELS = frozenset({
+    "PERSON", "ORG", "GPE", "LOC", "DATE", "TIME", "MONEY", "PERCENT", "EVENT", "PRODUCT",
+})
+# Pipes NER needs; the rest are disabled for the pass.
+_NER_PIPES = ("tok2vec", "ner")
+
+
+def _norm(s: str) -> str:
+    return " ".join(s.lower().split())
+
+
+class EntityExtractor:
+    """
+    Entities per question string: an LRU cache in front of nlp.pipe
+    sub-batches, which stop starting once the latency budget is spent.
+    """
+
+    def __init__(
+        self,
+        *,
+        budget_ms: float | None = ENTITY_CHECK_BUDGET_MS,
+        batch_size: int = ENTITY_CHECK_BATCH_SIZE,
+        max_entries: int = ENTITY_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self._cache: OrderedDict[str, tuple[str, ...]] = OrderedDict()
+        self._lock = Lock()
+        self._ms: deque[float] = deque(maxlen=512)
+        self._counters = {"runs": 0, "questions": 0, "cache_hits": 0, "ner": 0, "skipped": 0}
+
+    def _cached(self, question: str) -> tuple[str, ...] | None:
+        with self._lock:
+            hit = self._cache.get(question)
+            if hit is not None:
+                self._cache.move_to_end(question)
+            return hit
+
+    def _store(self, question: str, ents: tuple[str, ...]) -> None:
+        with self._lock:
+            self._cache[question] = ents
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def extract(self, questions: list[str]) -> dict[str, tuple[str, ...]]:
+        """
+        Entities of the questions NER covered, from the cache or computed within
+        the budget; questions left over (or all misses, without a model) are
+        not in the result.
+        """
+        t0 = perf_counter()
+        out: dict[str, tuple[str, ...]] = {}
+        misses: list[str] = []
+        for q in dict.fromkeys(questions):
+            hit = self._cached(q)
+            if hit is None:
+                misses.append(q)
+            else:
+                out[q] = hit
+        hits, n_ner = len(out), 0
+
+        nlp = registry.get("ner_model") if misses else None
+        if nlp is not None:
+            # Budget the NER pass itself, not a first-use model load. nlp.pipe
+            # runs a whole batch before yielding, so the deadline is checked
+            # between sub-batches of batch_size: a run overshoots the budget
+            # by at most one sub-batch, and every doc computed is kept.
+            deadline = None if self.budget_ms is None else perf_counter() + self.budget_ms / 1000
+            disable = [p for p in nlp.pipe_names if p not in _NER_PIPES]
+            for i in range(0, len(misses), self.batch_size):
+                if i and deadline is not None and perf_counter() > deadline:
+                    break
+                chunk = misses[i:i + self.batch_size]
+                for q, doc in zip(chunk, nlp.pipe(chunk, batch_size=len(chunk), disable=disable)):
+                    ents = tuple(
+                        e.text.strip() for e in doc.ents
+                        if e.label_ in ENTITY_LABELS and len(e.text.strip()) >= 2
+                    )
+                    out[q] = ents
+                    self._store(q, ents)
+                    n_ner += 1
+
+        ms = (perf_counter() - t0) * 1000
+        with self._lock:
+            self._ms.append(ms)
+            c = self._counters
+            c["runs"] += 1
+            c["questions"] += len(out)
+            c["cache_hits"] += hits
+            c["ner"] += n_ner
+            c["skipped"] += len(misses) - n_ner
+        return out
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            out: dict[str, float] = {**self._counters, "entries": len(self._cache)}
+            samples = list(self._ms)
+        if len(samples) >= 2:
+            q = quantiles(samples, n=100, method="inclusive")
+            out["p50_ms"], out["p95_ms"] = round(q[49], 2), round(q[94], 2)
+        return out
+
+
+entity_extractor = EntityExtractor()
+
+
+def ungrounded_entities(ents: tuple[str, ...], source_norm: str) -> list[str]:
+    return sorted({e for e in ents if _norm(e) not in source_norm})
+
+
+def check_beats(
+    beats: dict[str, list],
+    source_norm: str,
+    *,
+    entities: bool = VALIDATOR_ENTITY_CHECK,
+    extractor: EntityExtractor = entity_extractor,
+) -> dict[str, list[Reason]]:
+    """
+    Structured reasons for each beat's questions (empty list = pass).
+    """
+    source = index_source(source_norm)
+    out = {beat: check_beat(qs, source) for beat, qs in beats.items()}
+    if entities:
+        texts = {
+            (beat, i): (qo.question or "").strip()
+            for beat, qs in beats.items() for i, qo in enumerate(qs or [])
+        }
+        found = extractor.extract([t for t in texts.values() if t])
+        for (beat, i), text in texts.items():
+            # Questions NER didn't reach are not checked.
+            missing = ungrounded_entities(found.get(text, ()), source_norm) if text else []
+            if missing:
+                out[beat].append(Reason("UNGROUNDED_ENTITIES", i, tuple(missing)))
+    return out
+
+
+def messages(reasons: list[Reason]) -> list[str]:
+    """
+    The legacy per-beat reason list: unique messages, sorted.
+    """
+    return sorted({r.message for r in reasons})
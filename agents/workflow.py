@@ -1,37 +1,190 @@
 from agents.models import *
 from agents.config import *
 from agents.validation_utils import (
+    _beat_fingerprint,
     _norm_q,
     _norm,
     _validate_question_text,
     _ungrounded_entities,
     _ungrounded_numbers,
+    validate_beats,
 )
 # from agents.prompts import beat_planner_messages, question_generator_messages
 from agents.prompts import (
     beat_planner_messages, 
     question_generator_messages,
+    multi_beat_generator_messages,
+    default_beat_plan,
     _program_slots,
     _build_canonical_input
     )
 from agents.logger_utils import log_event, log_event_patch
+from agents.registry import LLM_BACKENDS, registry
+from agents.cache import cache_key, response_cache
+from agents.prompt_cache import apply_prefix_hook
+from agents.llm_scheduler import estimate_tokens, llm_scheduler
+from agents.telemetry import instrument, record_cache, record_repair
+from agents.redaction import DEFAULT_PII_ENTITIES, redact
+from agents.dedupe import select_diverse
+from agents.executor import cpu_executor
+from agents.checkpoints import make_checkpointer, new_thread_id, session_config
 from econf.env import _set_env
 
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
 from presidio_anonymizer.entities import OperatorConfig
 from typing import Any, Literal
 from textwrap import dedent
 from time import perf_counter
-from langchain_cohere import ChatCohere
 from langgraph.types import Command, Send
 from langgraph.graph import START, END, StateGraph
+from langgraph.config import get_stream_writer
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+from langchain_core.runnables import RunnableConfig
+from langchain_core.utils.function_calling import convert_to_openai_tool
 import re
 
 
 _set_env("COHERE_API_KEY")
-llm = ChatCohere(model="command-a-03-2025")
- 
+
+
+def get_llm():
+    """
+    The shared chat model, built on first use (see agents/registry.py).
+    """
+    return registry.get("llm")
+
+
+def set_llm_backend(backend) -> None:
+    """
+    Swaps the chat model: a name from LLM_BACKENDS ("cohere", "fake") or a
+    zero-argument factory returning a LangChain chat model. Applies to the
+    next call; the graph itself does not change.
+    """
+    factory = LLM_BACKENDS[backend] if isinstance(backend, str) else backend
+    registry.register("llm", factory)
+
+
+def _cache_lookup(schema, temperature, messages, use_cache):
+    """
+    Returns (key, cached output or None). key is None when caching is off.
+    """
+    if not use_cache:
+        return None, None
+    key = cache_key(LLM_MODEL, temperature, messages, schema)
+    hit = response_cache.get(key)
+    if hit is not None:
+        record_cache("hit")
+    return key, (schema.model_validate_json(hit) if hit is not None else None)
+
+
+def _cache_store(key, out) -> str:
+    if key is None:
+        return "off"
+    response_cache.set(key, out.model_dump_json())
+    record_cache("miss")
+    return "miss"
+
+
+def structured_call(schema, temperature, messages, *, use_cache=False, hedge=False):
+    """
+    One structured LLM call through the response cache.
+    Returns (output, cache_status) with cache_status in {"hit", "miss", "off"}.
+    The response cache keys on the prompt as built; a prefix-cache hook
+    (agents/prompt_cache.py) only changes what is sent to the model.
+    The call itself goes through the LLM scheduler (rate limits, retries;
+    hedge=True lets it duplicate a slow request, see agents/llm_scheduler.py).
+    """
+    key, cached = _cache_lookup(schema, temperature, messages, use_cache)
+    if cached is not None:
+        return cached, "hit"
+    runnable = get_llm().bind(temperature=temperature).with_structured_output(schema)
+    out = llm_scheduler.call(
+        lambda: runnable.invoke(apply_prefix_hook(messages)),
+        est_tokens=estimate_tokens(messages, LLM_EST_OUTPUT_TOKENS), hedge=hedge,
+    )
+    return out, _cache_store(key, out)
+
+
+async def astructured_call(schema, temperature, messages, *, use_cache=False, hedge=False):
+    """
+    Async variant of structured_call.
+    """
+    key, cached = _cache_lookup(schema, temperature, messages, use_cache)
+    if cached is not None:
+        return cached, "hit"
+    runnable = get_llm().bind(temperature=temperature).with_structured_output(schema)
+    out = await llm_scheduler.acall(
+        lambda: runnable.ainvoke(apply_prefix_hook(messages)),
+        est_tokens=estimate_tokens(messages, LLM_EST_OUTPUT_TOKENS), hedge=hedge,
+    )
+    return out, _cache_store(key, out)
+
+
+def _partial_chain(schema, temperature):
+    """
+    The same tool call with_structured_output makes, but parsed incrementally:
+    streaming it yields the tool arguments as a growing (partial) dict.
+    """
+    name = convert_to_openai_tool(schema)["function"]["name"]
+    return (
+        get_llm().bind_tools([schema], temperature=temperature)
+        | JsonOutputKeyToolsParser(key_name=name, first_tool_only=True)
+    )
+
+
+def streamed_structured_call(schema, temperature, messages, on_partial, *, use_cache=False):
+    """
+    structured_call that streams the model's output; on_partial receives each
+    partial dict as it grows (once, complete, on a cache hit).
+    """
+    key, cached = _cache_lookup(schema, temperature, messages, use_cache)
+    if cached is not None:
+        on_partial(cached.model_dump())
+        return cached, "hit"
+    chain = _partial_chain(schema, temperature)
+    streamed = []
+
+    def consume():
+        partial = None
+        for partial in chain.stream(apply_prefix_hook(messages)):
+            streamed.append(True)
+            on_partial(partial)
+        return partial
+
+    # Once text has reached the client a retry would garble it, so only
+    # failures before the first chunk are retried.
+    partial = llm_scheduler.call(
+        consume, est_tokens=estimate_tokens(messages, LLM_EST_OUTPUT_TOKENS),
+        retry_if=lambda: not streamed,
+    )
+    out = schema.model_validate(partial)
+    return out, _cache_store(key, out)
+
+
+async def astreamed_structured_call(schema, temperature, messages, on_partial, *, use_cache=False):
+    """
+    Async variant of streamed_structured_call.
+    """
+    key, cached = _cache_lookup(schema, temperature, messages, use_cache)
+    if cached is not None:
+        on_partial(cached.model_dump())
+        return cached, "hit"
+    chain = _partial_chain(schema, temperature)
+    streamed = []
+
+    async def consume():
+        partial = None
+        async for partial in chain.astream(apply_prefix_hook(messages)):
+            streamed.append(True)
+            on_partial(partial)
+        return partial
+
+    partial = await llm_scheduler.acall(
+        consume, est_tokens=estimate_tokens(messages, LLM_EST_OUTPUT_TOKENS),
+        retry_if=lambda: not streamed,
+    )
+    out = schema.model_validate(partial)
+    return out, _cache_store(key, out)
+
 
 # def _build_canonical_input(user_input: UserInput) -> str:
 #     """
@@ -53,17 +206,9 @@ def make_redactor_node(
 ):
     """
     A presidio wrapper to create the redactor node.
+    The Presidio engines are resolved lazily on the first call.
     """
-    analyzer = AnalyzerEngine()
-    anonymizer = AnonymizerEngine()
-    entities = entities or [
-        "PERSON",
-        "PHONE_NUMBER",
-        "EMAIL_ADDRESS",
-        "LOCATION",
-        "CREDIT_CARD",
-        "URL",
-    ]
+    entities = entities or DEFAULT_PII_ENTITIES
 
     # Replace PII with its entity type,<EMAIL_ADDRESS>.
     # (Presidio supports different operators; replace/mask/redact, etc.) :contentReference[oaicite:4]{index=4}
@@ -83,24 +228,20 @@ def make_redactor_node(
 
         start_patch = log_event(state, "redactor", "start", {"len_canonical": len(canonical)})
 
-        results = analyzer.analyze(text=canonical, language=language, entities=entities)
-
-        pii_spans = [
-            PiiSpan(
-                start=r.start, end=r.end, pii_type=r.entity_type,
-                confidence=float(r.score) if r.score is not None else None,
-            )
-            for r in results
-        ]
-
-        redacted = anonymizer.anonymize(
-            text=canonical, analyzer_results=results, operators=operators
-        ).text
+        # CPU-bound; runs in the worker pool when one is configured. Inside a
+        # pool worker requests are already serialized, so micro-batching is off.
+        batch = REDACTION_BATCHING and not cpu_executor.pooled
+        pii_spans, redacted, tier, cached = cpu_executor.run(
+            redact, canonical,
+            language=language, entities=entities, operators=operators, batch=batch,
+        )
 
         dt_ms = (perf_counter() - t0) * 1000
         end_patch = log_event(
             state, "redactor", "end",
-            {"pii_count": len(pii_spans), "latency_ms": round(dt_ms, 2)}
+            {"pii_count": len(pii_spans), "latency_ms": round(dt_ms, 2),
+             "batched": batch, "pooled": cpu_executor.pooled, "tier": tier,
+             "cached_segments": cached}
         )
 
         return {
@@ -116,16 +257,43 @@ def make_redactor_node(
     return redactor_node
 
 
-def beat_planner_node(state: PipelineState) -> Command[Literal["question_generator"]]:
+def _generation_mode(state: PipelineState) -> str:
+    return state.get("generation_mode") or GENERATION_MODE
+
+
+def _speculative(state: PipelineState) -> bool:
+    flag = state.get("speculative_planning")
+    return SPECULATIVE_PLANNING if flag is None else flag
+
+
+def generation_sends(tasks: list[BeatPlanItem],
+                     program_type: str,
+                     redacted_input: str,
+                     mode: str,
+                     *,
+                     skip_cache: bool = False,
+                     ) -> list[Send]:
     """
-    Produces a list of beat plan item and sends a map task.
+    The map step for the given beats: one question_generator Send per beat
+    ("fanout"), or a single batch_generator Send covering all of them ("batched").
     """
-    program_type = state["user_input"].program_type
-    redacted_input = state["redacted_input"]
+    if not tasks:
+        return []
+    common: dict[str, Any] = {"redacted_input": redacted_input, "program_type": program_type}
+    if skip_cache:
+        common["skip_cache"] = True
+    if mode == "batched":
+        return [Send("batch_generator", {"beat_tasks": [t.model_dump() for t in tasks], **common})]
+    return [Send("question_generator", {"beat_task": t.model_dump(), **common}) for t in tasks]
 
-    planner = llm.bind(temperature=PLANNER_TEMP).with_structured_output(BeatPlanOut)
-    out = planner.invoke(beat_planner_messages(program_type, redacted_input))
 
+def _planner_command(state: PipelineState, out: BeatPlanOut, cache_status: str) -> Command:
+    """
+    Checks the planner output and builds the map (Send) command.
+    Shared by the sync and async planner nodes.
+    """
+    program_type = state["user_input"].program_type
+    redacted_input = state["redacted_input"]
     beat_plan = out.items
 
     # Hard enforcement: A–E exactly once
@@ -133,14 +301,12 @@ def beat_planner_node(state: PipelineState) -> Command[Literal["question_generat
     if sorted(beats) != ["A", "B", "C", "D", "E"]:
         raise ValueError(f"BeatPlanner must output A–E exactly once. Got: {beats}")
 
-    sends = [
-        Send("question_generator", {
-                "beat_task": item.model_dump(),
-                "redacted_input": redacted_input,
-                "program_type": program_type,
-            })
-        for item in beat_plan
-    ]
+    # Speculative runs are already generating from the default plan
+    # (route_after_redaction); this plan is kept for the validator's repairs.
+    speculative = _speculative(state)
+    sends = [] if speculative else generation_sends(
+        beat_plan, program_type, redacted_input, _generation_mode(state)
+    )
     
     
     log_patch = log_event(
@@ -148,70 +314,194 @@ def beat_planner_node(state: PipelineState) -> Command[Literal["question_generat
         "beat_planner", 
         "created_beat_plan", 
         {"beats": [x.beat for x in beat_plan],
-         "missing_counts": {x.beat: len(x.missing)  for x in beat_plan},}
+         "missing_counts": {x.beat: len(x.missing)  for x in beat_plan},
+         "cache": cache_status,
+         "cache_stats": response_cache.stats(),
+         "speculative": speculative,}
         )
     return Command(update={"beat_plan": beat_plan, **log_patch}, goto=sends)
 
+
+def beat_planner_node(state: PipelineState) -> Command[Literal["question_generator", "batch_generator"]]:
+    """
+    Produces a list of beat plan item and sends a map task.
+    """
+    program_type = state["user_input"].program_type
+    redacted_input = state["redacted_input"]
+
+    out, cache_status = structured_call(
+        BeatPlanOut, PLANNER_TEMP,
+        beat_planner_messages(program_type, redacted_input),
+        use_cache=PLANNER_CACHE,
+    )
+    return _planner_command(state, out, cache_status)
+
+
+async def abeat_planner_node(state: PipelineState) -> Command[Literal["question_generator", "batch_generator"]]:
+    """
+    Async variant of beat_planner_node (awaits the LLM instead of blocking a thread).
+    """
+    program_type = state["user_input"].program_type
+    redacted_input = state["redacted_input"]
+
+    out, cache_status = await astructured_call(
+        BeatPlanOut, PLANNER_TEMP,
+        beat_planner_messages(program_type, redacted_input),
+        use_cache=PLANNER_CACHE,
+    )
+    return _planner_command(state, out, cache_status)
+
+
 def question_generator_node(task: BeatPlanItem, 
                             program_type: str, 
-                            redacted_input: str
-                            ) -> list[QuestionObject]:
+                            redacted_input: str,
+                            use_cache: bool = GENERATOR_CACHE,
+                            on_partial=None,
+                            ) -> tuple[list[QuestionObject], str]:
     """
     StateGraph node to generate questions.
+    Returns the questions and the response-cache status ("hit", "miss" or "off").
+    With on_partial, the model output is streamed and passed to it as it grows.
     """
     try:
-        generator = llm.bind(temperature=GENERATOR_TEMP).with_structured_output(QuestionsOut)
-        out = generator.invoke(
-            question_generator_messages(
-                task, 
-                program_type,
-                redacted_input
-                ))
-        return out.items
+        messages = question_generator_messages(
+            task, 
+            program_type,
+            redacted_input
+            )
+        if on_partial is not None:
+            out, cache_status = streamed_structured_call(
+                QuestionsOut, GENERATOR_TEMP, messages, on_partial, use_cache=use_cache,
+            )
+        else:
+            out, cache_status = structured_call(
+                QuestionsOut, GENERATOR_TEMP, messages, use_cache=use_cache, hedge=True,
+            )
+        return out.items, cache_status
     except Exception as e:
         raise Exception(f"Unexpected exception: {e}")
 
 
-def question_generator_worker(worker_state: dict[str, Any]) -> dict[str, Any]:
+async def aquestion_generator_node(task: BeatPlanItem,
+                                   program_type: str,
+                                   redacted_input: str,
+                                   use_cache: bool = GENERATOR_CACHE,
+                                   on_partial=None,
+                                   ) -> tuple[list[QuestionObject], str]:
     """
-    Generate questions per beat (map worker).
-    Emits audit_log patches that will merge into shared state.
+    Async variant of question_generator_node.
     """
-    t0 = perf_counter()
+    try:
+        messages = question_generator_messages(
+            task,
+            program_type,
+            redacted_input
+            )
+        if on_partial is not None:
+            out, cache_status = await astreamed_structured_call(
+                QuestionsOut, GENERATOR_TEMP, messages, on_partial, use_cache=use_cache,
+            )
+        else:
+            out, cache_status = await astructured_call(
+                QuestionsOut, GENERATOR_TEMP, messages, use_cache=use_cache, hedge=True,
+            )
+        return out.items, cache_status
+    except Exception as e:
+        raise Exception(f"Unexpected exception: {e}")
+
 
+def _worker_start(worker_state: dict[str, Any]) -> dict[str, Any]:
     # Defensive: record keys early (super useful in debugging)
-    start_patch = log_event_patch(
+    return log_event_patch(
         agent="question_generator",
         event="start",
         data={"keys": list(worker_state.keys())},
     )
 
-    try:
-        task = BeatPlanItem.model_validate(worker_state["beat_task"])
-        program_type = worker_state["program_type"]
-        redacted_input = worker_state["redacted_input"]
 
-        questions = question_generator_node(task, program_type, redacted_input)
+def _worker_inputs(worker_state: dict[str, Any]) -> tuple[BeatPlanItem, str, str, bool]:
+    task = BeatPlanItem.model_validate(worker_state["beat_task"])
+    use_cache = GENERATOR_CACHE and not worker_state.get("skip_cache", False)
+    return task, worker_state["program_type"], worker_state["redacted_input"], use_cache
 
-        dt_ms = (perf_counter() - t0) * 1000
-        ok_patch = log_event_patch(
-            agent="question_generator",
-            event="success",
-            data={
-                "beat": task.beat,
-                "n_questions": len(questions),
-                "latency_ms": round(dt_ms, 2),
-            },
-        )
 
-        return {
-            **start_patch,
-            **ok_patch,
-            "questions_by_beat": {task.beat: questions},
-        }
+class _QuestionDeltas:
+    """
+    Turns the generator's partial output into per-question text deltas,
+    written as custom stream events ("question_reset", then "question_delta").
+    """
 
-    except KeyError:
-        dt_ms = (perf_counter() - t0) * 1000
+    def __init__(self, beats: list[Beat], write) -> None:
+        self.beats = beats
+        self.write = write
+        self.sent: dict[tuple[Beat, int], int] = {}
+        # The beats may be regenerations; tell the client to drop their drafts.
+        for beat in beats:
+            write({"type": "question_reset", "data": {"beat": beat}})
+
+    def __call__(self, partial: dict | None) -> None:
+        counts: dict[Beat, int] = {}
+        for item in (partial or {}).get("items") or []:
+            if not isinstance(item, dict):
+                continue
+            # A single-beat call files everything under its beat; a batched
+            # call is split by each item's own "beat".
+            beat = self.beats[0] if len(self.beats) == 1 else item.get("beat")
+            if beat not in self.beats:
+                continue
+            i = counts[beat] = counts.get(beat, -1) + 1
+            text = item.get("question")
+            if not isinstance(text, str):
+                continue
+            sent = self.sent.get((beat, i), 0)
+            if len(text) > sent:
+                self.write({"type": "question_delta",
+                            "data": {"beat": beat, "index": i, "delta": text[sent:]}})
+                self.sent[(beat, i)] = len(text)
+
+
+def _question_deltas(beats: list[Beat], config: RunnableConfig | None) -> _QuestionDeltas | None:
+    """
+    A delta writer when the run asked for streamed questions
+    (configurable "stream_questions", set by agents/streaming.py), else None.
+    """
+    if not STREAM_QUESTIONS or not (config or {}).get("configurable", {}).get("stream_questions"):
+        return None
+    return _QuestionDeltas(beats, get_stream_writer())
+
+
+def _worker_success(task: BeatPlanItem,
+                    questions: list[QuestionObject],
+                    cache_status: str,
+                    t0: float,
+                    start_patch: dict[str, Any]
+                    ) -> dict[str, Any]:
+    dt_ms = (perf_counter() - t0) * 1000
+    ok_patch = log_event_patch(
+        agent="question_generator",
+        event="success",
+        data={
+            "beat": task.beat,
+            "n_questions": len(questions),
+            "latency_ms": round(dt_ms, 2),
+            "cache": cache_status,
+            "cache_stats": response_cache.stats(),
+        },
+    )
+
+    return {
+        **start_patch,
+        **ok_patch,
+        "questions_by_beat": {task.beat: questions},
+    }
+
+
+def _worker_failure(worker_state: dict[str, Any], e: Exception, t0: float):
+    """
+    Re-raises a worker failure with a readable message.
+    """
+    dt_ms = (perf_counter() - t0) * 1000
+    if isinstance(e, KeyError):
         err_patch = log_event_patch(
             agent="question_generator",
             event="error",
@@ -226,26 +516,156 @@ def question_generator_worker(worker_state: dict[str, Any]) -> dict[str, Any]:
             f"Key error occurred during question generation. worker_state keys={list(worker_state.keys())}"
         ) from None
 
+    _ = log_event_patch(
+        agent="question_generator",
+        event="error",
+        data={
+            "error_type": type(e).__name__,
+            "message": str(e),
+            "latency_ms": round(dt_ms, 2),
+        },
+    )
+    raise Exception(f"Unexpected exception: {e}.") from e
+
+
+def question_generator_worker(worker_state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+    """
+    Generate questions per beat (map worker).
+    Emits audit_log patches that will merge into shared state.
+    """
+    t0 = perf_counter()
+    start_patch = _worker_start(worker_state)
+
+    try:
+        task, program_type, redacted_input, use_cache = _worker_inputs(worker_state)
+        questions, cache_status = question_generator_node(
+            task, program_type, redacted_input, use_cache, _question_deltas([task.beat], config)
+        )
+        return _worker_success(task, questions, cache_status, t0, start_patch)
     except Exception as e:
-        dt_ms = (perf_counter() - t0) * 1000
-        _ = log_event_patch(
-            agent="question_generator",
-            event="error",
-            data={
-                "error_type": type(e).__name__,
-                "message": str(e),
-                "latency_ms": round(dt_ms, 2),
-            },
+        _worker_failure(worker_state, e, t0)
+
+
+async def aquestion_generator_worker(worker_state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+    """
+    Async variant of question_generator_worker.
+    """
+    t0 = perf_counter()
+    start_patch = _worker_start(worker_state)
+
+    try:
+        task, program_type, redacted_input, use_cache = _worker_inputs(worker_state)
+        questions, cache_status = await aquestion_generator_node(
+            task, program_type, redacted_input, use_cache, _question_deltas([task.beat], config)
         )
-        raise Exception(f"Unexpected exception: {e}.") from e
+        return _worker_success(task, questions, cache_status, t0, start_patch)
+    except Exception as e:
+        _worker_failure(worker_state, e, t0)
+
+def _batch_inputs(worker_state: dict[str, Any]) -> tuple[list[BeatPlanItem], list, bool]:
+    tasks = [BeatPlanItem.model_validate(t) for t in worker_state["beat_tasks"]]
+    messages = multi_beat_generator_messages(
+        tasks, worker_state["program_type"], worker_state["redacted_input"]
+    )
+    use_cache = GENERATOR_CACHE and not worker_state.get("skip_cache", False)
+    return tasks, messages, use_cache
+
+
+def _batch_success(tasks: list[BeatPlanItem],
+                   items: list[QuestionObject],
+                   cache_status: str,
+                   t0: float,
+                   start_patch: dict[str, Any]
+                   ) -> dict[str, Any]:
+    """
+    Splits a multi-beat response by beat. Questions for beats that were not
+    asked for are dropped; a beat the model skipped fails validation as usual.
+    """
+    beats = [t.beat for t in tasks]
+    by_beat: dict[Beat, list[QuestionObject]] = {b: [] for b in beats}
+    for q in items:
+        if q.beat in by_beat:
+            by_beat[q.beat].append(q)
+
+    dt_ms = (perf_counter() - t0) * 1000
+    ok_patch = log_event_patch(
+        agent="question_generator",
+        event="success",
+        data={
+            "beats": beats,
+            "mode": "batched",
+            "n_questions": {b: len(qs) for b, qs in by_beat.items()},
+            "dropped": len(items) - sum(len(qs) for qs in by_beat.values()),
+            "latency_ms": round(dt_ms, 2),
+            "cache": cache_status,
+            "cache_stats": response_cache.stats(),
+        },
+    )
+
+    return {
+        **start_patch,
+        **ok_patch,
+        "questions_by_beat": {b: qs for b, qs in by_beat.items() if qs},
+    }
+
+
+def batch_generator_worker(worker_state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+    """
+    Generates questions for several beats with one LLM call (GENERATION_MODE "batched").
+    """
+    t0 = perf_counter()
+    start_patch = _worker_start(worker_state)
+
+    try:
+        tasks, messages, use_cache = _batch_inputs(worker_state)
+        deltas = _question_deltas([t.beat for t in tasks], config)
+        if deltas is not None:
+            out, cache_status = streamed_structured_call(
+                QuestionsOut, GENERATOR_TEMP, messages, deltas, use_cache=use_cache,
+            )
+        else:
+            out, cache_status = structured_call(
+                QuestionsOut, GENERATOR_TEMP, messages, use_cache=use_cache, hedge=True,
+            )
+        return _batch_success(tasks, out.items, cache_status, t0, start_patch)
+    except Exception as e:
+        _worker_failure(worker_state, e, t0)
+
+
+async def abatch_generator_worker(worker_state: dict[str, Any], config: RunnableConfig) -> dict[str, Any]:
+    """
+    Async variant of batch_generator_worker.
+    """
+    t0 = perf_counter()
+    start_patch = _worker_start(worker_state)
+
+    try:
+        tasks, messages, use_cache = _batch_inputs(worker_state)
+        deltas = _question_deltas([t.beat for t in tasks], config)
+        if deltas is not None:
+            out, cache_status = await astreamed_structured_call(
+                QuestionsOut, GENERATOR_TEMP, messages, deltas, use_cache=use_cache,
+            )
+        else:
+            out, cache_status = await astructured_call(
+                QuestionsOut, GENERATOR_TEMP, messages, use_cache=use_cache, hedge=True,
+            )
+        return _batch_success(tasks, out.items, cache_status, t0, start_patch)
+    except Exception as e:
+        _worker_failure(worker_state, e, t0)
+
 
 def assembler_node(state: PipelineState) -> dict:
     """
     Deterministic "reduce": merge + dedupe + trim.
+    Beats whose raw questions are unchanged since the last assembly keep their
+    previous output; only changed beats are re-deduped (against the kept ones).
     """
     questions_by_beat: dict[Beat, list[QuestionObject]] = (
         state.get("questions_by_beat", {}) or {}
     )
+    prev_final = state.get("final_questions_by_beat") or {}
+    prev_fps = state.get("assembled_fingerprints") or {}
 
     # Ensure all beats exist
     merged: dict[Beat, list[QuestionObject]] = {b: [] for b in ALL_BEATS}
@@ -255,10 +675,20 @@ def assembler_node(state: PipelineState) -> dict:
 
     pre_merge_count = sum(len(v) for v in merged.values())
 
-    seen: set[str] = set()
-    final_by_beat: dict[Beat, list[QuestionObject]] = {b: [] for b in ALL_BEATS}
+    fingerprints = {b: _beat_fingerprint(merged[b]) for b in ALL_BEATS}
+    reused = [
+        b for b in ALL_BEATS
+        if b in prev_final and prev_fps.get(b) == fingerprints[b]
+    ]
+
+    seen: set[str] = {_norm_q(q.question) for b in reused for q in prev_final[b]}
+    final_by_beat: dict[Beat, list[QuestionObject]] = {
+        b: list(prev_final[b]) if b in reused else [] for b in ALL_BEATS
+    }
 
     for beat in ALL_BEATS:
+        if beat in reused:
+            continue
         for q in merged[beat]:
             if not q or not q.question:
                 continue
@@ -268,6 +698,23 @@ def assembler_node(state: PipelineState) -> dict:
             seen.add(key)
             final_by_beat[beat].append(q)
 
+    # Paraphrases, across beats and against the reused ones, before trimming,
+    # so they don't take the slots of distinct questions.
+    near_duplicates = 0
+    changed = [b for b in ALL_BEATS if b not in reused]
+    if SEMANTIC_DEDUPE and changed:
+        keep = select_diverse(
+            [q.question for b in reused for q in final_by_beat[b]],
+            [[q.question for q in final_by_beat[b]] for b in changed],
+            limit=MAX_PER_BEAT,
+        )
+        for beat, idx in zip(changed, keep):
+            # Candidates after a full beat's last pick were never compared.
+            examined = idx[-1] + 1 if len(idx) == MAX_PER_BEAT else len(final_by_beat[beat])
+            near_duplicates += examined - len(idx)
+            final_by_beat[beat] = [final_by_beat[beat][i] for i in idx]
+
+    for beat in changed:
         if len(final_by_beat[beat]) > MAX_PER_BEAT:
             final_by_beat[beat] = final_by_beat[beat][:MAX_PER_BEAT]
     
@@ -278,28 +725,31 @@ def assembler_node(state: PipelineState) -> dict:
 
     return {
         "final_questions_by_beat": final_by_beat,
+        "assembled_fingerprints": fingerprints,
         **log_event(state, "assembler", "reduce_complete", {
             "total_pre_dedupe": pre_merge_count,
             "total_post_dedupe": post_merge_count,
             "per_beat_counts": beat_counts,
+            "reassembled_beats": changed,
+            "near_duplicates_dropped": near_duplicates,
         }),
     }
 
-def clear_failed_beats_questions(
-    questions_by_beat: dict[Beat, list[QuestionObject]], failed_beats: list[Beat]
-) -> dict[Beat, list[QuestionObject]]:
-    qb = dict(questions_by_beat or {})
-    for b in failed_beats:
-        qb[b] = []
-    return qb
+def clear_failed_beats_questions(failed_beats: list[Beat]) -> dict[Beat, list[QuestionObject]]:
+    """
+    A questions_by_beat patch that empties the given beats
+    (the reducer resets a beat when it receives an empty list).
+    """
+    return {b: [] for b in failed_beats}
 
 
 def regenerate_questions(failed_beats: list[str], 
                          plan_map: dict[Beat, BeatPlanItem], 
                          program_type: str,
-                         redacted_input: str
+                         redacted_input: str,
+                         mode: str = GENERATION_MODE,
                          ) -> list[Send]:
-    sends = []
+    tasks = []
     for b in failed_beats:
         bp = plan_map.get(b) or BeatPlanItem(beat=b, missing=[], guidance=None)
 
@@ -316,17 +766,8 @@ def regenerate_questions(failed_beats: list[str],
             guidance=new_guidance,
         )
 
-        sends.append(
-            Send(
-                "question_generator",
-                {
-                    "beat_task": regen_task.model_dump(),
-                    "program_type": program_type,
-                    "redacted_input": redacted_input,
-                },
-            )
-        )
-    return sends
+        tasks.append(regen_task)
+    return generation_sends(tasks, program_type, redacted_input, mode)
 
 
 def validator_node(state: PipelineState) -> Command | dict:
@@ -340,47 +781,36 @@ def validator_node(state: PipelineState) -> Command | dict:
     5. Ungrounded numbers (any numbers in question must appear in the redacted input)
     6. Ungrounded name entities using spaCy NER. It must apear in redacted_input.
     e.g. institution name, advisor's name, emails, etc...
+
+    Results are memoized per beat in beat_validation, so a repair cycle only
+    re-validates the beats whose assembled questions changed.
     """
     try:
         source_text = state["redacted_input"]
         source_norm = _norm(source_text)
         final_by_beat = state.get("final_questions_by_beat", {})
+        memo: dict[Beat, BeatValidation] = dict(state.get("beat_validation") or {})
+
+        fingerprints = {b: _beat_fingerprint(final_by_beat.get(b, [])) for b in ALL_BEATS}
+        revalidated: list[Beat] = [
+            b for b in ALL_BEATS
+            if b not in memo or memo[b].fingerprint != fingerprints[b]
+        ]
+        # CPU-bound checks; runs in the worker pool when one is configured.
+        fresh = cpu_executor.run(
+            validate_beats,
+            {b: final_by_beat.get(b, []) for b in revalidated},
+            source_norm,
+        )
+        for beat, reasons in fresh.items():
+            memo[beat] = BeatValidation(fingerprint=fingerprints[beat], reasons=reasons)
 
         failed_reasons: dict[Beat, list[str]] = {}
         failed_beats: list[Beat] = []
         for beat in ALL_BEATS:
-            reasons = []
-            qs = final_by_beat.get(beat, [])
-            if not qs:
-                reasons.append("Missing questions for this beat.")
-            else:
-                for qo in qs:
-                    qtext = (qo.question or "").strip()
-                    reasons.extend(_validate_question_text(qtext))
-                    intent = (qo.intent or "").strip()
-                    if not intent:
-                        reasons.append("Missing intent.")
-                    missing_nums = _ungrounded_numbers(qtext, source_norm)
-                    if missing_nums:
-                        reasons.append(
-                            f"Ungrounded numbers not found in source: {missing_nums}"
-                        )
-
-                    # missing_entities = _ungrounded_entities(
-                    #     qtext, source_text, source_norm
-                    # )
-                    # if missing_entities:
-                    #     reasons.append(
-                    #         f"Ungrounded entities not found in source: {missing_entities[0]}"
-                    #     )
-
-                    if "@" in qtext:
-                        reasons.append("Email-like token detected in question.")
-                    if re.search(r"\b\d{3}[-\s]?\d{3}[-\s]?\d{4}\b", qtext):
-                        reasons.append("Phone-like token detected in question.")
-
+            reasons = list(memo[beat].reasons)
             if reasons:
-                failed_reasons[beat] = sorted(set(reasons))
+                failed_reasons[beat] = reasons
                 failed_beats.append(beat)
 
         ok = len(failed_beats) == 0
@@ -395,13 +825,18 @@ def validator_node(state: PipelineState) -> Command | dict:
             state,
             "validator",
             "checked",
-            {"ok": ok, "failed_beats": failed_beats, "num_failed_beats": len(failed_beats)}
+            {"ok": ok, "failed_beats": failed_beats, "num_failed_beats": len(failed_beats),
+             "revalidated_beats": revalidated}
         )
 
         if ok:
-            return Command(update={"validation_report": report, **base_log}, goto=END)
+            return Command(
+                update={"validation_report": report, "beat_validation": memo, **base_log},
+                goto=END,
+            )
 
         attempt = int(state.get("attempt_count") or 0) + 1
+        record_repair()
         report.repairs_applied.append(
             f"Attempt {attempt}: regenerate beats {failed_beats}"
         )
@@ -424,13 +859,13 @@ def validator_node(state: PipelineState) -> Command | dict:
             )
             report.ok = True
             return Command(
-                update={"validation_report": report, "attempt_count": attempt
+                update={"validation_report": report, "attempt_count": attempt,
+                        "beat_validation": memo,
                         **base_log, **repair_log}, 
                 goto=END
             )
 
-        qb = state.get("questions_by_beat", {}) or {}
-        qb_cleared = clear_failed_beats_questions(qb, failed_beats)
+        qb_cleared = clear_failed_beats_questions(failed_beats)
 
         # Create regen sends
         beat_plan = state.get("beat_plan", []) or []
@@ -438,7 +873,8 @@ def validator_node(state: PipelineState) -> Command | dict:
         program_type = state["user_input"].program_type
 
         sends = regenerate_questions(failed_beats, 
-                                     plan_map, program_type=program_type,redacted_input=source_text)
+                                     plan_map, program_type=program_type,redacted_input=source_text,
+                                     mode=_generation_mode(state))
 
         return Command(
             update={
@@ -446,6 +882,7 @@ def validator_node(state: PipelineState) -> Command | dict:
                 "attempt_count": attempt,
                 "failed_beats": failed_beats,
                 "failed_reasons": failed_reasons,
+                "beat_validation": memo,
                 "questions_by_beat": qb_cleared,
                 **base_log,
                 **repair_log,
@@ -453,31 +890,107 @@ def validator_node(state: PipelineState) -> Command | dict:
             goto=sends,
         )
     except Exception as e:
-        print(f"The following error occured: {e}")
+        # The run ends here, as before; the error reaches the stream and the
+        # audit sink instead of stdout.
+        return log_event(state, "validator", "error", {
+            "error_type": type(e).__name__,
+            "message": str(e),
+        })
+
+
+def route_start(state: PipelineState) -> str:
+    """
+    Fresh runs start at the redactor. A regen_request on a session that already
+    has a redaction and a beat plan skips straight to the regen router.
+    """
+    if state.get("regen_request") and state.get("redacted_input") and state.get("beat_plan"):
+        return "regen_router"
+    return "redactor"
+
+
+def route_after_redaction(state: PipelineState) -> list:
+    """
+    Normally the planner runs next. With speculative planning the generators
+    start at the same time from prompts.default_beat_plan, and the assembler
+    waits for both; beats that then fail validation are regenerated from the
+    planner's plan.
+    """
+    if not _speculative(state):
+        return ["beat_planner"]
+    program_type = state["user_input"].program_type
+    return ["beat_planner", *generation_sends(
+        list(default_beat_plan(program_type)), program_type,
+        state["redacted_input"], _generation_mode(state),
+    )]
+
 
+def regen_router_node(state: PipelineState) -> Command:
+    """
+    User-driven regeneration of the beats named in regen_request.
+    Reuses the session's redaction and beat plan; the other beats keep their
+    assembled questions and validation results.
+    """
+    requested = set(state.get("regen_request") or [])
+    beats = [b for b in ALL_BEATS if b in requested]
+    plan_map = {bp.beat: bp for bp in state.get("beat_plan") or []}
+    program_type = state["user_input"].program_type
 
-def create_graph():
+    tasks = [plan_map.get(b) or BeatPlanItem(beat=b, missing=[], guidance=None) for b in beats]
+    # The user asked for different questions; never serve them from cache.
+    sends = generation_sends(tasks, program_type, state["redacted_input"],
+                             _generation_mode(state), skip_cache=True)
+    log_patch = log_event(state, "regen_router", "regen_requested", {"beats": beats})
+    return Command(
+        update={
+            "questions_by_beat": clear_failed_beats_questions(beats),
+            "regen_request": [],
+            "attempt_count": 0,
+            **log_patch,
+        },
+        goto=sends or END,
+    )
+
+
+def create_graph(use_async: bool = False, checkpointer=None):
+    """
+    Builds the pipeline graph. With use_async=True the LLM nodes await the
+    model (drive it with GRAPH.astream); the CPU-bound nodes stay sync and
+    LangGraph runs them in its executor.
+
+    With a checkpointer every run needs a thread id in its config
+    (see agents/checkpoints.session_config) and can later be resumed.
+    """
     builder = StateGraph(PipelineState)
 
-    builder.add_node("redactor", make_redactor_node())
-    builder.add_node("beat_planner", beat_planner_node)
-    builder.add_node("question_generator", question_generator_worker)
-    builder.add_node("assembler", assembler_node)
-    builder.add_node("validator", validator_node)
+    def add(name: str, node) -> None:
+        builder.add_node(name, instrument(name, node))
+
+    add("redactor", make_redactor_node())
+    add("regen_router", regen_router_node)
+    add("beat_planner", abeat_planner_node if use_async else beat_planner_node)
+    add("question_generator", aquestion_generator_worker if use_async else question_generator_worker)
+    add("batch_generator", abatch_generator_worker if use_async else batch_generator_worker)
+    add("assembler", assembler_node)
+    add("validator", validator_node)
 
-    builder.add_edge(START, "redactor")
-    builder.add_edge("redactor", "beat_planner")
+    builder.add_conditional_edges(START, route_start, ["redactor", "regen_router"])
+    builder.add_conditional_edges("redactor", route_after_redaction,
+                                  ["beat_planner", "question_generator", "batch_generator"])
 
     builder.add_edge("question_generator", "assembler")
+    builder.add_edge("batch_generator", "assembler")
     builder.add_edge("assembler", "validator")
     builder.add_edge("validator", END)
 
-    graph = builder.compile()
+    graph = builder.compile(checkpointer=checkpointer)
     return graph
 
 
-GRAPH = create_graph()
-def run_pipeline(user_input: UserInput) -> dict[Beat, list[QuestionObject]]:
+GRAPH = create_graph(checkpointer=make_checkpointer())
+def run_pipeline(user_input: UserInput,
+                 generation_mode: str | None = None,
+                 speculative_planning: bool | None = None,
+                 ) -> dict[Beat, list[QuestionObject]]:
     """
     Exapmle of an user input:
     exp1 = {
@@ -493,10 +1006,28 @@ def run_pipeline(user_input: UserInput) -> dict[Beat, list[QuestionObject]]:
 
     THEN write
     user_input = UserInput.model_validate(exp1)
+
+    generation_mode ("fanout"/"batched") overrides GENERATION_MODE and
+    speculative_planning overrides SPECULATIVE_PLANNING for this run.
     """
 
     try:
-        out = GRAPH.invoke({"user_input": user_input})
+        init: dict[str, Any] = {"user_input": user_input}
+        if generation_mode:
+            init["generation_mode"] = generation_mode
+        if speculative_planning is not None:
+            init["speculative_planning"] = speculative_planning
+        out = GRAPH.invoke(init, session_config(new_thread_id()))
         return out
     except Exception as e:
         print(f"Exception occured due to {type(e)} as follows | {e}.")
+
+
+def regenerate_beats(session_state: PipelineState, beats: list[Beat]) -> PipelineState:
+    """
+    Regenerates just `beats` for a finished run (e.g. the output of run_pipeline)
+    without re-running the redactor or planner.
+    """
+    return GRAPH.invoke(
+        {**session_state, "regen_request": beats}, session_config(new_thread_id())
+    )
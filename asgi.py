@@ -0,0 +1,314 @@
+# asyncio-native entrypoint for the pipeline routes.
+#
+#   uvicorn asgi:app --port 10000
+#
+# Same request/response contract as main.py, but the graph is driven with
+# astream and the LLM nodes await the model, so an in-flight session holds a
+# coroutine instead of an OS thread.
+
+from asyncio import ensure_future, shield, to_thread, wait
+from json import dumps, loads
+from os import environ
+from typing import Any
+from urllib.parse import parse_qs
+
+from pydantic import ValidationError
+
+from agents.models import UserInput
+from agents.registry import registry, PRELOAD_MODELS
+from agents.validation_utils import create_custom_errors
+from agents.checkpoints import new_thread_id
+from agents.llm_scheduler import llm_scheduler
+from agents.telemetry import metrics as telemetry
+from agents.validator_engine import entity_extractor
+from agents.audit import audit_stats
+from agents.cohort import batch_events, batch_running, output_path
+from agents.serializer import ndjson, parse_result_fields
+from agents.singleflight import SingleFlight, flight_key, request_fingerprint
+from agents.admission import admission
+from agents.config import ADMISSION, ADMISSION_CLIENT_HEADER, SINGLEFLIGHT
+from agents.streaming import (
+    initial_state,
+    parse_generation_mode,
+    parse_speculative_planning,
+    parse_regen_beats,
+    replay_events,
+    asession_snapshot,
+    astream_events,
+    stream_stats,
+    unfinished,
+)
+
+if environ.get("PRELOAD_MODELS", "").lower() in ("1", "true", "yes"):
+    registry.warmup(PRELOAD_MODELS)
+
+flights = SingleFlight()
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def _start(send, status: int, content_type: str, headers: tuple = ()) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), *headers],
+    })
+
+
+async def _send_json(send, status: int, obj: Any, headers: tuple = ()) -> None:
+    await _start(send, status, "application/json", headers)
+    await send({"type": "http.response.body", "body": dumps(obj).encode()})
+
+
+async def _stream(send, events) -> None:
+    try:
+        await _stream_lines(send, (ndjson(ev) async for ev in events))
+    finally:
+        # Runs the generator's cleanup now rather than whenever it is collected.
+        await events.aclose()
+
+
+async def _stream_lines(send, lines, headers: tuple = ()) -> None:
+    await _start(send, 200, "application/x-ndjson", headers)
+    async for line in lines:
+        await send({"type": "http.response.body", "body": line, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+_END = object()
+
+
+async def _athread(events):
+    """
+    Iterates a blocking generator off the event loop, closing it when the
+    stream ends early (client gone, send failed) so it stops its work too.
+    """
+    it = iter(events)
+    step = None
+    try:
+        while True:
+            # Shielded: on cancel the thread is still inside next(), and the
+            # generator can only be closed once it has returned.
+            step = ensure_future(to_thread(next, it, _END))
+            ev = await shield(step)
+            step = None
+            if ev is _END:
+                return
+            yield ev
+    finally:
+        if step is not None:
+            await wait((step,))
+        if hasattr(it, "close"):
+            await to_thread(it.close)
+
+
+async def _read_json(receive) -> Any:
+    try:
+        return loads(await _read_body(receive) or b"null")
+    except ValueError:
+        return None
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Built inside the loop: the async SQLite checkpointer binds to it.
+            registry.get("agraph")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def health(scope, receive, send) -> None:
+    await _send_json(send, 200, {"status": "ok", "stream": stream_stats(), "llm": llm_scheduler.stats(),
+                                    "entities": entity_extractor.stats(), "audit": audit_stats(),
+                                    "single_flight": flights.stats(),
+                                    "admission": admission.stats()})
+
+
+async def prometheus_metrics(scope, receive, send) -> None:
+    await _start(send, 200, "text/plain; version=0.0.4")
+    await send({"type": "http.response.body", "body": telemetry.render().encode()})
+
+
+async def run_stream(scope, receive, send) -> None:
+    data = await _read_json(receive)
+    if not data:
+        return await _send_json(send, 400, {"error": "No JSON data provided."})
+
+    try:
+        user_input = UserInput.model_validate(data)
+    except ValidationError as e:
+        await _start(send, 400, "application/x-ndjson")
+        line = ndjson({"type": "error", "error": "INPUT_VALIDATION", "data": create_custom_errors(e)})
+        return await send({"type": "http.response.body", "body": line})
+
+    try:
+        generation_mode = parse_generation_mode(data)
+        speculative = parse_speculative_planning(data)
+        fields = parse_result_fields(data)
+    except ValueError as e:
+        return await _send_json(send, 400, {"error": str(e)})
+
+    graph = registry.get("agraph")
+    init_state = initial_state(user_input, generation_mode, speculative)
+
+    thread_id = new_thread_id() if graph.checkpointer is not None else None
+
+    def run():
+        return astream_events(graph, init_state, thread_id=thread_id, fields=fields)
+
+    if not SINGLEFLIGHT:
+        return await _admitted(scope, send, run)
+
+    client = _client(scope)
+
+    def admit(make_events):
+        ticket = admission.enter(client, asynchronous=True)
+        return None if ticket is None else (lambda: admission.aevents(ticket, make_events))
+
+    # Duplicates (same Idempotency-Key, or same client, input and options) share one
+    # run. Only the request that starts it goes through admission; the others
+    # follow its stream and never queue or hold a slot.
+    fingerprint = request_fingerprint(user_input, generation_mode=generation_mode,
+                                      speculative=speculative, fields=fields)
+    idempotency_key = dict(scope["headers"]).get(b"idempotency-key", b"").decode("latin-1")
+    lines, outcome = flights.arun(flight_key(idempotency_key, fingerprint, client), fingerprint, run,
+                                  thread_id=thread_id, admit=admit if ADMISSION else None)
+    if outcome == "shed":
+        return await _send_busy(send)
+    if lines is None:
+        return await _send_json(send, 409, {"error": "Idempotency-Key was already used for a different request."})
+    await _stream_lines(send, lines, ((b"x-single-flight", outcome.encode()),))
+
+
+async def _send_busy(send) -> None:
+    await _send_json(send, 503, {"error": "The server is busy; try again shortly."},
+                     ((b"retry-after", str(admission.retry_after_s()).encode()),))
+
+
+def _client(scope) -> str:
+    client = dict(scope["headers"]).get(ADMISSION_CLIENT_HEADER.lower().encode(), b"").decode("latin-1")
+    return client or (scope.get("client") or ("",))[0]
+
+
+async def _admitted(scope, send, make_events) -> None:
+    """
+    Streams make_events() through admission control: at most
+    ADMISSION_MAX_IN_FLIGHT runs; the rest queue (streaming their position)
+    or, when the queue is full, are shed with 503.
+    """
+    ticket = admission.enter(_client(scope), asynchronous=True) if ADMISSION else None
+    if ADMISSION and ticket is None:
+        return await _send_busy(send)
+    try:
+        await _stream(send, make_events() if ticket is None else admission.aevents(ticket, make_events))
+    finally:
+        if ticket is not None:
+            admission.close(ticket)
+
+
+async def run_batch(scope, receive, send) -> None:
+    # Cohort runs use the sync graph on a thread pool (agents/cohort.py), so
+    # the whole batch runs in a worker thread.
+    args = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+    batch_id = args.get("batch_id") or new_thread_id()
+    try:
+        output_path(batch_id)
+        generation_mode = parse_generation_mode(args)
+        fields = parse_result_fields(args)
+    except ValueError as e:
+        return await _send_json(send, 400, {"error": str(e)})
+
+    lines = (await _read_body(receive)).splitlines()
+    if not any(line.strip() for line in lines):
+        return await _send_json(send, 400, {"error": "No profiles provided."})
+    if batch_running(batch_id):
+        return await _send_json(send, 409, {"error": f"Batch {batch_id} is already running."})
+    # Each profile takes its own admission slot (blocking its cohort thread
+    # while queued), so a batch shares capacity with interactive runs.
+    client = _client(scope)
+    admit = (lambda run: admission.call(client, run)) if ADMISSION else None
+    await _stream(send, _athread(batch_events(lines, batch_id, generation_mode=generation_mode,
+                                                   fields=fields, admit=admit)))
+
+
+async def resume_stream(scope, receive, send) -> None:
+    data = await _read_json(receive)
+    data = data if isinstance(data, dict) else {}
+    thread_id = data.get("thread_id")
+    try:
+        fields = parse_result_fields(data)
+    except ValueError as e:
+        return await _send_json(send, 400, {"error": str(e)})
+    # A session whose single-flight run is still going is followed, not run again.
+    lines = flights.aattach(thread_id)
+    if lines is not None:
+        return await _stream_lines(send, lines, ((b"x-single-flight", b"joined"),))
+    graph = registry.get("agraph")
+    snapshot = await asession_snapshot(graph, thread_id)
+    if snapshot is None:
+        return await _send_json(send, 404, {"error": "Unknown session."})
+
+    if unfinished(snapshot):
+        # The rest of the run needs a slot like any other run.
+        return await _admitted(scope, send, lambda: astream_events(
+            graph, None, thread_id=thread_id, seed_state=snapshot.values, replay=True, fields=fields))
+    await _stream(send, _athread(replay_events(thread_id, snapshot.values, fields)))
+
+
+async def regen_stream(scope, receive, send) -> None:
+    data = await _read_json(receive)
+    data = data if isinstance(data, dict) else {}
+    thread_id = data.get("thread_id")
+    beats = parse_regen_beats(data)
+    if beats is None:
+        return await _send_json(send, 400, {"error": "Provide a non-empty list of beats (A-E)."})
+    try:
+        fields = parse_result_fields(data)
+    except ValueError as e:
+        return await _send_json(send, 400, {"error": str(e)})
+
+    if flights.running(thread_id):
+        return await _send_json(send, 409, {"error": "Session is still running; resume it first."})
+
+    graph = registry.get("agraph")
+    snapshot = await asession_snapshot(graph, thread_id)
+    if snapshot is None:
+        return await _send_json(send, 404, {"error": "Unknown session."})
+    if unfinished(snapshot):
+        return await _send_json(send, 409, {"error": "Session is still running; resume it first."})
+
+    await _admitted(scope, send, lambda: astream_events(graph, {"regen_request": beats}, thread_id=thread_id,
+                                                        seed_state=snapshot.values, fields=fields))
+
+
+ROUTES = {
+    ("GET", "/health"): health,
+    ("GET", "/metrics"): prometheus_metrics,
+    ("POST", "/api/pipeline/run_stream"): run_stream,
+    ("POST", "/api/pipeline/batch"): run_batch,
+    ("POST", "/api/pipeline/resume_stream"): resume_stream,
+    ("POST", "/api/pipeline/regen_stream"): regen_stream,
+}
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        return await _send_json(send, 404, {"error": "Not found."})
+    await handler(scope, receive, send)
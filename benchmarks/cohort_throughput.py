@@ -0,0 +1,74 @@
+"""
+Cohort throughput (agents/cohort.py): profiles/min by concurrency, and resume.
+
+Writes --profiles synthetic profiles to a JSONL file and runs the whole cohort
+once per --concurrency value (1 is the run_pipeline-in-a-loop baseline),
+reporting profiles/min. Then it checks resumption: a run is stopped after
+half the profiles, resumed from its output file, and every profile must end
+up with exactly one "ok" line.
+Exits non-zero if it does not. Needs COHERE_API_KEY and the Presidio spaCy
+model; with --fake the chat model is agents/fake_llm.py.
+
+Usage (from the repo root):
+    python -m benchmarks.cohort_throughput --profiles 100 --concurrency 1 4 8 16 --fake
+"""
+
+from argparse import ArgumentParser
+from collections import Counter
+from json import dumps, loads
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import sys
+
+import agents.workflow as workflow
+from agents.cohort import _open_append, iter_cohort, read_records, run_cohort, write_results
+from benchmarks.corpus import make_profiles
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fake", action="store_true", help="use the offline fake chat model")
+    parser.add_argument("--fake-latency", type=float, default=0.8)
+    args = parser.parse_args()
+
+    # Distinct runs each time; the planner cache would make repeats free.
+    workflow.PLANNER_CACHE = False
+    if args.fake:
+        from agents.fake_llm import FakeChatModel
+
+        workflow.set_llm_backend(lambda: FakeChatModel(
+            latency_dist="lognormal", latency_s=args.fake_latency, sigma=0.3, seed=args.seed,
+        ))
+
+    with TemporaryDirectory() as tmp:
+        in_path = Path(tmp) / "cohort.jsonl"
+        in_path.write_text("".join(
+            dumps({"id": f"p{i}", **p.model_dump()}) + "\n"
+            for i, p in enumerate(make_profiles(args.profiles, seed=args.seed))
+        ))
+
+        print(f"{'concurrency':>11} {'profiles/min':>13} {'elapsed s':>10} {'ok':>5}")
+        for c in args.concurrency:
+            stats = run_cohort(in_path, Path(tmp) / f"out-{c}.jsonl", concurrency=c, resume=False)
+            print(f"{c:>11} {stats['profiles_per_min']:>13.1f} {stats['elapsed_s']:>10.2f} {stats['ok']:>5}")
+
+        out_path = Path(tmp) / "resumed.jsonl"
+        c = max(args.concurrency)
+        with in_path.open() as f, _open_append(out_path) as out:
+            results = iter_cohort(read_records(f), concurrency=c)
+            write_results((line for _, line in zip(range(args.profiles // 2), results)), out)
+            results.close()
+        first = len(out_path.read_text().splitlines())
+        stats = run_cohort(in_path, out_path, concurrency=c)
+        oks = Counter(r["id"] for r in map(loads, out_path.read_text().splitlines()) if r["status"] == "ok")
+        ok = len(oks) == args.profiles and set(oks.values()) == {1}
+        print(f"resume: {first} written before the stop, {stats['skipped']} skipped and "
+              f"{stats['ok']} run on resume; every profile exactly once: {ok}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
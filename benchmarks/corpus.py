@@ -0,0 +1,50 @@
+"""
+Synthetic applicant profiles shared by the benchmarks.
+"""
+
+from random import Random
+
+from agents.models import UserInput
+
+_SCHOLARSHIPS = [
+    ("UofT Summer Research Experience Award", "Undergrad"),
+    ("NSERC CGS-M", "Graduate"),
+    ("Vector Institute Scholarship in AI", "Graduate"),
+    ("City of Toronto Youth Community Grant", "Community Grant"),
+    ("Mitacs Globalink Research Internship", "Research"),
+    ("Vanier Canada Graduate Scholarship", "PhD"),
+]
+
+_GOALS = [
+    "I want to explore computer vision for medical imaging and learn how to do research with a lab team.",
+    "I want to research robust representation learning for scientific imaging, bridging physics and deep learning.",
+    "I want to build free coding workshops for newcomer youth in Scarborough with Maria Lopez.",
+    "I want to study how language models can support accessible education in rural Ontario.",
+]
+
+_POINTS = [
+    "Built a PyTorch object detector and evaluated mAP on a custom dataset",
+    "Led a 4-person hackathon team; shipped a full-stack web app in 36 hours",
+    "Tutored calculus and linear algebra; created weekly practice sets for 30+ students",
+    "Trained contrastive models to learn embeddings from high-dimensional click probability data",
+    "Implemented Faster R-CNN and YOLO pipelines; compared metrics and inference speed",
+    "Wrote reproducible ML training scripts with deterministic seeds and artifact versioning",
+    "Conducted research under Prof. Geoffrey Hinton at the University of Toronto",
+    "Organized weekly paper reading groups for over 15 students; contact me at jane.doe@example.com",
+    "Volunteered at the Daily Bread Food Bank in Etobicoke, coordinating 20 volunteers",
+    "Published a portfolio at https://janedoe.dev and answered mentees at 416-555-0199",
+]
+
+
+def make_profiles(n: int, seed: int = 0) -> list[UserInput]:
+    rng = Random(seed)
+    profiles = []
+    for _ in range(n):
+        name, program_type = rng.choice(_SCHOLARSHIPS)
+        profiles.append(UserInput(
+            scholarship_name=name,
+            program_type=program_type,
+            goal_one_liner=rng.choice(_GOALS),
+            resume_points=rng.sample(_POINTS, 3),
+        ))
+    return profiles
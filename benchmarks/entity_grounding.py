@@ -0,0 +1,96 @@
+"""
+Time the validator's entity-grounding stage adds per run.
+
+Each run validates 10 questions (2 per beat) against its profile's input:
+  per-question  validation_utils._ungrounded_entities, one nlp() call per question;
+  batched       validator_engine.EntityExtractor, one nlp.pipe pass, cold cache;
+  cached        the same questions again (a repair cycle re-checking its beats).
+Reports p50/p95 ms per run and how many questions skipped the entity check
+under the latency budget. Needs en_core_web_sm.
+
+Usage (from the repo root):
+    python -m benchmarks.entity_grounding --runs 100 --budget-ms 10
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from statistics import quantiles
+from time import perf_counter
+
+from agents.prompts import _build_canonical_input
+from agents.registry import registry
+from agents.validation_utils import _norm, _ungrounded_entities
+from agents.validator_engine import EntityExtractor
+from benchmarks.corpus import make_profiles
+
+_TEMPLATES = [
+    "What drew you to {org} rather than a similar program?",
+    "How did your work with {person} change your approach to research?",
+    "What would you do differently if you ran the {org} workshop again next year?",
+    "Which result from your time in {place} are you most proud of?",
+    "How did you decide what to cut when the deadline moved up by two weeks?",
+    "What did the students you tutored say about your sessions?",
+    "Why does this scholarship matter for your plans after graduation?",
+    "How would you measure whether your outreach actually reached new students?",
+]
+_ORGS = ["Vector Institute", "Google", "the Toronto Public Library", "MIT", "NeurIPS"]
+_PEOPLE = ["Prof Hinton", "Maria Lopez", "Dr. Chen", "your advisor"]
+_PLACES = ["Toronto", "Montreal", "the lab", "Berlin"]
+
+
+def _questions(rng: Random) -> list[str]:
+    return [
+        rng.choice(_TEMPLATES).format(org=rng.choice(_ORGS), person=rng.choice(_PEOPLE),
+                                      place=rng.choice(_PLACES))
+        for _ in range(10)
+    ]
+
+
+def _pcts(xs: list[float]) -> str:
+    q = quantiles(xs, n=100, method="inclusive")
+    return f"p50 {q[49]:6.2f}  p95 {q[94]:6.2f}"
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--budget-ms", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    nlp = registry.get("ner_model")
+    if nlp is None:
+        raise SystemExit("en_core_web_sm is not installed.")
+    nlp("Warm up the pipeline.")
+
+    rng = Random(args.seed)
+    runs = [(_questions(rng), _norm(_build_canonical_input(p)))
+            for p in make_profiles(args.runs, seed=args.seed)]
+    extractor = EntityExtractor(budget_ms=args.budget_ms, max_entries=0)
+    cached = EntityExtractor(budget_ms=args.budget_ms)
+
+    per_question, batched, warm = [], [], []
+    for questions, source_norm in runs:
+        t0 = perf_counter()
+        for q in questions:
+            _ungrounded_entities(q, "", source_norm)
+        per_question.append((perf_counter() - t0) * 1000)
+
+        t0 = perf_counter()
+        extractor.extract(questions)
+        batched.append((perf_counter() - t0) * 1000)
+
+        cached.extract(questions)
+        t0 = perf_counter()
+        cached.extract(questions)
+        warm.append((perf_counter() - t0) * 1000)
+
+    print(f"ms per run ({args.runs} runs x 10 questions, budget {args.budget_ms} ms)")
+    print(f"  per-question nlp(): {_pcts(per_question)}")
+    print(f"  batched nlp.pipe:   {_pcts(batched)}")
+    print(f"  cached (repair):    {_pcts(warm)}")
+    print("batched stats:", extractor.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Fan-out vs batched question generation (GENERATION_MODE) on real pipeline runs.
+
+Each profile runs through the full graph once per mode. Per mode it reports
+latency, LLM calls, input/output tokens (from the model's usage metadata) and
+validator pass rates: first pass (no repair needed) and final (no failed beats).
+The response cache is bypassed so every call reaches the model.
+Needs COHERE_API_KEY and the Presidio spaCy model.
+
+Usage (from the repo root):
+    python -m benchmarks.generation_modes --runs 20
+"""
+
+from argparse import ArgumentParser
+from statistics import mean, quantiles
+from threading import Lock
+from time import perf_counter
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import agents.workflow as workflow
+from agents.checkpoints import new_thread_id, session_config
+from benchmarks.corpus import make_profiles
+
+
+class UsageCounter(BaseCallbackHandler):
+    """
+    Counts chat model calls and their token usage across a run.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        with self._lock:
+            self.calls += 1
+            for gens in response.generations:
+                for gen in gens:
+                    usage = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                    self.input_tokens += usage.get("input_tokens", 0)
+                    self.output_tokens += usage.get("output_tokens", 0)
+
+
+def _run(user_input, mode: str) -> dict:
+    usage = UsageCounter()
+    config = {**session_config(new_thread_id()), "callbacks": [usage]}
+    t0 = perf_counter()
+    state = workflow.GRAPH.invoke({"user_input": user_input, "generation_mode": mode}, config)
+    memo = state.get("beat_validation") or {}
+    return {
+        "latency_s": perf_counter() - t0,
+        "calls": usage.calls,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "first_pass": int(state.get("attempt_count") or 0) == 0,
+        "final_pass": not any(v.reasons for v in memo.values()),
+    }
+
+
+def _pct(xs: list[float], q: int) -> float:
+    return quantiles(xs, n=100)[q - 1] if len(xs) > 1 else xs[0]
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--modes", nargs="+", default=["fanout", "batched"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Measure real model calls: no planner/generator cache hits between modes.
+    workflow.PLANNER_CACHE = False
+    workflow.GENERATOR_CACHE = False
+
+    profiles = make_profiles(args.runs, seed=args.seed)
+    print(f"{'mode':>8} {'p50 s':>7} {'p95 s':>7} {'calls':>6} {'in tok':>8} {'out tok':>8} "
+          f"{'1st pass':>9} {'final':>6}")
+    for mode in args.modes:
+        rows = [_run(p, mode) for p in profiles]
+        lat = [r["latency_s"] for r in rows]
+        print(f"{mode:>8} {_pct(lat, 50):>7.2f} {_pct(lat, 95):>7.2f} "
+              f"{mean(r['calls'] for r in rows):>6.1f} "
+              f"{mean(r['input_tokens'] for r in rows):>8.0f} "
+              f"{mean(r['output_tokens'] for r in rows):>8.0f} "
+              f"{mean(r['first_pass'] for r in rows):>9.0%} "
+              f"{mean(r['final_pass'] for r in rows):>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
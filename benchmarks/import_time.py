@@ -0,0 +1,71 @@
+"""
+Import-time regression check for the backend entrypoint.
+
+Runs `import main` in a fresh interpreter (lazy mode, no preload) and fails
+if the best wall time over N runs exceeds the budget.
+
+Usage (from the repo root):
+    python -m benchmarks.import_time --budget 1.0 --runs 3
+"""
+
+from argparse import ArgumentParser
+from os import environ
+from pathlib import Path
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Prints the wall time of `import main` measured inside the child process,
+# so interpreter startup is not counted against the budget.
+_PROBE = (
+    "import time; t0 = time.perf_counter(); import main; "
+    "print(time.perf_counter() - t0)"
+)
+
+
+def _run_once() -> float:
+    env = {k: v for k, v in environ.items() if k != "PRELOAD_MODELS"}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _top_imports(n: int = 10) -> list[tuple[int, str]]:
+    env = {k: v for k, v in environ.items() if k != "PRELOAD_MODELS"}
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main() -> int:
+    parser = ArgumentParser()
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    times = [_run_once() for _ in range(args.runs)]
+    best = min(times)
+    print(f"import main: best={best:.3f}s runs={[round(t, 3) for t in times]}")
+
+    if best > args.budget:
+        print(f"FAIL: over budget ({args.budget:.3f}s). Slowest imports (cumulative us):")
+        for us, name in _top_imports():
+            print(f"  {us:>10} {name}")
+        return 1
+    print(f"OK: within budget ({args.budget:.3f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
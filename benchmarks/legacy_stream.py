@@ -0,0 +1,26 @@
+"""
+The streaming layer's dict builders from before agents/serializer.py, kept so
+benchmarks can reproduce the previous encoding path.
+"""
+
+
+def dump_pii(spans) -> list[dict]:
+    out = []
+    for s in (spans or []):
+        if hasattr(s, "model_dump"):
+            out.append(s.model_dump())
+        elif isinstance(s, dict):
+            out.append(s)
+        else:
+            out.append({"start": getattr(s, "start", None),
+                        "end": getattr(s, "end", None),
+                        "pii_type": getattr(s, "pii_type", None),
+                        "confidence": getattr(s, "confidence", None)})
+    return out
+
+
+def dump_questions(by_beat) -> dict[str, list[dict]]:
+    return {
+        b: [q.model_dump() if hasattr(q, "model_dump") else q for q in qs]
+        for b, qs in (by_beat or {}).items()
+    }
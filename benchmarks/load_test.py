@@ -0,0 +1,123 @@
+"""
+End-to-end load test of /api/pipeline/run_stream.
+
+Drives `--requests` pipeline runs through `--concurrency` client threads and
+reports requests/sec and p50/p95/p99 of
+  * end-to-end latency (request sent -> stream closed),
+  * time to first event (first NDJSON line),
+  * time to first question (first question_delta event).
+
+Against a running server (Flask or `uvicorn asgi:app`):
+    python -m benchmarks.load_test --url http://127.0.0.1:10000 --concurrency 16
+
+Without --url it starts the Flask app in-process on the fake LLM backend
+(LLM_BACKEND=fake, agents/fake_llm.py), so it needs no network or API key;
+only the Presidio spaCy model:
+    python -m benchmarks.load_test --concurrency 16 --requests 200
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from json import dumps, loads
+from os import environ
+from statistics import quantiles
+from threading import Thread
+from time import perf_counter
+from urllib.parse import urlparse
+
+from benchmarks.corpus import make_profiles
+
+
+def _pcts(xs: list[float]) -> str:
+    if not xs:
+        return "n/a"
+    if len(xs) == 1:
+        return f"{xs[0]:.0f}"
+    q = quantiles(xs, n=100, method="inclusive")
+    return f"p50 {q[49]:.0f}  p95 {q[94]:.0f}  p99 {q[98]:.0f}"
+
+
+def run_one(host: str, port: int, body: bytes) -> dict:
+    """
+    One streamed run; times in ms.
+    """
+    t0 = perf_counter()
+    first_event = first_question = None
+    status, last_type = None, None
+    conn = HTTPConnection(host, port, timeout=300)
+    try:
+        conn.request("POST", "/api/pipeline/run_stream", body=body,
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        status = resp.status
+        while True:
+            line = resp.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            now = (perf_counter() - t0) * 1000
+            if first_event is None:
+                first_event = now
+            last_type = loads(line).get("type")
+            if last_type == "question_delta" and first_question is None:
+                first_question = now
+    finally:
+        conn.close()
+    return {
+        "ok": status == 200 and last_type == "result",
+        "status": status,
+        "e2e_ms": (perf_counter() - t0) * 1000,
+        "first_event_ms": first_event,
+        "first_question_ms": first_question,
+    }
+
+
+def _start_local_server() -> tuple[str, int]:
+    environ.setdefault("LLM_BACKEND", "fake")
+    from werkzeug.serving import make_server
+
+    from main import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return "127.0.0.1", server.server_port
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--url", default=None, help="server base URL; default: in-process Flask + fake LLM")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = _start_local_server()
+
+    bodies = [dumps(p.model_dump()).encode() for p in make_profiles(args.requests)]
+    for body in bodies[:args.warmup]:
+        run_one(host, port, body)
+
+    t0 = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda b: run_one(host, port, b), bodies))
+    wall = perf_counter() - t0
+
+    ok = [r for r in results if r["ok"]]
+    print(f"{len(ok)}/{len(results)} ok at concurrency {args.concurrency}; "
+          f"{len(results) / wall:.2f} req/s over {wall:.1f}s")
+    print("end-to-end ms:        ", _pcts([r["e2e_ms"] for r in ok]))
+    print("first event ms:       ", _pcts([r["first_event_ms"] for r in ok if r["first_event_ms"] is not None]))
+    print("first question ms:    ", _pcts([r["first_question_ms"] for r in ok if r["first_question_ms"] is not None]))
+    failed = [r["status"] for r in results if not r["ok"]]
+    if failed:
+        print("failed statuses:", failed)
+
+
+if __name__ == "__main__":
+    main()
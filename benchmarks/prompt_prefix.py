@@ -0,0 +1,68 @@
+"""
+Prompt-build time and shared-prefix ratio of the generator prompts.
+
+For each profile, builds the five per-beat generator prompts of one run and
+reports the mean build time per prompt and the share of each prompt that is a
+common, byte-identical prefix across the five (what a provider-side prefix
+cache can reuse). Needs no model or API key.
+
+Usage (from the repo root):
+    python -m benchmarks.prompt_prefix --profiles 50 --repeat 200
+"""
+
+from argparse import ArgumentParser
+from os.path import commonprefix
+from statistics import mean
+from time import perf_counter
+
+from agents.config import ALL_BEATS
+from agents.models import BeatPlanItem
+from agents.prompts import (
+    _build_canonical_input,
+    beat_planner_messages,
+    question_generator_messages,
+)
+from benchmarks.corpus import make_profiles
+
+
+def _flatten(messages: list[dict]) -> str:
+    return "".join(m["content"] for m in messages)
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    tasks = [
+        BeatPlanItem(beat=b, missing=["a concrete outcome", "why this program"],
+                     guidance="Tie the story to the opportunity.")
+        for b in ALL_BEATS
+    ]
+
+    build_us, planner_us, shares = [], [], []
+    for profile in make_profiles(args.profiles):
+        source = _build_canonical_input(profile)
+
+        t0 = perf_counter()
+        for _ in range(args.repeat):
+            prompts = [question_generator_messages(t, profile.program_type, source) for t in tasks]
+        build_us.append((perf_counter() - t0) / (args.repeat * len(tasks)) * 1e6)
+
+        t0 = perf_counter()
+        for _ in range(args.repeat):
+            beat_planner_messages(profile.program_type, source)
+        planner_us.append((perf_counter() - t0) / args.repeat * 1e6)
+
+        texts = [_flatten(p) for p in prompts]
+        shares.append(len(commonprefix(texts)) / mean(len(t) for t in texts))
+
+    print(f"generator prompt build: {mean(build_us):.1f} us/prompt")
+    print(f"planner prompt build:   {mean(planner_us):.1f} us/prompt")
+    print(f"shared prefix across the five beats: {mean(shares):.1%} "
+          f"(min {min(shares):.1%})")
+
+
+if __name__ == "__main__":
+    main()
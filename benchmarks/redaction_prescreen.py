@@ -0,0 +1,100 @@
+"""
+Parity and latency of the tiered (pre-screened) redactor against full Presidio analysis.
+
+Every text in the golden corpus is analyzed both ways; the PiiSpans must be
+identical (compared order-insensitively, since Presidio's own ordering of tied
+results is not stable). Exits non-zero on any mismatch.
+Needs the Presidio spaCy model (en_core_web_lg).
+
+Usage (from the repo root):
+    python -m benchmarks.redaction_prescreen --profiles 200
+tests/test_pii_prescreen.py runs the same check on a blank spaCy pipeline.
+"""
+
+from argparse import ArgumentParser
+from collections import Counter
+from statistics import mean, quantiles
+from time import perf_counter
+import sys
+
+from agents.pii_prescreen import plan, analyze_patterns_only
+from agents.prompts import _build_canonical_input
+from agents.redaction import DEFAULT_PII_ENTITIES
+from agents.registry import registry
+from benchmarks.corpus import make_profiles
+
+# Short texts that exercise each tier on their own.
+EXTRA_TEXTS = [
+    "built a detector and evaluated it on a custom dataset",
+    "tutored calculus for 30+ students over 2 terms",
+    "reach me at jane.doe@example.com or 416-555-0199",
+    "portfolio: https://janedoe.dev, card 4111 1111 1111 1111",
+    "Volunteered at a food bank in Etobicoke with Maria Lopez",
+    "[Resume Point #1] Led a 4-person team; shipped in 36 hours",
+    "worked with grant at the lab on imaging",
+    "Mentor: Grant, Faculty of Medicine",
+    "[Target Lab/Faculty Fit] Faculty advisor Grant Park",
+]
+
+
+def _spans(results) -> list[tuple]:
+    return sorted((r.start, r.end, r.entity_type, round(float(r.score), 6)) for r in results)
+
+
+def _tiered(text: str) -> tuple[list, str]:
+    tier, entities = plan(text, DEFAULT_PII_ENTITIES)
+    if tier == "skip":
+        return [], tier
+    if tier == "patterns":
+        return analyze_patterns_only(text, "en", entities), tier
+    return registry.get("analyzer").analyze(text=text, language="en", entities=entities), tier
+
+
+def _summary(ms: list[float]) -> str:
+    p = quantiles(ms, n=20)
+    return f"mean={mean(ms):.2f}ms p50={p[9]:.2f}ms p95={p[18]:.2f}ms"
+
+
+def main() -> int:
+    parser = ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=200)
+    args = parser.parse_args()
+
+    texts = [_build_canonical_input(p) for p in make_profiles(args.profiles)]
+    for p in make_profiles(args.profiles // 4, seed=1):
+        texts.extend(p.resume_points)
+    texts.extend(EXTRA_TEXTS)
+
+    analyzer = registry.get("analyzer")
+    analyzer.analyze(text=texts[0], language="en", entities=DEFAULT_PII_ENTITIES)
+
+    full_ms, tiered_ms, tiers, mismatches = [], [], Counter(), []
+    for text in texts:
+        t0 = perf_counter()
+        full = analyzer.analyze(text=text, language="en", entities=DEFAULT_PII_ENTITIES)
+        full_ms.append((perf_counter() - t0) * 1000)
+
+        t0 = perf_counter()
+        tiered, tier = _tiered(text)
+        tiered_ms.append((perf_counter() - t0) * 1000)
+        tiers[tier] += 1
+
+        if _spans(full) != _spans(tiered):
+            mismatches.append((text, _spans(full), _spans(tiered)))
+
+    print(f"texts={len(texts)} tiers={dict(tiers)}")
+    print(f"full   {_summary(full_ms)}")
+    print(f"tiered {_summary(tiered_ms)}")
+    print(f"speedup (mean) {mean(full_ms) / mean(tiered_ms):.2f}x")
+
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} texts differ")
+        for text, want, got in mismatches[:10]:
+            print(f"  {text[:60]!r}\n    full:   {want}\n    tiered: {got}")
+        return 1
+    print("OK: identical PiiSpans on the golden corpus")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Resubmit latency of the redactor with and without the per-line segment cache
+(REDACTION_SEGMENT_CACHE), plus parity with a whole-text analysis.
+
+For each profile, one resume bullet is edited and the edited input is redacted:
+  before  whole canonical input analyzed from scratch (segment_cache=False);
+  after   the original input was redacted first, so only the edited line misses.
+The cached path's pii_spans and redacted text are compared with the whole-text
+path; a mismatch is printed and the exit status is non-zero.
+Needs the Presidio spaCy model (en_core_web_lg).
+
+Usage (from the repo root):
+    python -m benchmarks.redaction_resubmit --profiles 100
+"""
+
+from argparse import ArgumentParser
+from statistics import quantiles
+from time import perf_counter
+import sys
+
+from agents.prompts import _build_canonical_input
+from agents.redaction import DEFAULT_PII_ENTITIES, redact, segment_cache
+from benchmarks.corpus import make_profiles
+
+_EDIT = " Presented the results to 40 members of the Toronto chapter."
+
+
+def _redact(text: str, cached: bool) -> tuple[float, list, str]:
+    t0 = perf_counter()
+    spans, redacted, *_ = redact(
+        text, language="en", entities=DEFAULT_PII_ENTITIES, operators={},
+        batch=False, segment_cache=cached,
+    )
+    return (perf_counter() - t0) * 1000, spans, redacted
+
+
+def _pcts(xs: list[float]) -> str:
+    q = quantiles(xs, n=100, method="inclusive")
+    return f"p50 {q[49]:7.2f}  p95 {q[94]:7.2f}"
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    profiles = make_profiles(args.profiles, seed=args.seed)
+    _redact(_build_canonical_input(profiles[0]), False)  # load the models
+
+    before, after, mismatches = [], [], 0
+    for i, profile in enumerate(profiles):
+        points = list(profile.resume_points)
+        j = i % len(points)
+        points[j] = points[j].rstrip(".") + "." + _EDIT
+        original = _build_canonical_input(profile)
+        edited = _build_canonical_input(profile.model_copy(update={"resume_points": points}))
+
+        ms, full_spans, full_text = _redact(edited, False)
+        before.append(ms)
+        _redact(original, True)
+        ms, spans, text = _redact(edited, True)
+        after.append(ms)
+
+        if spans != full_spans or text != full_text:
+            mismatches += 1
+            print(f"profile {i}: segment path differs from whole-text analysis")
+            print("  whole:  ", [(s.start, s.end, s.pii_type) for s in full_spans])
+            print("  segment:", [(s.start, s.end, s.pii_type) for s in spans])
+
+    print(f"resubmit ms, whole text:    {_pcts(before)}")
+    print(f"resubmit ms, segment cache: {_pcts(after)}")
+    print(f"mismatches: {mismatches}/{len(profiles)}; cache {segment_cache.stats()}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
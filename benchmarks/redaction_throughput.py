@@ -0,0 +1,56 @@
+"""
+Redaction throughput: unbatched analyzer.analyze vs the micro-batching RedactionService.
+
+Each concurrency level runs that many client threads over the same corpus and
+reports docs/sec for both paths. Needs the Presidio spaCy model (en_core_web_lg).
+
+Usage (from the repo root):
+    python -m benchmarks.redaction_throughput --docs 400 --concurrency 1 4 16 32
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from agents.prompts import _build_canonical_input
+from agents.redaction import DEFAULT_PII_ENTITIES, RedactionService
+from agents.registry import registry
+from benchmarks.corpus import make_profiles
+
+
+def _docs_per_sec(analyze, texts: list[str], concurrency: int) -> float:
+    t0 = perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(analyze, texts))
+    return len(texts) / (perf_counter() - t0)
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--docs", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    texts = [_build_canonical_input(p) for p in make_profiles(args.docs)]
+    analyzer = registry.get("analyzer")
+    service = RedactionService(batch_size=args.batch_size, max_wait_ms=args.max_wait_ms)
+
+    def unbatched(text):
+        return analyzer.analyze(text=text, language="en", entities=DEFAULT_PII_ENTITIES)
+
+    # Warm both paths so model loading isn't measured.
+    unbatched(texts[0])
+    service.analyze(texts[0])
+
+    print(f"{'concurrency':>11} {'unbatched/s':>12} {'batched/s':>10} {'speedup':>8}")
+    for c in args.concurrency:
+        base = _docs_per_sec(unbatched, texts, c)
+        batched = _docs_per_sec(service.analyze, texts, c)
+        print(f"{c:>11} {base:>12.1f} {batched:>10.1f} {batched / base:>7.2f}x")
+    print("service stats:", service.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Latency of the near-duplicate filter (agents/dedupe.py) by candidate count.
+
+Candidates are split over the five beats, as the assembler sees them with
+over-generation. A share of them are paraphrases of others (synonym swaps and
+reordered clauses). For each size it reports the median time of embedding,
+of the similarity matrix plus the greedy pass, and of the whole select_diverse
+call, and how many candidates survived. The "hashed" embedding needs no model;
+--embedding spacy needs en_core_web_lg.
+
+Usage (from the repo root):
+    python -m benchmarks.semantic_dedupe --sizes 10 50 100 300 --repeat 50
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from statistics import median
+from time import perf_counter
+
+from agents.config import ALL_BEATS, DEDUPE_THRESHOLD
+from agents.dedupe import embed, select_diverse
+
+_STEMS = [
+    "What first drew you to {x}, and what would you give up to pursue it?",
+    "Which project best shows the quality of your work on {x}?",
+    "Who benefited from {x}, and how did their situation change?",
+    "When did you have to lead {x} without formal authority?",
+    "What setback in {x} changed how you approach your work?",
+    "How would you explain {x} to someone outside your field?",
+    "What feedback on {x} surprised you the most?",
+    "Why does {x} matter for your plans after this program?",
+]
+_TOPICS = ["the reading group", "your 3D CNN project", "the tutoring program", "the food bank drive",
+           "your lab rotation", "the hackathon team", "the outreach workshop", "your thesis"]
+_SWAPS = [("shows", "demonstrates"), ("first", "initially"), ("give up", "sacrifice"),
+          ("changed", "reshaped"), ("explain", "describe"), ("surprised", "struck")]
+
+
+def _candidates(n: int, rng: Random) -> list[str]:
+    out: list[str] = []
+    while len(out) < n:
+        if out and rng.random() < 0.3:
+            q = rng.choice(out)
+            for a, b in _SWAPS:
+                q = q.replace(a, b)
+            out.append(q)
+        else:
+            out.append(rng.choice(_STEMS).format(x=rng.choice(_TOPICS)))
+    return out
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 300])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--embedding", default="hashed", choices=["hashed", "spacy"])
+    parser.add_argument("--threshold", type=float, default=DEDUPE_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = Random(args.seed)
+    embed(["warm up"], args.embedding)
+    print(f"{'candidates':>10} {'embed ms':>9} {'select ms':>10} {'total ms':>9} {'kept':>5}")
+    for size in args.sizes:
+        texts = _candidates(size, rng)
+        groups = [texts[i::len(ALL_BEATS)] for i in range(len(ALL_BEATS))]
+        t_embed, t_total = [], []
+        for _ in range(args.repeat):
+            t0 = perf_counter()
+            vectors = embed(texts, args.embedding)
+            t_embed.append(perf_counter() - t0)
+            t0 = perf_counter()
+            keep = select_diverse([], groups, threshold=args.threshold, embedding=args.embedding)
+            t_total.append(perf_counter() - t0)
+        e_ms, tot_ms = median(t_embed) * 1000, median(t_total) * 1000
+        print(f"{size:>10} {e_ms:>9.3f} {tot_ms - e_ms:>10.3f} {tot_ms:>9.3f} "
+              f"{sum(len(k) for k in keep):>5}")
+    del vectors
+
+
+if __name__ == "__main__":
+    main()
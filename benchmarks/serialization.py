@@ -0,0 +1,107 @@
+"""
+Bytes on the wire and encode time per run of the NDJSON stream.
+
+Runs each profile once (fake chat model, zero latency), keeps its events and
+final state, then encodes the whole stream per run with:
+  json      the previous path: dump_pii/dump_questions/format_response build
+            dicts, then json.dumps (what streaming.ndjson did);
+  orjson    the same events with the models left in place, orjson.dumps with
+            model_dump as the fallback;
+  pydantic  agents/serializer.ndjson (pydantic_core.to_json on the models);
+  compact   the same, with only serializer.COMPACT_FIELDS in the result.
+Reports median bytes and microseconds per run, for the whole stream and for
+the result event alone. Needs the Presidio spaCy model.
+
+Usage (from the repo root):
+    python -m benchmarks.serialization --runs 20 --repeat 200
+"""
+
+from argparse import ArgumentParser
+from json import dumps as json_dumps
+from statistics import median
+from time import perf_counter
+
+import orjson
+from pydantic import BaseModel
+
+import agents.workflow as workflow
+from agents.checkpoints import new_thread_id
+from agents.fake_llm import FakeChatModel
+from agents.serializer import COMPACT_FIELDS, ndjson, result_payload
+from agents.streaming import initial_state, session_snapshot, stream_events
+from agents.validation_utils import format_response
+from benchmarks.corpus import make_profiles
+from benchmarks.legacy_stream import dump_pii, dump_questions
+
+
+def _legacy(ev: dict, state: dict) -> dict:
+    """
+    The event as the previous streaming layer built it (plain dicts).
+    """
+    if ev["type"] == "result":
+        return {"type": "result", "data": format_response(state)}
+    if ev["type"] == "questions":
+        return {"type": "questions", "data": {**ev["data"], "final_questions_by_beat":
+                                              dump_questions(ev["data"]["final_questions_by_beat"])}}
+    pipeline = ev.get("data", {}).get("pipeline", {}) if ev["type"] == "update" else {}
+    if "pii_spans" in pipeline:
+        return {"type": "update", "data": {"pipeline": {"pii_spans": dump_pii(pipeline["pii_spans"])}}}
+    return ev
+
+
+def _model_dump(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--mode", default="fanout", choices=["fanout", "batched"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workflow.set_llm_backend(lambda: FakeChatModel(latency_s=0.0, seed=args.seed))
+    graph = workflow.GRAPH
+    runs = []
+    for profile in make_profiles(args.runs, seed=args.seed):
+        thread_id = new_thread_id()
+        events = list(stream_events(graph, initial_state(profile, args.mode), thread_id=thread_id))
+        runs.append((events, session_snapshot(graph, thread_id).values))
+
+    def compact(ev: dict, state: dict) -> dict:
+        if ev["type"] != "result":
+            return ev
+        return {"type": "result", "data": result_payload(state, COMPACT_FIELDS)}
+
+    encoders = {
+        "json": lambda ev, st: (json_dumps(_legacy(ev, st), ensure_ascii=False) + "\n").encode(),
+        "orjson": lambda ev, st: orjson.dumps(ev, default=_model_dump) + b"\n",
+        "pydantic": lambda ev, st: ndjson(ev),
+        "compact": lambda ev, st: ndjson(compact(ev, st)),
+    }
+
+    print(f"{'encoder':>9} {'bytes/run':>10} {'us/run':>8} {'result bytes':>13} {'result us':>10}")
+    for name, encode in encoders.items():
+        sizes, times, result_sizes, result_times = [], [], [], []
+        for events, state in runs:
+            result = events[-1]
+            sizes.append(sum(len(encode(ev, state)) for ev in events))
+            result_sizes.append(len(encode(result, state)))
+            t0 = perf_counter()
+            for _ in range(args.repeat):
+                for ev in events:
+                    encode(ev, state)
+            times.append((perf_counter() - t0) / args.repeat * 1e6)
+            t0 = perf_counter()
+            for _ in range(args.repeat):
+                encode(result, state)
+            result_times.append((perf_counter() - t0) / args.repeat * 1e6)
+        print(f"{name:>9} {median(sizes):>10.0f} {median(times):>8.1f} "
+              f"{median(result_sizes):>13.0f} {median(result_times):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
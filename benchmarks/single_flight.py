@@ -0,0 +1,78 @@
+"""
+Duplicate run_stream requests with and without single-flight coalescing.
+
+Sends --clients identical requests at once (a double-click or a retry storm
+on one profile), each client starting --stagger-ms after the previous one so
+the later ones arrive mid-run, for --profiles different profiles, through
+the Flask app in-process on the fake chat model. Reports LLM calls, wall time
+and the per-client latency with main.SINGLEFLIGHT off and on, and checks that
+every client of a profile received the same bytes. The requests carry no
+Idempotency-Key and all come from the test client's address, like one
+user's retries, so they coalesce by input. Needs the Presidio spaCy model.
+
+Usage (from the repo root):
+    python -m benchmarks.single_flight --clients 8 --profiles 5
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+from statistics import median
+from time import perf_counter, sleep
+import sys
+
+from benchmarks.corpus import make_profiles
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--profiles", type=int, default=5)
+    parser.add_argument("--stagger-ms", type=float, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    environ.setdefault("LLM_BACKEND", "fake")
+    import agents.workflow as workflow
+    from agents.fake_llm import FakeChatModel
+    from agents.llm_scheduler import llm_scheduler
+    import main as app_module
+
+    workflow.PLANNER_CACHE = False
+    workflow.set_llm_backend(lambda: FakeChatModel(latency_s=args.latency_ms / 1000, seed=args.seed))
+    client = app_module.app.test_client()
+    bodies = [p.model_dump() for p in make_profiles(args.profiles, seed=args.seed)]
+
+    def request(i: int, body: dict) -> tuple[float, bytes]:
+        sleep(i * args.stagger_ms / 1000)
+        t0 = perf_counter()
+        data = client.post("/api/pipeline/run_stream", json=body).data
+        return (perf_counter() - t0) * 1000, data
+
+    mismatches = 0
+    print(f"{'single-flight':>13} {'LLM calls':>10} {'wall s':>7} {'client ms p50':>14} {'max':>7}")
+    for enabled in (False, True):
+        app_module.SINGLEFLIGHT = enabled
+        calls0 = llm_scheduler.stats()["calls"]
+        latencies = []
+        t0 = perf_counter()
+        for body in bodies:
+            with ThreadPoolExecutor(args.clients) as pool:
+                results = list(pool.map(request, range(args.clients), [body] * args.clients))
+            latencies += [ms for ms, _ in results]
+            if enabled:
+                mismatches += len({data for _, data in results}) - 1
+        wall = perf_counter() - t0
+        calls = llm_scheduler.stats()["calls"] - calls0
+        print(f"{'on' if enabled else 'off':>13} {calls:>10} {wall:>7.2f} "
+              f"{median(latencies):>14.0f} {max(latencies):>7.0f}")
+
+    print(app_module.flights.stats())
+    if mismatches:
+        print(f"{mismatches} client(s) received a different stream")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
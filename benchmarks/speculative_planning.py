@@ -0,0 +1,79 @@
+"""
+Serial vs speculative planning (SPECULATIVE_PLANNING) on full pipeline runs.
+
+Each profile runs through the graph once per mode. Per mode it reports
+end-to-end latency, LLM calls and tokens (the extra cost of speculation is the
+repairs of beats that failed with the default plan), how many runs needed a
+repair, and the final validator pass rate. The response cache is bypassed.
+Needs COHERE_API_KEY and the Presidio spaCy model; with --fake the chat model
+is agents/fake_llm.py (its answers always pass, so it shows the latency side only).
+
+Usage (from the repo root):
+    python -m benchmarks.speculative_planning --runs 20
+    python -m benchmarks.speculative_planning --runs 20 --fake --fake-latency 0.8
+"""
+
+from argparse import ArgumentParser
+from statistics import mean
+from time import perf_counter
+
+import agents.workflow as workflow
+from agents.checkpoints import new_thread_id, session_config
+from benchmarks.corpus import make_profiles
+from benchmarks.generation_modes import UsageCounter, _pct
+
+
+def _run(user_input, speculative: bool, mode: str) -> dict:
+    usage = UsageCounter()
+    config = {**session_config(new_thread_id()), "callbacks": [usage]}
+    t0 = perf_counter()
+    state = workflow.GRAPH.invoke(
+        {"user_input": user_input, "generation_mode": mode, "speculative_planning": speculative},
+        config,
+    )
+    memo = state.get("beat_validation") or {}
+    return {
+        "latency_s": perf_counter() - t0,
+        "calls": usage.calls,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "repaired": int(state.get("attempt_count") or 0) > 0,
+        "final_pass": not any(v.reasons for v in memo.values()),
+    }
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--mode", default="fanout", choices=["fanout", "batched"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fake", action="store_true", help="use the offline fake chat model")
+    parser.add_argument("--fake-latency", type=float, default=0.8)
+    args = parser.parse_args()
+
+    workflow.PLANNER_CACHE = False
+    workflow.GENERATOR_CACHE = False
+    if args.fake:
+        from agents.fake_llm import FakeChatModel
+
+        workflow.set_llm_backend(lambda: FakeChatModel(
+            latency_dist="lognormal", latency_s=args.fake_latency, sigma=0.3, seed=args.seed,
+        ))
+
+    profiles = make_profiles(args.runs, seed=args.seed)
+    print(f"{'planning':>11} {'p50 s':>7} {'p95 s':>7} {'calls':>6} {'in tok':>8} {'out tok':>8} "
+          f"{'repaired':>9} {'final':>6}")
+    for speculative in (False, True):
+        rows = [_run(p, speculative, args.mode) for p in profiles]
+        lat = [r["latency_s"] for r in rows]
+        print(f"{'speculative' if speculative else 'serial':>11} "
+              f"{_pct(lat, 50):>7.2f} {_pct(lat, 95):>7.2f} "
+              f"{mean(r['calls'] for r in rows):>6.1f} "
+              f"{mean(r['input_tokens'] for r in rows):>8.0f} "
+              f"{mean(r['output_tokens'] for r in rows):>8.0f} "
+              f"{mean(r['repaired'] for r in rows):>9.0%} "
+              f"{mean(r['final_pass'] for r in rows):>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
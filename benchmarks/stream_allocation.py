@@ -0,0 +1,130 @@
+"""
+Per-request allocation of the streaming layer: full-state snapshots vs node patches.
+
+streaming.stream_events used to iterate stream_mode="values" (the whole
+PipelineState after every step) and slice the audit log by cursor; it now
+iterates stream_mode="updates" and forwards each node's patch once. The
+snapshot loop is reproduced here as the baseline. Each session is one run
+followed by --regens regenerations of a beat on the same thread, so the state
+(and its audit log) grows the way it does for a user who keeps regenerating.
+Reports, per request, the tracemalloc peak above the starting point and the
+wall time. Runs on the fake chat model with zero latency, so the graph's own
+work is the same in both modes and the difference is the streaming. Needs the
+Presidio spaCy model.
+
+Usage (from the repo root):
+    python -m benchmarks.stream_allocation --sessions 10 --regens 5
+"""
+
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+import tracemalloc
+
+import agents.workflow as workflow
+from agents.checkpoints import new_thread_id
+from agents.config import ALL_BEATS
+from agents.fake_llm import FakeChatModel
+from agents.streaming import (
+    _run_config,
+    initial_state,
+    session_snapshot,
+    stream_events,
+)
+from agents.validation_utils import format_response
+from benchmarks.corpus import make_profiles
+from benchmarks.legacy_stream import dump_pii, dump_questions
+
+
+def _snapshot_events(graph, init_state, thread_id, seed_state=None):
+    """
+    The previous loop: one full-state snapshot per step, diffed by audit cursor.
+    """
+    final = seed_state
+    cursor = len((seed_state or {}).get("audit_log") or [])
+    pii_sent = bool((seed_state or {}).get("pii_spans"))
+    for mode, chunk in graph.stream(init_state, _run_config(thread_id), stream_mode=["values", "custom"]):
+        if mode == "custom":
+            yield chunk
+            continue
+        final = chunk
+        if chunk.get("pii_spans") and not pii_sent:
+            pii_sent = True
+            yield {"type": "update", "data": {"pipeline": {"pii_spans": dump_pii(chunk["pii_spans"])}}}
+        audit = chunk.get("audit_log") or []
+        new_events, cursor = audit[cursor:], len(audit)
+        if new_events:
+            yield {"type": "update", "data": {"pipeline": {"audit_log": new_events}}}
+        if any(e.agent == "validator" for e in new_events):
+            memo = chunk.get("beat_validation") or {}
+            yield {"type": "questions", "data": {
+                "final_questions_by_beat": dump_questions(chunk.get("final_questions_by_beat")),
+                "failed_beats": [b for b in ALL_BEATS if b in memo and memo[b].reasons],
+            }}
+    yield {"type": "result", "data": format_response(final)}
+
+
+def _measure(events) -> tuple[float, float]:
+    """
+    (peak KiB above the start, ms) while draining one request's events.
+    """
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    t0 = perf_counter()
+    for _ in events:
+        pass
+    ms = (perf_counter() - t0) * 1000
+    return (tracemalloc.get_traced_memory()[1] - start) / 1024, ms
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--regens", type=int, default=5)
+    parser.add_argument("--mode", default="fanout", choices=["fanout", "batched"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workflow.PLANNER_CACHE = False
+    workflow.set_llm_backend(lambda: FakeChatModel(latency_s=0.0, seed=args.seed))
+    graph = workflow.GRAPH
+    profiles = make_profiles(args.sessions, seed=args.seed)
+
+    def stream(kind: str, init, thread_id: str, seed_state=None):
+        if kind == "snapshots":
+            return _snapshot_events(graph, init, thread_id, seed_state)
+        return stream_events(graph, init, thread_id=thread_id, seed_state=seed_state)
+
+    # Warm up the models and the graph.
+    for ev in stream_events(graph, initial_state(profiles[0], args.mode), thread_id=new_thread_id()):
+        pass
+
+    tracemalloc.start()
+    rows: dict[str, dict[str, list[float]]] = {}
+    for kind in ("snapshots", "updates"):
+        first, regen = {"kib": [], "ms": []}, {"kib": [], "ms": []}
+        for profile in profiles:
+            thread_id = new_thread_id()
+            kib, ms = _measure(stream(kind, initial_state(profile, args.mode), thread_id))
+            first["kib"].append(kib)
+            first["ms"].append(ms)
+            for i in range(args.regens):
+                seed_state = session_snapshot(graph, thread_id).values
+                beat = ALL_BEATS[i % len(ALL_BEATS)]
+                kib, ms = _measure(stream(kind, {"regen_request": [beat]}, thread_id, seed_state))
+                regen["kib"].append(kib)
+                regen["ms"].append(ms)
+        rows[kind] = {"run": first, "regen": regen}
+    tracemalloc.stop()
+
+    print(f"{'stream mode':>11} {'request':>8} {'peak KiB p50':>13} {'max':>8} {'ms p50':>8}")
+    for kind, by_request in rows.items():
+        for request, r in by_request.items():
+            if not r["kib"]:
+                continue
+            print(f"{kind:>11} {request:>8} {median(r['kib']):>13.1f} {max(r['kib']):>8.1f} "
+                  f"{median(r['ms']):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Cost of the per-node telemetry wrapper (agents/telemetry.py).
+
+Times a trivial node called directly and through instrument(), plus the
+per-call recording helpers, single-threaded and from several threads at once
+(the metrics share one lock). Needs no model or API key.
+
+Usage (from the repo root):
+    python -m benchmarks.telemetry_overhead --calls 200000 --threads 8
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from agents.telemetry import instrument, metrics, record_cache, record_retry
+
+
+def _node(state: dict) -> dict:
+    return state
+
+
+def _per_call_ns(fn, calls: int, threads: int = 1) -> float:
+    state = {"x": 1}
+
+    def loop(n: int) -> None:
+        for _ in range(n):
+            fn(state)
+
+    t0 = perf_counter()
+    if threads == 1:
+        loop(calls)
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(loop, [calls // threads] * threads))
+    return (perf_counter() - t0) / calls * 1e9
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    wrapped = instrument("bench", _node, otel=False)
+    for threads in (1, args.threads):
+        raw = _per_call_ns(_node, args.calls, threads)
+        inst = _per_call_ns(wrapped, args.calls, threads)
+        helpers = _per_call_ns(lambda _: (record_cache("hit"), record_retry()), args.calls, threads)
+        print(f"threads={threads}: node {raw:.0f} ns, instrumented {inst:.0f} ns "
+              f"(+{inst - raw:.0f} ns/node), cache+retry records {helpers:.0f} ns")
+    metrics.reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Parity and speed of the compiled validator engine against the reference rules.
+
+Builds a batch of beats per profile, mixing clean questions with every failure
+the validator knows (ungrounded and grounded numbers, phones, emails,
+placeholders, list items, multi-line, empty text, missing intents), and checks
+that validator_engine gives exactly the reasons of validation_utils._validate_beat.
+Then times both over the whole batch, as a repair loop or an offline batch
+validation would run them. Exits non-zero on any mismatch. Needs no model
+(the reference has no entity check, so the engine's is off here; see
+benchmarks/entity_grounding.py).
+
+Usage (from the repo root):
+    python -m benchmarks.validator_engine --profiles 200 --repeat 5 [--source-repeat 10]
+"""
+
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+import sys
+
+from agents.config import ALL_BEATS
+from agents.models import QuestionObject
+from agents.prompts import _build_canonical_input
+from agents.validation_utils import _norm, _validate_beat
+from agents.validator_engine import check_beats, messages
+from benchmarks.corpus import make_profiles
+
+_TEMPLATES = [
+    "What made you choose this {word} over the alternatives?",
+    "How did the {n} results change your next step?",
+    "Why did the team of {n} trust your call on {word}?",
+    "What would you do with {n}% more time on {word}",
+    "Could <NAME> describe your role in {word}?",
+    "- Describe your {word} project.",
+    "1) What did {word} teach you?",
+    "Who at jane@example.com reviewed your {word}?",
+    "Would you call 416-555-{n:04d} to discuss {word}?",
+    "What happened in {n}.5 weeks of {word}?\nAnd after?",
+    "",
+    "   ",
+]
+_WORDS = ["research", "tutoring", "the workshop", "the lab", "outreach", "the model"]
+
+
+def _beats(rng: Random, source_numbers: list[str]) -> dict[str, list[QuestionObject]]:
+    beats: dict[str, list[QuestionObject]] = {}
+    for beat in ALL_BEATS:
+        if rng.random() < 0.05:
+            beats[beat] = []
+            continue
+        qs = []
+        for _ in range(rng.randint(1, 4)):
+            n = int(rng.choice(source_numbers)) if source_numbers and rng.random() < 0.5 else rng.randint(1, 999)
+            question = rng.choice(_TEMPLATES).format(n=n, word=rng.choice(_WORDS))
+            intent = "" if rng.random() < 0.1 else "tests evidence"
+            qs.append(QuestionObject(beat=beat, question=question, intent=intent))
+        beats[beat] = qs
+    return beats
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source-repeat", type=int, default=1,
+                        help="repeat each source text to emulate long inputs")
+    args = parser.parse_args()
+
+    rng = Random(args.seed)
+    cases = []
+    for profile in make_profiles(args.profiles, seed=args.seed):
+        source_norm = _norm(" ".join([_build_canonical_input(profile)] * args.source_repeat))
+        numbers = [t for t in source_norm.split() if t.isdigit()]
+        cases.append((_beats(rng, numbers), source_norm))
+    n_questions = sum(len(qs) for beats, _ in cases for qs in beats.values())
+
+    mismatches = 0
+    for i, (beats, source_norm) in enumerate(cases):
+        engine = {b: messages(r) for b, r in check_beats(beats, source_norm, entities=False).items()}
+        for beat, qs in beats.items():
+            expected = _validate_beat(qs, source_norm)
+            if engine[beat] != expected:
+                mismatches += 1
+                print(f"case {i} beat {beat}:\n  reference {expected}\n  engine    {engine[beat]}")
+
+    def timed(fn) -> float:
+        t0 = perf_counter()
+        for _ in range(args.repeat):
+            for beats, source_norm in cases:
+                fn(beats, source_norm)
+        return (perf_counter() - t0) / (args.repeat * n_questions) * 1e6
+
+    reference_us = timed(lambda beats, src: {b: _validate_beat(qs, src) for b, qs in beats.items()})
+    engine_us = timed(lambda beats, src: {b: messages(r) for b, r in check_beats(beats, src, entities=False).items()})
+
+    print(f"{n_questions} questions over {len(cases)} runs")
+    print(f"reference: {reference_us:.2f} us/question")
+    print(f"engine:    {engine_us:.2f} us/question ({reference_us / engine_us:.1f}x)")
+    print(f"parity mismatches: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
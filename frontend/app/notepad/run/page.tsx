@@ -4,6 +4,7 @@ import { useRouter } from "next/navigation";
 
 type AuditEvent = { ts_ms?: number; agent?: string; event?: string; data?: any; raw?: any };
 type PiiSpan = { start?: number; end?: number; pii_type?: string; confidence?: number };
+type Drafts = Record<string, string[]>;
 
 export default function RunPage() {
   const router = useRouter();
@@ -12,6 +13,7 @@ export default function RunPage() {
   const [error, setError] = useState<string | null>(null);
   const [done, setDone] = useState(false);
   const [piiSpans, setPiiSpans] = useState<PiiSpan[]>([]);
+  const [drafts, setDrafts] = useState<Drafts>({});
 
   const currentStage = useMemo(() => {
     const last = audit[audit.length - 1];
@@ -35,6 +37,7 @@ export default function RunPage() {
       setAudit([]);
       setDone(false);
       setPiiSpans([]);
+      setDrafts({});
 
       try {
         const res = await fetch("/api/pipeline/run_stream", {
@@ -94,6 +97,25 @@ export default function RunPage() {
             //   const maybeAudit = extractAuditFromUpdate(update);
               const events = extractAuditFromMsgData(msg.data);
               if (events.length) setAudit((prev) => [...prev, ...events]);
+            } else if (msg.type === "question_reset") {
+              // A beat is being (re)generated; drop its old drafts.
+              const { beat } = msg.data;
+              setDrafts((prev) => ({ ...prev, [beat]: [] }));
+            } else if (msg.type === "question_delta") {
+              const { beat, index, delta } = msg.data;
+              setDrafts((prev) => {
+                const qs = [...(prev[beat] ?? [])];
+                qs[index] = (qs[index] ?? "") + delta;
+                return { ...prev, [beat]: qs };
+              });
+            } else if (msg.type === "questions") {
+              // Reconciled (deduped/trimmed) questions after validation.
+              const byBeat = msg.data?.final_questions_by_beat ?? {};
+              const next: Drafts = {};
+              for (const [beat, qs] of Object.entries(byBeat) as [string, any[]][]) {
+                next[beat] = qs.map((q) => q.question);
+              }
+              setDrafts(next);
             } else if (msg.type === "result") {
               sessionStorage.setItem("pipeline_result", JSON.stringify(msg.data));
               setDone(true);
@@ -202,6 +224,25 @@ export default function RunPage() {
             </div>
           )}
 
+          {/* Draft questions, streamed as they are generated */}
+          {Object.keys(drafts).length > 0 && (
+            <div className="mt-4 rounded-xl border border-gray-200 bg-white p-3 max-h-80 overflow-auto">
+              <div className="text-xs font-medium mb-2">Draft Questions</div>
+              <div className="space-y-2 text-xs text-gray-700">
+                {Object.keys(drafts).sort().map((beat) => (
+                  <div key={beat}>
+                    <span className="font-mono">{beat}</span>
+                    <ul className="list-disc ml-5">
+                      {drafts[beat].filter(Boolean).map((q, i) => (
+                        <li key={i}>{q}</li>
+                      ))}
+                    </ul>
+                  </div>
+                ))}
+              </div>
+            </div>
+          )}
+
           {/* Audit panel */}
           <div className="mt-4 rounded-xl border border-gray-200 bg-white p-3 max-h-80 overflow-auto">
             <div className="text-xs font-medium mb-2">Live Updates</div>
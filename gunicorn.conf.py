@@ -0,0 +1,23 @@
+# gunicorn settings for the preload-then-fork startup mode:
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# The master imports main.py once with PRELOAD_MODELS=1, loading the spaCy/Presidio
+# models and the compiled graph, then forks workers that share those pages
+# copy-on-write. Workers boot without loading anything.
+
+from os import environ
+
+environ.setdefault("PRELOAD_MODELS", "1")
+
+bind = f"0.0.0.0:{environ.get('PORT', '10000')}"
+workers = int(environ.get("WEB_CONCURRENCY", "2"))
+threads = int(environ.get("GUNICORN_THREADS", "4"))
+preload_app = True
+timeout = 120
+
+
+def post_fork(server, worker):
+    # The chat model owns HTTP connection pools; never share them across processes.
+    from agents.registry import registry
+
+    registry.reset("llm")
@@ -3,18 +3,57 @@
 from flask import Flask, request, jsonify, render_template, stream_with_context, Response
 from pydantic import ValidationError
 from typing import Any
-from json import dumps
+from os import environ
+import gc
 
 from econf.env import get_env
 from agents.models import UserInput
-from agents.validation_utils import format_response, create_custom_errors
-from agents.workflow import GRAPH
+from agents.registry import registry, PRELOAD_MODELS
+from agents.validation_utils import create_custom_errors
+from agents.checkpoints import new_thread_id
+from agents.llm_scheduler import llm_scheduler
+from agents.telemetry import metrics as telemetry
+from agents.validator_engine import entity_extractor
+from agents.audit import audit_stats
+from agents.cohort import batch_events, batch_running, output_path
+from agents.serializer import ndjson, parse_result_fields
+from agents.singleflight import SingleFlight, flight_key, request_fingerprint
+from agents.admission import admission
+from agents.config import ADMISSION, ADMISSION_CLIENT_HEADER, SINGLEFLIGHT
+from agents.streaming import (
+    initial_state,
+    parse_generation_mode,
+    parse_speculative_planning,
+    parse_regen_beats,
+    replay_events,
+    session_snapshot,
+    stream_events,
+    stream_stats,
+    unfinished,
+)
 
 app = Flask(__name__)
+flights = SingleFlight()
+
+# Heavy models (spaCy/Presidio, the chat model, the graph) load lazily on first use.
+# With PRELOAD_MODELS=1 they are loaded here instead, so a pre-forking server
+# (gunicorn --preload, see gunicorn.conf.py) loads them once in the master and
+# workers share the pages copy-on-write.
+if environ.get("PRELOAD_MODELS", "").lower() in ("1", "true", "yes"):
+    registry.warmup(PRELOAD_MODELS)
+    # Move everything loaded so far out of the GC's tracked generations so
+    # collections in the workers don't touch (and copy) those pages.
+    gc.freeze()
 
 @app.get("/health")
 def health():
-    return jsonify({"status": "ok"}), 200
+    return jsonify({"status": "ok", "stream": stream_stats(), "llm": llm_scheduler.stats(),
+                    "entities": entity_extractor.stats(), "audit": audit_stats(), "single_flight": flights.stats(),
+                    "admission": admission.stats()}), 200
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(telemetry.render(), mimetype="text/plain; version=0.0.4")
 
 @app.post("/api/pipeline/run_stream")
 def run_stream():
@@ -27,66 +66,174 @@ def run_stream():
     except ValidationError as e:
         # Return NDJSON 'error' event (so your streaming client shows a nice message)
         def gen_err(e):
-            yield dumps({"type": "error", "error": "INPUT_VALIDATION", "data": create_custom_errors(e)}) + "\n"
+            yield ndjson({"type": "error", "error": "INPUT_VALIDATION", "data": create_custom_errors(e)})
         return Response(gen_err(e), mimetype="application/x-ndjson", status=400)
 
-    init_state = {
-        "user_input": user_input,
-        "attempt_count": 0,
-        "questions_by_beat": {},
-        "regen_request": [],
-        "audit_log": [],
-    }
+    try:
+        generation_mode = parse_generation_mode(data)
+        speculative = parse_speculative_planning(data)
+        fields = parse_result_fields(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    init_state = initial_state(user_input, generation_mode, speculative)
+    graph = registry.get("graph")
+
+    thread_id = new_thread_id() if graph.checkpointer is not None else None
+
+    def run():
+        return stream_events(graph, init_state, thread_id=thread_id, fields=fields)
+
+    if not SINGLEFLIGHT:
+        return _admitted(run)
+
+    client = _client()
+    def admit(make_events):
+        ticket = admission.enter(client)
+        return None if ticket is None else (lambda: admission.events(ticket, make_events))
+
+    # Duplicates (same Idempotency-Key, or same client, input and options) share one
+    # run. Only the request that starts it goes through admission; the others
+    # follow its stream and never queue or hold a slot.
+    fingerprint = request_fingerprint(user_input, generation_mode=generation_mode,
+                                      speculative=speculative, fields=fields)
+    lines, outcome = flights.run(flight_key(request.headers.get("Idempotency-Key"), fingerprint, client),
+                                 fingerprint, run, thread_id=thread_id, admit=admit if ADMISSION else None)
+    if outcome == "shed":
+        return _busy()
+    if lines is None:
+        return jsonify({"error": "Idempotency-Key was already used for a different request."}), 409
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson",
+                    headers={"X-Single-Flight": outcome})
+
+def _busy():
+    return (jsonify({"error": "The server is busy; try again shortly."}), 503,
+            {"Retry-After": str(admission.retry_after_s())})
+
+def _client() -> str:
+    return request.headers.get(ADMISSION_CLIENT_HEADER) or request.remote_addr or ""
+
+def _admitted(make_events):
+    """
+    NDJSON response of make_events() run through admission control: at most
+    ADMISSION_MAX_IN_FLIGHT runs; the rest queue (streaming their position)
+    or, when the queue is full, are shed with 503.
+    """
+    ticket = admission.enter(_client()) if ADMISSION else None
+    if ADMISSION and ticket is None:
+        return _busy()
+    events = make_events if ticket is None else (lambda: admission.events(ticket, make_events))
+
+    @stream_with_context
+    def gen():
+        for ev in events():
+            yield ndjson(ev)
+    response = Response(gen(), mimetype="application/x-ndjson")
+    if ticket is not None:
+        # Frees the slot even if the stream is closed before it starts.
+        response.call_on_close(lambda: admission.close(ticket))
+    return response
+
+@app.post("/api/pipeline/batch")
+def run_batch():
+    """
+    Runs a cohort: the body is JSONL, one profile (UserInput, optional "id") per
+    line. Streams a "profile" event per finished profile, then a "summary" with
+    profiles/min. Results are also kept server-side under ?batch_id=; posting
+    the same file with the same batch_id resumes it (see agents/cohort.py);
+    409 while that batch_id is still running.
+    """
+    batch_id = request.args.get("batch_id") or new_thread_id()
+    try:
+        output_path(batch_id)
+        generation_mode = parse_generation_mode(request.args)
+        fields = parse_result_fields(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    lines = request.get_data().splitlines()
+    if not any(line.strip() for line in lines):
+        return jsonify({"error": "No profiles provided."}), 400
+    if batch_running(batch_id):
+        return jsonify({"error": f"Batch {batch_id} is already running."}), 409
+    # Each profile takes its own admission slot, so a batch shares capacity
+    # with interactive runs instead of adding COHORT_CONCURRENCY on top.
+    client = _client()
+    admit = (lambda run: admission.call(client, run)) if ADMISSION else None
+
+    @stream_with_context
+    def gen():
+        for ev in batch_events(lines, batch_id, generation_mode=generation_mode, fields=fields,
+                               admit=admit):
+            yield ndjson(ev)
 
-    def ndjson(obj):
-        return dumps(obj, ensure_ascii=False) + "\n"
+    return Response(gen(), mimetype="application/x-ndjson")
+
+@app.post("/api/pipeline/resume_stream")
+def resume_stream():
+    """
+    Continues a session from its last completed node (e.g. after a dropped
+    connection), replaying the events sent so far. Finished sessions are
+    replayed from their checkpoint without running anything. A session whose
+    single-flight run is still going is followed instead (its stream as it
+    was requested, from the start).
+    """
+    data = request.get_json(silent=True) or {}
+    thread_id = data.get("thread_id")
+    try:
+        fields = parse_result_fields(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    lines = flights.attach(thread_id)
+    if lines is not None:
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson",
+                        headers={"X-Single-Flight": "joined"})
+    graph = registry.get("graph")
+    snapshot = session_snapshot(graph, thread_id)
+    if snapshot is None:
+        return jsonify({"error": "Unknown session."}), 404
+
+    if unfinished(snapshot):
+        # The rest of the run needs a slot like any other run.
+        return _admitted(lambda: stream_events(graph, None, thread_id=thread_id,
+                                               seed_state=snapshot.values, replay=True, fields=fields))
+    events = replay_events(thread_id, snapshot.values, fields)
 
     @stream_with_context
     def gen():
-        final_state = None
-        audit_cursor = 0
-        pii_sent = False
-
-        def dump_pii(spans):
-            out = []
-            for s in (spans or []):
-                if hasattr(s, "model_dump"):
-                    out.append(s.model_dump())
-                elif isinstance(s, dict):
-                    out.append(s)
-                else:
-                    out.append({"start": getattr(s, "start", None),
-                                "end": getattr(s, "end", None),
-                                "pii_type": getattr(s, "pii_type", None),
-                                "confidence": getattr(s, "confidence", None)})
-            return out
-
-        for st in GRAPH.stream(init_state, stream_mode="values"):
-            final_state = st
-
-            # 1) Stream PII spans once
-            spans = st.get("pii_spans")
-            if spans and not pii_sent:
-                pii_sent = True
-                yield ndjson({
-                    "type": "update",
-                    "data": {"pipeline": {"pii_spans": dump_pii(spans)}}
-                })
-
-            # 2) Stream audit log deltas
-            audit = st.get("audit_log") or []
-            new_events = audit[audit_cursor:]
-            audit_cursor = len(audit)
-            if new_events:
-                yield ndjson({
-                    "type": "update",
-                    "data": {"pipeline": {"audit_log": new_events}}
-                })
-
-        yield ndjson({"type": "result", "data": format_response(final_state)})
+        for ev in events:
+            yield ndjson(ev)
 
     return Response(gen(), mimetype="application/x-ndjson")
 
+@app.post("/api/pipeline/regen_stream")
+def regen_stream():
+    """
+    Regenerates the named beats of a finished session, reusing its redaction and plan.
+    """
+    data = request.get_json(silent=True) or {}
+    thread_id = data.get("thread_id")
+    beats = parse_regen_beats(data)
+    if beats is None:
+        return jsonify({"error": "Provide a non-empty list of beats (A-E)."}), 400
+    try:
+        fields = parse_result_fields(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if flights.running(thread_id):
+        return jsonify({"error": "Session is still running; resume it first."}), 409
+
+    graph = registry.get("graph")
+    snapshot = session_snapshot(graph, thread_id)
+    if snapshot is None:
+        return jsonify({"error": "Unknown session."}), 404
+    if unfinished(snapshot):
+        return jsonify({"error": "Session is still running; resume it first."}), 409
+
+    return _admitted(lambda: stream_events(graph, {"regen_request": beats}, thread_id=thread_id,
+                                           seed_state=snapshot.values, fields=fields))
+
 if __name__ == "__main__":
     port = get_env("PORT")
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -0,0 +1,50 @@
+"""
+Tests run offline: the fake chat model (agents/fake_llm.py) stands in for Cohere.
+
+Run from the repo root:
+    python -m pytest -q tests
+"""
+
+from os import environ
+from pathlib import Path
+import sys
+
+import pytest
+
+environ.setdefault("LLM_BACKEND", "fake")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="session")
+def offline_models(tmp_path_factory):
+    """
+    Runs the whole graph offline: the Presidio analyzer gets a blank spaCy
+    pipeline whose entity ruler knows a few names (instead of en_core_web_lg),
+    and the validator has no NER model.
+    """
+    import spacy
+    from presidio_analyzer import AnalyzerEngine
+    from presidio_analyzer.nlp_engine import NlpEngineProvider
+
+    from agents.registry import registry
+
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    nlp.add_pipe("entity_ruler").add_patterns([
+        {"label": "PERSON", "pattern": "John Smith"},
+        {"label": "GPE", "pattern": "Toronto"},
+    ])
+    path = tmp_path_factory.mktemp("spacy") / "en_blank"
+    nlp.to_disk(path)
+
+    def analyzer():
+        provider = NlpEngineProvider(nlp_configuration={
+            "nlp_engine_name": "spacy", "models": [{"lang_code": "en", "model_name": str(path)}]})
+        return AnalyzerEngine(nlp_engine=provider.create_engine(), supported_languages=["en"])
+
+    saved = {name: registry._factories[name] for name in ("analyzer", "ner_model")}
+    registry.register("analyzer", analyzer)
+    registry.register("ner_model", lambda: None)
+    yield registry
+    for name, factory in saved.items():
+        registry.register(name, factory)
@@ -0,0 +1,180 @@
+import json
+import threading
+
+from agents.admission import AdmissionController
+from agents.singleflight import SingleFlight
+
+
+def _controller(**kwargs):
+    options = {"max_in_flight": 1, "max_queue": 10, "max_queued_per_client": 5,
+               "max_wait_s": 5, "poll_s": 0.01}
+    return AdmissionController(**{**options, **kwargs})
+
+
+def test_queue_is_served_round_robin_across_clients():
+    admission = _controller()
+    holder = admission.enter("x")
+    a1, a2, a3 = (admission.enter("a") for _ in range(3))
+    b1, c1 = admission.enter("b"), admission.enter("c")
+    queued = [a1, b1, c1, a2, a3]
+    assert holder.state == "admitted"
+    assert [admission.position(t) for t in queued] == [1, 2, 3, 4, 5]
+
+    served, current = [], holder
+    for _ in queued:
+        admission.close(current)
+        current = next(t for t in queued if t.state == "admitted")
+        served.append(current)
+    assert served == queued
+    assert admission.position(current) == 0
+    admission.close(current)
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_requests_are_shed_when_the_queue_is_full():
+    admission = _controller(max_queue=2, max_queued_per_client=1)
+    admission.enter("x")
+    assert admission.enter("a") is not None
+    assert admission.enter("a") is None  # the client's share of the queue
+    assert admission.enter("b") is not None
+    assert admission.enter("c") is None  # the whole queue
+    stats = admission.stats()
+    assert (stats["shed"], stats["queued"], stats["queue_depth"]) == (2, 2, 2)
+
+
+def test_queued_request_times_out_with_an_error_event():
+    admission = _controller(max_wait_s=0.05)
+    admission.enter("x")
+    ticket = admission.enter("a")
+    events = list(admission.events(ticket, lambda: iter([{"type": "result"}])))
+    assert [e["type"] for e in events] == ["queued", "error"]
+    assert events[0]["data"] == {"position": 1, "queue_depth": 1}
+    assert events[1]["error"] == "QUEUE_TIMEOUT"
+    assert admission.stats()["timed_out"] == 1
+    assert admission.stats()["queue_depth"] == 0
+
+
+def test_retry_after_only_counts_runs_that_started():
+    admission = _controller()
+    admission.close(admission.enter("a"))
+    assert not admission._run_s
+
+    list(admission.events(admission.enter("a"), lambda: iter([{"type": "result"}])))
+    assert len(admission._run_s) == 1
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_only_the_flight_leader_is_admitted():
+    admission = _controller(max_queued_per_client=1)
+    flights = SingleFlight()
+    gate, admitted = threading.Event(), []
+
+    def make_events():
+        yield {"type": "session"}
+        gate.wait(5)
+        yield {"type": "result"}
+
+    def admit(make_events):
+        ticket = admission.enter("a")
+        admitted.append(ticket)
+        return None if ticket is None else (lambda: admission.events(ticket, make_events))
+
+    lead, outcome = flights.run("k", "fp", make_events, admit=admit)
+    joins = [flights.run("k", "fp", make_events, admit=admit) for _ in range(3)]
+    assert outcome == "leader"
+    assert [o for _, o in joins] == ["joined"] * 3
+    assert len(admitted) == 1
+    gate.set()
+    lead = list(lead)
+    assert all(list(lines) == lead for lines, _ in joins)
+    assert admission.stats()["admitted"] == 1
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_shed_leader_drops_its_flight():
+    flights = SingleFlight(window_s=60)
+    assert flights.run("k", "fp", lambda: iter([]), admit=lambda make_events: None) == (None, "shed")
+    assert flights.stats()["running"] == 0
+    assert flights.run("k", "fp", lambda: iter([]))[1] == "leader"
+
+
+def test_late_joiner_skips_superseded_queue_positions():
+    flights = SingleFlight()
+    queued, gate = threading.Event(), threading.Event()
+
+    def make_events():
+        for position in (3, 2, 1):
+            yield {"type": "queued", "data": {"position": position}}
+        queued.set()
+        gate.wait(5)
+        yield {"type": "result"}
+
+    def positions(lines):
+        return [json.loads(line).get("data", {}).get("position") for line in lines]
+
+    lead, _ = flights.run("k", "fp", make_events)
+    assert queued.wait(5)
+    join, _ = flights.run("k", "fp", make_events)
+    assert positions([next(join)]) == [1]
+    gate.set()
+    assert positions(join) == [None]
+    # Read only after the run started: no stale positions at all.
+    assert positions(lead) == [None]
+
+
+def test_call_runs_once_a_slot_is_free():
+    admission = _controller(max_queued_per_client=1)
+    assert admission.call("a", lambda: "ran") == "ran"
+
+    holder = admission.enter("x")
+    threading.Timer(0.05, admission.close, (holder,)).start()
+    assert admission.call("a", lambda: "waited") == "waited"
+    # Shed at once when the client's share of the queue is taken.
+    holder = admission.enter("x")
+    queued = admission.enter("a")
+    assert admission.call("a", lambda: "never") is None
+    admission.close(queued)
+    admission.close(holder)
+    stats = admission.stats()
+    assert (stats["shed"], stats["in_flight"], stats["queue_depth"]) == (1, 0, 0)
+
+
+def test_call_gives_up_after_max_wait():
+    admission = _controller(max_wait_s=0.05)
+    holder = admission.enter("x")
+    assert admission.call("a", lambda: "never") is None
+    assert admission.stats()["timed_out"] == 1
+    admission.close(holder)
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_admitted_asgi_route_is_shed_when_the_queue_is_full(monkeypatch):
+    import asyncio
+
+    import asgi
+
+    admission = _controller(max_queue=0)
+    monkeypatch.setattr(asgi, "admission", admission)
+    monkeypatch.setattr(asgi, "ADMISSION", True)
+    sent, ran = [], []
+    scope = {"headers": [(b"x-client-id", b"a")], "client": ("10.0.0.1", 1)}
+
+    async def send(message):
+        sent.append(message)
+
+    async def make_events():
+        ran.append(1)
+        yield {"type": "result"}
+
+    async def run():
+        await asgi._admitted(scope, send, make_events)
+        assert sent[0]["status"] == 200 and ran == [1]
+        assert admission.stats()["in_flight"] == 0
+
+        holder = admission.enter("x")
+        sent.clear()
+        await asgi._admitted(scope, send, make_events)
+        assert sent[0]["status"] == 503 and ran == [1]
+        admission.close(holder)
+
+    asyncio.run(run())
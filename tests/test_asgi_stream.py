@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+from asgi import _athread
+
+
+def test_athread_passes_none_through():
+    async def run():
+        return [ev async for ev in _athread(iter([1, None, 2]))]
+
+    assert asyncio.run(run()) == [1, None, 2]
+
+
+def test_athread_closes_the_generator_when_the_stream_stops():
+    closed = threading.Event()
+
+    def events():
+        try:
+            for i in range(100):
+                yield i
+        finally:
+            closed.set()
+
+    async def run():
+        stream = _athread(events())
+        assert [await stream.__anext__() for _ in range(2)] == [0, 1]
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert closed.is_set()
+
+
+def test_athread_waits_for_a_running_step_before_closing_on_cancel():
+    started, release, closed = threading.Event(), threading.Event(), threading.Event()
+
+    def events():
+        try:
+            started.set()
+            release.wait(5)
+            yield 1
+            yield 2
+        finally:
+            closed.set()
+
+    async def consume():
+        async for _ in _athread(events()):
+            pass
+
+    async def run():
+        task = asyncio.create_task(consume())
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert closed.is_set()
@@ -0,0 +1,58 @@
+import pytest
+
+from agents.audit import AuditEvent, AuditSink, add_audit
+
+
+def _events(n, agent="redactor"):
+    return [AuditEvent(i, agent, "step", {"i": i}) for i in range(n)]
+
+
+def test_audit_log_keeps_only_the_most_recent_events(monkeypatch):
+    import agents.audit as audit
+
+    monkeypatch.setattr(audit, "AUDIT_LOG_MAX_EVENTS", 5)
+    assert add_audit(None, None) == []
+    assert add_audit(_events(2), None) == _events(2)
+    old, new = _events(4), _events(3, "validator")
+    assert add_audit(old, new) == [*old[-2:], *new]
+    # However many cycles append, the log stays at the cap.
+    log: list = []
+    for chunk in (_events(3) for _ in range(10)):
+        log = add_audit(log, chunk)
+        assert len(log) <= 5
+    assert [e.data["i"] for e in log] == [1, 2, 0, 1, 2]
+
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_sink_reads_back_each_sessions_events_in_order(tmp_path, backend):
+    sink = AuditSink(backend, str(tmp_path / f"audit.{backend}"), batch_size=3, flush_ms=5)
+    assert sink.read("t1") == []
+    written = {"t1": [], "t10": []}
+    for i in range(7):
+        for tid in written:
+            ev = AuditEvent(i, "question_generator", "ok", {"beat": "A", "n": i, "text": "café"})
+            sink.put(tid, ev)
+            written[tid].append(ev)
+    sink.put(None, AuditEvent(0, "redactor", "start", {}))
+
+    # "t1" is a prefix of "t10": only exact thread ids match.
+    assert sink.read("t1") == written["t1"]
+    assert sink.read("t10") == written["t10"]
+    assert sink.read("t2") == []
+    stats = sink.stats()
+    assert (stats["events"], stats["dropped"], stats["errors"], stats["queue_depth"]) == (15, 0, 0, 0)
+
+
+def test_unknown_sink_backend_is_rejected():
+    with pytest.raises(ValueError):
+        AuditSink("csv")
+
+
+def test_validator_failure_is_an_audit_event(capsys):
+    from agents.workflow import validator_node
+
+    patch = validator_node({"final_questions_by_beat": {}})
+    [ev] = patch["audit_log"]
+    assert (ev.agent, ev.event) == ("validator", "error")
+    assert ev.data == {"error_type": "KeyError", "message": "'redacted_input'"}
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,68 @@
+from pydantic import BaseModel
+
+import agents.cache as cache
+from agents.cache import ResponseCache, cache_key
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _Plan(BaseModel):
+    beats: list[str]
+
+
+def test_key_depends_on_every_part_of_the_request():
+    messages = [{"role": "user", "content": "hi"}]
+    key = cache_key("m", 0.0, messages, _Plan)
+    assert key == cache_key("m", 0.0, [dict(m) for m in messages], _Plan)
+    assert key != cache_key("m", 0.3, messages, _Plan)
+    assert key != cache_key("other", 0.0, messages, _Plan)
+    assert key != cache_key("m", 0.0, [{"role": "user", "content": "hello"}], _Plan)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    c = ResponseCache(max_entries=10, ttl_s=60, sqlite_path=None)
+    c.set("k", "v")
+    clock.now += 59
+    assert c.get("k") == "v"
+    clock.now += 2
+    assert c.get("k") is None
+    assert c.stats()["size"] == 0
+    assert (c.stats()["hits"], c.stats()["misses"]) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    c = ResponseCache(max_entries=2, ttl_s=None, sqlite_path=None)
+    c.set("a", "1")
+    c.set("b", "2")
+    assert c.get("a") == "1"  # b is now the least recently used
+    c.set("c", "3")
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == ("1", "3")
+    assert c.stats()["evictions"] == 1
+
+
+def test_sqlite_tier_survives_a_new_process(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    path = str(tmp_path / "cache.sqlite3")
+    c = ResponseCache(max_entries=10, ttl_s=60, sqlite_path=path, sqlite_max_entries=2)
+    for i, key in enumerate("abc"):
+        clock.now += 1
+        c.set(key, str(i))
+
+    fresh = ResponseCache(max_entries=10, ttl_s=60, sqlite_path=path, sqlite_max_entries=2)
+    assert fresh.get("a") is None  # beyond sqlite_max_entries
+    assert (fresh.get("b"), fresh.get("c")) == ("1", "2")
+    assert fresh.stats()["disk_hits"] == 2
+    assert fresh.get("c") == "2" and fresh.stats()["hits"] == 1  # now in memory
+
+    clock.now += 120
+    assert ResponseCache(max_entries=10, ttl_s=60, sqlite_path=path).get("b") is None
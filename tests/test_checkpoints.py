@@ -0,0 +1,67 @@
+from agents.checkpoints import BoundedInMemorySaver, new_thread_id
+from agents.llm_scheduler import llm_scheduler
+from agents.models import UserInput
+from agents.streaming import initial_state, replay_events, session_snapshot, stream_events, unfinished
+from agents.workflow import create_graph
+
+PROFILE = UserInput(
+    scholarship_name="Summer Research Award",
+    program_type="Undergrad",
+    goal_one_liner="I want to explore computer vision for medical imaging with John Smith in Toronto.",
+    resume_points=["Built a PyTorch object detector and evaluated it on a custom dataset",
+                   "Led a 4-person hackathon team and shipped a web app in 36 hours",
+                   "Tutored calculus for 30 students, call 416-555-1234"],
+)
+
+
+def _agents(events):
+    return [e.agent for ev in events if ev["type"] == "update"
+            for e in ev["data"]["pipeline"].get("audit_log", [])]
+
+
+def _run(graph, thread_id):
+    return list(stream_events(graph, initial_state(PROFILE), thread_id=thread_id))
+
+
+def test_interrupted_session_resumes_from_its_last_checkpoint(offline_models):
+    graph = create_graph(checkpointer=BoundedInMemorySaver())
+    expected = _run(graph, new_thread_id())[-1]
+
+    thread_id = new_thread_id()
+    events = stream_events(graph, initial_state(PROFILE), thread_id=thread_id)
+    for ev in events:
+        if "beat_planner" in _agents([ev]):
+            break
+    events.close()  # the client went away after the planner
+    snapshot = session_snapshot(graph, thread_id)
+    # The planner finished but nothing after it was scheduled yet.
+    assert not snapshot.next
+    assert unfinished(snapshot)
+
+    calls = llm_scheduler.stats()["calls"]
+    resumed = list(stream_events(graph, None, thread_id=thread_id, seed_state=snapshot.values,
+                                 replay=True))
+    assert resumed[0] == {"type": "session", "data": {"thread_id": thread_id}}
+    agents = _agents(resumed)
+    # Replayed, not run again: one redactor and one planner entry, then the rest.
+    assert agents.count("redactor") == 1 and agents.count("beat_planner") == 1
+    assert agents.index("beat_planner") < agents.index("assembler")
+    assert llm_scheduler.stats()["calls"] - calls == 5  # one generator call per beat
+    assert resumed[-1] == expected
+    assert not unfinished(session_snapshot(graph, thread_id))
+
+
+def test_finished_session_is_replayed_without_running_the_graph(offline_models):
+    graph = create_graph(checkpointer=BoundedInMemorySaver())
+    thread_id = new_thread_id()
+    events = _run(graph, thread_id)
+    snapshot = session_snapshot(graph, thread_id)
+    assert not unfinished(snapshot)
+
+    calls = llm_scheduler.stats()["calls"]
+    replayed = list(replay_events(thread_id, snapshot.values))
+    assert llm_scheduler.stats()["calls"] == calls
+    assert replayed[0] == events[0]
+    assert replayed[-1] == events[-1]
+    assert _agents(replayed) == _agents(events)
+    assert session_snapshot(graph, "unknown") is None
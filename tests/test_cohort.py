@@ -0,0 +1,135 @@
+from json import dumps, loads
+
+import pytest
+
+import agents.cohort as cohort
+from agents.cohort import completed_ids, output_path, read_records, record_id, run_cohort
+
+PROFILE = {
+    "scholarship_name": "NSERC CGS-M",
+    "program_type": "Graduate",
+    "goal_one_liner": "I want to research robust representation learning for scientific imaging.",
+    "resume_points": ["Trained contrastive models on click data"],
+}
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """
+    Replaces the graph run: records the ids that ran; "flaky" fails the
+    first time. Validation still goes through the real run_profile.
+    """
+    ran: list[str] = []
+    attempts: dict[str, int] = {}
+    real = cohort.run_profile
+
+    def fake(rid, record, **kwargs):
+        if "_error" in record or "scholarship_name" not in record:
+            return real(rid, record, **kwargs)
+        ran.append(rid)
+        attempts[rid] = attempts.get(rid, 0) + 1
+        if rid == "flaky" and attempts[rid] == 1:
+            return {"id": rid, "status": "error", "error": "RuntimeError: boom", "ms": 1.0}
+        return {"id": rid, "status": "ok", "result": {}, "ms": 1.0}
+
+    monkeypatch.setattr(cohort, "run_profile", fake)
+    return ran
+
+
+def _write_input(path):
+    lines = [
+        dumps({"id": "a", **PROFILE}),
+        dumps({"id": "flaky", **PROFILE}),
+        dumps({"id": "bad", "program_type": "Graduate"}),
+        "not json",
+        "",
+        dumps({"id": "a", **PROFILE}),  # repeated id: run once
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_resume_skips_ok_and_invalid_and_retries_errors(tmp_path, runs):
+    src, out = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    _write_input(src)
+
+    first = run_cohort(src, out, concurrency=2)
+    assert sorted(runs) == ["a", "flaky"]
+    assert (first["ok"], first["error"], first["invalid"], first["skipped"]) == (1, 1, 2, 1)
+    assert completed_ids(out) == {"a", "bad", "line-4"}
+
+    runs.clear()
+    second = run_cohort(src, out, concurrency=2)
+    assert runs == ["flaky"]
+    assert (second["ok"], second["error"], second["invalid"], second["skipped"]) == (1, 0, 0, 4)
+    assert completed_ids(out) == {"a", "flaky", "bad", "line-4"}
+
+
+def test_resume_after_a_cut_last_line(tmp_path, runs):
+    src, out = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    _write_input(src)
+    out.write_text(dumps({"id": "a", "status": "ok"}) + "\n" + '{"id": "flaky", "sta', encoding="utf-8")
+
+    run_cohort(src, out, concurrency=1)
+    assert "a" not in runs and "flaky" in runs
+    lines = out.read_text(encoding="utf-8").splitlines()
+    # The cut line stays unparseable on its own line; every new result parses.
+    assert lines[1] == '{"id": "flaky", "sta'
+    assert all(loads(line)["id"] for line in lines[2:])
+
+
+def test_without_resume_everything_runs_again(tmp_path, runs):
+    src, out = tmp_path / "cohort.jsonl", tmp_path / "results.jsonl"
+    _write_input(src)
+    run_cohort(src, out, concurrency=2)
+    runs.clear()
+    run_cohort(src, out, concurrency=2, resume=False)
+    assert sorted(runs) == ["a", "flaky"]
+
+
+def test_record_ids_and_parsing():
+    assert record_id({"id": 7}) == "7"
+    assert record_id(PROFILE) == record_id(dict(reversed(PROFILE.items())))
+    records = list(read_records(['{"id": 1}', "", "[1]", "{"]))
+    assert records[0] == {"id": 1}
+    assert records[1]["id"] == "line-3" and records[2]["id"] == "line-4"
+    with pytest.raises(ValueError):
+        output_path("../etc")
+
+
+def test_a_running_batch_id_is_not_run_twice(tmp_path, runs, monkeypatch):
+    monkeypatch.setattr(cohort, "COHORT_OUTPUT_DIR", str(tmp_path))
+    lines = [dumps({"id": rid, **PROFILE}) for rid in ("a", "b")]
+
+    first = cohort.batch_events(lines, "b1", concurrency=1)
+    assert next(first)["type"] == "batch"
+    assert cohort.batch_running("b1")
+    assert [e.get("error") for e in cohort.batch_events(lines, "b1")] == ["BATCH_RUNNING"]
+    assert not cohort.batch_running("b2")
+
+    assert [e["type"] for e in first] == ["profile", "profile", "summary"]
+    assert not cohort.batch_running("b1")
+    assert sorted(runs) == ["a", "b"]
+
+    # A stream closed early (client gone) frees its batch_id too.
+    again = cohort.batch_events(lines + [dumps({"id": "c", **PROFILE})], "b1", concurrency=1)
+    assert next(again)["data"]["already_done"] == 2
+    again.close()
+    assert not cohort.batch_running("b1")
+
+
+def test_batch_profiles_run_through_admission(tmp_path, runs, monkeypatch):
+    monkeypatch.setattr(cohort, "COHORT_OUTPUT_DIR", str(tmp_path))
+    lines = [dumps({"id": rid, **PROFILE}) for rid in ("a", "b", "c")]
+    admitted = []
+
+    def admit(run):
+        admitted.append(1)
+        # Refuse the second profile, as a full queue would.
+        return None if len(admitted) == 2 else run()
+
+    events = list(cohort.batch_events(lines, "gated", concurrency=1, admit=admit))
+    statuses = sorted(e["data"]["status"] for e in events if e["type"] == "profile")
+    assert statuses == ["error", "ok", "ok"]
+    assert len(admitted) == 3 and len(runs) == 2
+    # The refused profile is retried when the batch is posted again.
+    assert len(completed_ids(output_path("gated"))) == 2
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from agents.dedupe import embed, hashed_vectors, select_diverse
+
+ORIGIN = "What first drew you to medical imaging?"
+PARAPHRASE = "What first drew you towards medical imaging?"
+CONFLICT = "How did you resolve a conflict within your hackathon team?"
+FAILURE = "Which failed experiment taught you the most?"
+
+
+def _similarity(a, b):
+    x = embed([a, b], "hashed")
+    return (x @ x.T)[0, 1]  # the same product select_diverse takes
+
+
+def test_texts_are_hashed_independently_of_their_neighbours():
+    together = hashed_vectors([ORIGIN, CONFLICT, ""])
+    for row, text in zip(together, [ORIGIN, CONFLICT, ""]):
+        assert np.array_equal(row, hashed_vectors([text])[0])
+
+
+def test_embeddings_are_unit_rows_and_empty_text_is_zero():
+    x = embed([ORIGIN, CONFLICT, ""], "hashed")
+    assert np.allclose(np.linalg.norm(x[:2], axis=1), 1)
+    assert not x[2].any()
+    with pytest.raises(ValueError):
+        embed([ORIGIN], "tfidf")
+
+
+def test_threshold_is_inclusive():
+    sim = _similarity(ORIGIN, PARAPHRASE)
+    assert 0.8 <= sim < 1
+    assert _similarity(ORIGIN, CONFLICT) < 0.5
+    # Blocked at similarity >= threshold, kept just above it.
+    assert select_diverse([], [[ORIGIN, PARAPHRASE]], threshold=sim, embedding="hashed") == [[0]]
+    assert select_diverse([], [[ORIGIN, PARAPHRASE]], threshold=sim + 1e-3, embedding="hashed") == [[0, 1]]
+
+
+def test_exact_duplicates_pass_only_above_a_threshold_of_one():
+    groups = [[ORIGIN, ORIGIN]]
+    assert select_diverse([], groups, threshold=1.0 - 1e-6, embedding="hashed") == [[0]]
+    assert select_diverse([], groups, threshold=1.01, embedding="hashed") == [[0, 1]]
+
+
+def test_kept_texts_and_earlier_groups_block_later_candidates():
+    out = select_diverse(
+        [ORIGIN],
+        [[PARAPHRASE, CONFLICT], [CONFLICT.replace("?", " ?"), FAILURE], []],
+        threshold=0.8, embedding="hashed",
+    )
+    assert out == [[1], [1], []]
+
+
+def test_limit_counts_selected_candidates_only():
+    groups = [[ORIGIN, PARAPHRASE, CONFLICT, FAILURE]]
+    assert select_diverse([], groups, threshold=0.8, limit=2, embedding="hashed") == [[0, 2]]
+    assert select_diverse([], groups, threshold=0.8, limit=0, embedding="hashed") == [[]]
+    assert select_diverse([ORIGIN], [[], []], embedding="hashed") == [[], []]
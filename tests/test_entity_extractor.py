@@ -0,0 +1,117 @@
+from time import sleep
+from types import SimpleNamespace
+
+import pytest
+
+from agents.registry import registry
+from agents.validator_engine import EntityExtractor
+
+
+class _SlowNer:
+    """
+    A spaCy stand-in: every question mentioning "Toronto" has one GPE entity;
+    each pipe() batch takes ms_per_doc per doc before yielding anything.
+    """
+
+    pipe_names = ["tok2vec", "ner", "parser"]
+
+    def __init__(self, ms_per_doc: float) -> None:
+        self.ms_per_doc = ms_per_doc
+        self.batches: list[int] = []
+
+    def pipe(self, texts, batch_size, disable):
+        texts = list(texts)
+        self.batches.append(len(texts))
+        sleep(self.ms_per_doc * len(texts) / 1000)
+        for t in texts:
+            ents = [SimpleNamespace(text="Toronto", label_="GPE")] if "Toronto" in t else []
+            yield SimpleNamespace(ents=ents)
+
+
+@pytest.fixture
+def ner():
+    factory = registry._factories.get("ner_model")
+    model = _SlowNer(ms_per_doc=5)
+    registry.register("ner_model", lambda: model)
+    yield model
+    if factory is not None:
+        registry.register("ner_model", factory)
+
+
+QUESTIONS = [f"Why did question {i} in Toronto matter?" for i in range(10)]
+
+
+def test_budget_stops_between_sub_batches_and_keeps_computed_docs(ner):
+    extractor = EntityExtractor(budget_ms=1, batch_size=4, max_entries=100)
+    out = extractor.extract(QUESTIONS)
+
+    # The first sub-batch (20 ms) exceeds the 1 ms budget, so no other starts.
+    assert ner.batches == [4]
+    assert all(out[q] == ("Toronto",) for q in QUESTIONS[:4])
+    stats = extractor.stats()
+    assert stats["ner"] == 4 and stats["skipped"] == 6
+    # The rest are not checked rather than guessed at.
+    assert set(out) == set(QUESTIONS[:4])
+
+
+def test_no_budget_runs_every_sub_batch(ner):
+    extractor = EntityExtractor(budget_ms=None, batch_size=4, max_entries=100)
+    out = extractor.extract(QUESTIONS)
+    assert ner.batches == [4, 4, 2]
+    assert all(out[q] == ("Toronto",) for q in QUESTIONS)
+
+
+def test_computed_docs_are_cached(ner):
+    extractor = EntityExtractor(budget_ms=1, batch_size=4, max_entries=100)
+    extractor.extract(QUESTIONS)
+    extractor.extract(QUESTIONS)
+    # The second call reuses the 4 cached docs and starts with the next ones.
+    assert ner.batches == [4, 4]
+    assert extractor.stats()["cache_hits"] == 4
+
+
+def _validate(questions):
+    from agents.config import ALL_BEATS
+    from agents.models import BeatPlanItem, QuestionObject, UserInput
+    from agents.workflow import validator_node
+
+    user_input = UserInput(scholarship_name="Award", program_type="Undergrad",
+                           goal_one_liner="Study vision in Toronto.",
+                           resume_points=["Led a team of 12", "Built a detector", "Tutored calculus"])
+    state = {
+        "redacted_input": "<PERSON> led a team of 12 in Toronto and studies vision.",
+        "final_questions_by_beat": {
+            b: [QuestionObject(beat=b, question=q, intent="reflection")] for b, q in zip(ALL_BEATS, questions)
+        },
+        "beat_plan": [BeatPlanItem(beat=b, missing=[], guidance="") for b in ALL_BEATS],
+        "user_input": user_input,
+        "generation_mode": "fanout",
+    }
+    report = validator_node(state).update["validation_report"]
+    return report.errors
+
+
+@pytest.mark.parametrize("budget_ms, ner_model", [(None, True), (0, True), (None, False)],
+                         ids=["under-budget", "over-budget", "no-model"])
+def test_validator_verdict_does_not_depend_on_the_budget(ner, monkeypatch, budget_ms, ner_model):
+    from collections import OrderedDict
+
+    from agents.validator_engine import entity_extractor
+
+    questions = [
+        # Capitalized, but NER finds nothing ungrounded in them.
+        "How did Toronto shape your Vision?",
+        "Which Monday meeting changed your Team?",
+        "Why did the Robotics Club matter to you?",
+        "What did 37 people learn from you?",  # ungrounded number
+        "Where did your Python Work lead?",
+    ]
+    monkeypatch.setattr(entity_extractor, "budget_ms", budget_ms)
+    monkeypatch.setattr(entity_extractor, "batch_size", 1)
+    monkeypatch.setattr(entity_extractor, "_cache", OrderedDict())
+    if not ner_model:
+        registry.register("ner_model", lambda: None)
+    errors = _validate(questions)
+    assert [e.split(":")[0] for e in errors] == ["D"]
+    if budget_ms == 0:
+        assert ner.batches == [1]
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+
+from agents.llm_scheduler import LLMScheduler, Slots
+
+
+async def _cancel_soon(coro):
+    task = asyncio.create_task(coro)
+    await asyncio.sleep(0.01)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_cancel_while_waiting_for_global_slot_releases_session_slot():
+    async def run():
+        s = LLMScheduler(rpm=None, max_concurrency=1, max_per_session=1)
+        held = await s._aadmit("other", 10)
+        await _cancel_soon(s._aadmit("sess", 10))
+        assert "sess" not in s._sessions
+
+        s._release("other", held)
+        await asyncio.sleep(0)  # let the cancelled waiter hand its slot back
+        assert s.slots.used == 0
+        assert s._sessions == {}
+        assert s.stats()["in_flight"] == 0
+        assert s.stats()["queue_depth"] == 0
+
+    asyncio.run(run())
+
+
+def test_cancel_during_rate_limit_sleep_releases_global_slot():
+    async def run():
+        s = LLMScheduler(rpm=1, max_concurrency=1, max_per_session=1)
+        s._release(None, await s._aadmit(None, 1))  # spend the one request this minute
+        await _cancel_soon(s._aadmit("sess", 1))
+        assert s.slots.used == 0
+        assert s._sessions == {}
+        assert s.stats()["in_flight"] == 0
+
+    asyncio.run(run())
+
+
+def test_sync_admit_interrupted_during_sleep_releases_slots(monkeypatch):
+    import agents.llm_scheduler as mod
+
+    def interrupted(_):
+        raise KeyboardInterrupt
+
+    s = LLMScheduler(rpm=1, max_concurrency=1, max_per_session=1)
+    s._release(None, s._admit(None, 1))
+    monkeypatch.setattr(mod, "sleep", interrupted)
+    try:
+        s._admit("sess", 1)
+    except KeyboardInterrupt:
+        pass
+    assert s.slots.used == 0
+    assert s._sessions == {}
+
+
+def test_slot_handed_to_cancelled_task_is_returned():
+    async def run():
+        slots = Slots(1)
+        await slots.aacquire()
+        task = asyncio.create_task(slots.aacquire())
+        await asyncio.sleep(0)
+        slots.release()  # hands the slot to the waiting task...
+        task.cancel()  # ...which is cancelled before it resumes
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0)
+        assert slots.used == 0 and slots.idle
+
+    asyncio.run(run())
+
+
+def test_slot_granted_before_cancellation_is_returned():
+    async def run():
+        slots = Slots(1)
+        await slots.aacquire()
+        task = asyncio.create_task(slots.aacquire())
+        await asyncio.sleep(0)
+        slots.release()
+        await asyncio.sleep(0)  # the hand-over sets the future's result...
+        task.cancel()  # ...but the task is cancelled before it resumes
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert slots.used == 0 and slots.idle
+
+    asyncio.run(run())
+
+
+def test_slots_are_fifo_across_threads():
+    slots = Slots(1)
+    slots.acquire()
+    order = []
+
+    def worker(i):
+        slots.acquire()
+        order.append(i)
+        slots.release()
+
+    threads = []
+    for i in range(3):
+        t = threading.Thread(target=worker, args=(i,))
+        t.start()
+        threads.append(t)
+        time.sleep(0.02)
+    slots.release()
+    for t in threads:
+        t.join()
+    assert order == [0, 1, 2]
+    assert slots.idle
+
+
+def test_hedged_primary_keeps_its_slot_until_its_thread_returns():
+    s = LLMScheduler(rpm=None, max_concurrency=2, hedge=True, hedge_after_s=0.02)
+    gate, calls = threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            gate.wait(5)
+            return "primary"
+        return "backup"
+
+    def settle(used):
+        for _ in range(100):
+            if s.slots.used <= used:
+                break
+            time.sleep(0.01)
+        time.sleep(0.02)
+
+    assert s.call(fn, hedge=True) == "backup"
+    settle(1)  # the backup's own done-callback may still be running
+    assert s.slots.used == 1
+    assert s.stats()["in_flight"] == 1
+    gate.set()
+    settle(0)
+    assert s.slots.used == 0
+    assert s.stats()["in_flight"] == 0
@@ -0,0 +1,52 @@
+import pytest
+
+from agents.pii_prescreen import PATTERN_ENTITIES, plan
+from agents.prompts import _build_canonical_input
+from agents.redaction import DEFAULT_PII_ENTITIES, analyze_text
+from benchmarks.corpus import make_profiles
+from benchmarks.redaction_prescreen import EXTRA_TEXTS
+
+PATTERNS = sorted(PATTERN_ENTITIES)
+
+
+def _corpus():
+    texts = [_build_canonical_input(p) for p in make_profiles(20)]
+    texts += [point for p in make_profiles(10, seed=1) for point in p.resume_points]
+    return texts + EXTRA_TEXTS + ["John Smith moved to Toronto; write to john@smith.dev"]
+
+
+def _spans(results):
+    return sorted((r.start, r.end, r.entity_type, round(float(r.score), 6)) for r in results)
+
+
+@pytest.mark.parametrize("text, tier, wanted", [
+    ("built a detector and evaluated it", "skip", []),
+    ("reach me at jane@example.com", "patterns", ["EMAIL_ADDRESS", "URL"]),
+    ("see janedoe.dev", "patterns", ["URL"]),
+    ("call 416-555-0199", "patterns", ["CREDIT_CARD", "PHONE_NUMBER"]),
+    ("Ticket 1234 for row 5", "skip", []),
+])
+def test_pattern_entities_are_kept_only_when_triggered(text, tier, wanted):
+    assert plan(text, PATTERNS) == (tier, wanted)
+
+
+def test_ner_entities_are_never_screened_out():
+    assert plan("worked on imaging", ["PERSON", "EMAIL_ADDRESS"]) == ("full", ["PERSON"])
+    assert plan("", ["LOCATION"]) == ("full", ["LOCATION"])
+
+
+@pytest.mark.parametrize("entities", [DEFAULT_PII_ENTITIES, PATTERNS], ids=["default", "patterns"])
+def test_tiered_analysis_matches_full_analysis(offline_models, monkeypatch, entities):
+    import agents.redaction as redaction
+
+    monkeypatch.setattr(redaction, "PII_PRESCREEN", True)
+    analyzer = offline_models.get("analyzer")
+    tiers, found = set(), 0
+    for text in _corpus():
+        tiered, tier = analyze_text(text, entities=entities, batch=False)
+        full = analyzer.analyze(text=text, language="en", entities=entities)
+        assert _spans(tiered) == _spans(full), text
+        tiers.add(tier)
+        found += len(full)
+    assert found
+    assert tiers == ({"full"} if entities is DEFAULT_PII_ENTITIES else {"skip", "patterns"})
@@ -0,0 +1,56 @@
+from langgraph.types import Command
+
+from agents.config import ALL_BEATS
+from agents.models import BeatPlanItem, QuestionObject, UserInput
+from agents.workflow import assembler_node, regen_router_node, route_start
+
+TOPICS = {"A": "origin story", "B": "research method", "C": "team conflict",
+          "D": "long-term goal", "E": "community impact"}
+
+
+def _questions(beat, topic):
+    return [QuestionObject(beat=beat, question=f"What shaped your {topic}?", intent="motivation"),
+            QuestionObject(beat=beat, question=f"Which moment defined your {topic}?", intent="turning point")]
+
+
+def _user_input():
+    return UserInput(scholarship_name="Award", program_type="Undergrad",
+                     goal_one_liner="I want to study computer vision for medical imaging.",
+                     resume_points=["Built an object detector", "Led a hackathon team",
+                                    "Tutored calculus students"])
+
+
+def test_unchanged_beats_keep_their_assembled_questions():
+    raw = {b: _questions(b, topic) for b, topic in TOPICS.items()}
+    first = assembler_node({"questions_by_beat": raw})
+    assert first["audit_log"][0].data["reassembled_beats"] == ALL_BEATS
+
+    raw = {**raw, "C": _questions("C", "thesis question")}
+    second = assembler_node({"questions_by_beat": raw, **first})
+    assert second["audit_log"][0].data["reassembled_beats"] == ["C"]
+    for beat in "ABDE":
+        assert second["final_questions_by_beat"][beat] == first["final_questions_by_beat"][beat]
+        assert second["assembled_fingerprints"][beat] == first["assembled_fingerprints"][beat]
+    assert second["final_questions_by_beat"]["C"] == raw["C"]
+    assert second["assembled_fingerprints"]["C"] != first["assembled_fingerprints"]["C"]
+
+
+def test_regen_request_regenerates_only_the_named_beats():
+    state = {
+        "regen_request": ["D", "A"],
+        "redacted_input": "<PERSON> studies vision.",
+        "beat_plan": [BeatPlanItem(beat=b, missing=[], guidance=f"guide {b}") for b in ALL_BEATS],
+        "user_input": _user_input(),
+        "attempt_count": 2,
+        "generation_mode": "fanout",
+    }
+    assert route_start(state) == "regen_router"
+    assert route_start({**state, "beat_plan": []}) == "redactor"
+
+    cmd = regen_router_node(state)
+    assert isinstance(cmd, Command)
+    assert [s.arg["beat_task"]["beat"] for s in cmd.goto] == ["A", "D"]
+    assert [s.arg["beat_task"]["guidance"] for s in cmd.goto] == ["guide A", "guide D"]
+    assert all(s.arg["skip_cache"] for s in cmd.goto)
+    assert cmd.update["questions_by_beat"] == {"A": [], "D": []}
+    assert (cmd.update["regen_request"], cmd.update["attempt_count"]) == ([], 0)
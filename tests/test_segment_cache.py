@@ -0,0 +1,104 @@
+import pytest
+from presidio_analyzer import Pattern, PatternRecognizer
+
+from agents.prompts import _build_canonical_input
+from agents.redaction import DEFAULT_PII_ENTITIES, SegmentCache, analyze_segments
+from benchmarks.corpus import make_profiles
+
+
+def _spans(text, results):
+    return sorted((r.start, r.end, r.entity_type, round(float(r.score), 6), text[r.start:r.end])
+                  for r in results)
+
+
+def _whole(analyzer, text, entities=DEFAULT_PII_ENTITIES):
+    return analyzer.analyze(text=text, language="en", entities=entities)
+
+
+def _lines(text):
+    return [line for line in text.split("\n") if line.strip()]
+
+
+@pytest.fixture
+def analyzer(offline_models, monkeypatch):
+    import agents.redaction as redaction
+
+    monkeypatch.setattr(redaction, "PII_PRESCREEN", True)
+    return offline_models.get("analyzer")
+
+
+def _profile_text(seed=0):
+    profile = make_profiles(1, seed=seed)[0]
+    profile.resume_points = [
+        "Mentored John Smith on 3 projects",
+        *profile.resume_points,
+        "Contact: john@smith.dev or 416-555-0199 in Toronto",
+    ]
+    return _build_canonical_input(profile), profile
+
+
+def test_first_seen_input_is_analyzed_whole_and_fills_the_cache(analyzer):
+    cache = SegmentCache()
+    text, _ = _profile_text()
+    results, tier, cached = analyze_segments(text, batch=False, cache=cache)
+    assert _spans(text, results) == _spans(text, _whole(analyzer, text))
+    assert (tier, cached) == ("full", 0)
+    assert cache.stats()["entries"] == len(set(_lines(text)))
+
+
+def test_resubmit_reuses_lines_and_remaps_their_offsets(analyzer):
+    cache = SegmentCache()
+    text, profile = _profile_text()
+    analyze_segments(text, batch=False, cache=cache)
+
+    # A longer first bullet shifts every line after it.
+    profile.resume_points[0] = "Mentored John Smith and Jane Roe on 3 projects in Toronto"
+    edited = _build_canonical_input(profile)
+    results, tier, cached = analyze_segments(edited, batch=False, cache=cache)
+    assert cached == len(_lines(edited)) - 1
+    assert tier == "full"
+    spans = _spans(edited, results)
+    assert spans == _spans(edited, _whole(analyzer, edited))
+    assert {s[-1] for s in spans} >= {"John Smith", "Toronto", "john@smith.dev", "416-555-0199"}
+
+
+def test_cached_lines_do_not_reach_the_analyzer(analyzer, monkeypatch):
+    import agents.redaction as redaction
+
+    cache = SegmentCache()
+    texts = [_build_canonical_input(p) for p in make_profiles(5)]
+    first = [analyze_segments(text, batch=False, cache=cache)[0] for text in texts]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("analyzer called for a cached line")
+
+    monkeypatch.setattr(redaction, "analyze_batch", fail)
+    monkeypatch.setattr(redaction, "analyze_text", fail)
+    monkeypatch.setattr(redaction, "analyze_patterns_only", fail)
+    for text, results in zip(texts, first):
+        again, _, cached = analyze_segments(text, batch=False, cache=cache)
+        assert cached == len(_lines(text))
+        assert _spans(text, again) == _spans(text, results)
+    assert cache.stats()["hits"] >= sum(len(_lines(text)) for text in texts)
+
+
+def test_result_crossing_a_line_break_is_found_again_on_resubmit(analyzer):
+    entities = [*DEFAULT_PII_ENTITIES, "TEST_ADDRESS"]
+    address = PatternRecognizer(supported_entity="TEST_ADDRESS", patterns=[
+        Pattern("address", r"\d+ Main St\n[A-Z][a-z]+", 0.9)])
+    analyzer.registry.add_recognizer(address)
+    try:
+        cache = SegmentCache()
+        text = "Applicant John Smith\nLives at 12 Main St\nToronto\nEmail john@smith.dev"
+        analyze_segments(text, entities=entities, batch=False, cache=cache)
+        # The two lines under the address are left out of the cache.
+        assert cache.stats()["entries"] == 2
+
+        edited = text.replace("Applicant", "Applicant (edited)")
+        results, _, cached = analyze_segments(edited, entities=entities, batch=False, cache=cache)
+        assert cached == 1
+        spans = _spans(edited, results)
+        assert spans == _spans(edited, _whole(analyzer, edited, entities))
+        assert "12 Main St\nToronto" in {s[-1] for s in spans}
+    finally:
+        analyzer.registry.remove_recognizer(address.name)
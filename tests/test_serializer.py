@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from agents.models import BeatPlanItem, PiiSpan, QuestionObject, ValidationReport
+from agents.serializer import COMPACT_FIELDS, RESULT_FIELDS, ndjson, parse_result_fields, result_payload
+from agents.validation_utils import format_response
+
+STATE = {
+    "final_questions_by_beat": {
+        "A": [QuestionObject(beat="A", question="Why this program, in Zürich?", intent="fit")],
+    },
+    "questions_by_beat": {"A": []},
+    "pii_spans": [PiiSpan(start=0, end=4, pii_type="PERSON", confidence=0.85)],
+    "redacted_input": "<PERSON> studies vision.",
+    "canonical_input": "Jane studies vision.",
+    "beat_plan": [BeatPlanItem(beat="A", missing=["fit"])],
+    "validation_report": ValidationReport(ok=True, warnings=["best effort"]),
+    "audit_log": ["not part of the result"],
+}
+
+
+@pytest.mark.parametrize("data, fields", [
+    ({}, RESULT_FIELDS),
+    ({"compact": True}, COMPACT_FIELDS),
+    ({"compact": "1"}, COMPACT_FIELDS),
+    ({"compact": "TRUE"}, COMPACT_FIELDS),
+    ({"compact": False}, RESULT_FIELDS),
+    ({"compact": "0"}, RESULT_FIELDS),
+    ({"fields": ["pii_spans", "beat_plan", "pii_spans"]}, ("pii_spans", "beat_plan")),
+    ({"fields": "validation_report,,fallback_used"}, ("validation_report", "fallback_used")),
+    # An explicit list wins over compact.
+    ({"fields": ["beat_plan"], "compact": True}, ("beat_plan",)),
+])
+def test_accepted_result_fields(data, fields):
+    assert parse_result_fields(data) == fields
+
+
+@pytest.mark.parametrize("data", [
+    {"compact": "yes"},
+    {"compact": 1},
+    {"fields": []},
+    {"fields": ""},
+    {"fields": ["final_questions_by_beat", "audit_log"]},
+    {"fields": {"pii_spans": True}},
+    {"fields": "pii_spans", "compact": "maybe"},
+])
+def test_rejected_result_fields(data):
+    with pytest.raises(ValueError):
+        parse_result_fields(data)
+
+
+def test_payload_encodes_like_format_response():
+    legacy = format_response(STATE)
+    assert json.loads(ndjson(result_payload(STATE))) == legacy
+    assert json.loads(ndjson(result_payload({}))) == format_response({})
+
+
+def test_compact_payload_has_only_what_the_results_page_renders():
+    line = ndjson({"type": "result", "data": result_payload(STATE, COMPACT_FIELDS)})
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    data = json.loads(line)["data"]
+    assert list(data) == list(COMPACT_FIELDS)
+    assert data == {f: format_response(STATE)[f] for f in COMPACT_FIELDS}
+    # Non-ASCII text is written as UTF-8, not escaped.
+    assert "Zürich".encode() in line
+    assert len(line) < len(ndjson(result_payload(STATE)))
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from agents.singleflight import SingleFlight, flight_key
+
+
+def _events(gate=None, fail=False, calls=None):
+    def make_events():
+        if calls is not None:
+            calls.append(1)
+        yield {"type": "session", "data": {"n": 1}}
+        if gate is not None:
+            gate.wait(5)
+        if fail:
+            raise ValueError("boom")
+        yield {"type": "result", "data": {"ok": True}}
+    return make_events
+
+
+def _types(lines):
+    return [json.loads(line)["type"] for line in lines]
+
+
+def test_joiner_shares_the_leaders_run():
+    flights = SingleFlight()
+    gate, calls = threading.Event(), []
+    lead, outcome = flights.run("k", "fp", _events(gate, calls=calls))
+    assert outcome == "leader"
+    join, outcome = flights.run("k", "fp", _events(calls=calls))
+    assert outcome == "joined"
+    gate.set()
+    assert list(lead) == list(join)
+    assert calls == [1]
+
+
+def test_late_joiner_gets_the_events_it_missed():
+    flights = SingleFlight()
+    gate = threading.Event()
+    lead, _ = flights.run("k", "fp", _events(gate))
+    assert _types([next(lead)]) == ["session"]
+    join, outcome = flights.run("k", "fp", _events())
+    assert outcome == "joined"
+    gate.set()
+    assert _types(join) == ["session", "result"]
+    assert _types(lead) == ["result"]
+
+
+def test_finished_run_is_replayed_within_the_window():
+    flights = SingleFlight(window_s=60)
+    calls = []
+    first = list(flights.run("k", "fp", _events(calls=calls))[0])
+    lines, outcome = flights.run("k", "fp", _events(calls=calls))
+    assert outcome == "replayed"
+    assert list(lines) == first
+    assert calls == [1]
+
+
+def test_key_reused_for_another_request_is_a_conflict():
+    flights = SingleFlight(window_s=60)
+    list(flights.run("k", "fp", _events())[0])
+    assert flights.run("k", "other", _events()) == (None, "conflict")
+    assert flights.stats()["conflict"] == 1
+
+
+def test_failed_run_reaches_followers_and_is_not_kept():
+    flights = SingleFlight(window_s=60)
+    lines, _ = flights.run("k", "fp", _events(fail=True))
+    with pytest.raises(ValueError):
+        list(lines)
+    assert flights.run("k", "fp", _events())[1] == "leader"
+
+
+def test_running_session_is_attached_by_thread_id():
+    flights = SingleFlight()
+    gate = threading.Event()
+    lead, _ = flights.run("k", "fp", _events(gate), thread_id="t1")
+    next(lead)
+    assert flights.running("t1")
+    assert not flights.running("t2")
+    assert flights.attach("t2") is None
+
+    attached = flights.attach("t1")
+    gate.set()
+    assert _types(attached) == ["session", "result"]
+    list(lead)
+    assert not flights.running("t1")
+    assert flights.attach("t1") is None
+
+
+def test_cancelled_async_run_ends_followers_and_frees_its_key():
+    async def make_events():
+        yield {"type": "session", "data": {}}
+        await asyncio.sleep(10)
+        yield {"type": "result", "data": {}}
+
+    async def run():
+        flights = SingleFlight(window_s=60)
+        lines, _ = flights.arun("k", "fp", make_events, thread_id="t1")
+        follower = flights.aattach("t1")
+        assert json.loads(await follower.__anext__())["type"] == "session"
+
+        flight = flights._running["k"]
+        flight.task.cancel()
+        with pytest.raises(RuntimeError):
+            async for _ in follower:
+                pass
+        with pytest.raises(RuntimeError):
+            async for _ in lines:
+                pass
+        assert flight.task.cancelled()
+        assert flights.stats()["running"] == 0
+        assert not flights.running("t1")
+        assert flights.arun("k", "fp", make_events)[1] == "leader"
+        flights._running["k"].task.cancel()
+
+    asyncio.run(run())
+
+
+def test_same_input_from_different_clients_is_not_shared():
+    flights = SingleFlight(window_s=60)
+    gate = threading.Event()
+    lead, outcome = flights.run(flight_key(None, "fp", "10.0.0.1"), "fp", _events(gate), thread_id="t1")
+    assert outcome == "leader"
+    other, outcome = flights.run(flight_key(None, "fp", "10.0.0.2"), "fp", _events(), thread_id="t2")
+    assert outcome == "leader"
+    assert _types(other) == ["session", "result"]
+    retry, outcome = flights.run(flight_key(None, "fp", "10.0.0.1"), "fp", _events(), thread_id="t3")
+    assert outcome == "joined"
+    gate.set()
+    assert list(retry) == list(lead)
+
+    # An Idempotency-Key names one request, whoever sends it.
+    assert flight_key("k1", "fp", "10.0.0.1") == flight_key("k1", "fp", "10.0.0.2")
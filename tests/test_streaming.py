@@ -0,0 +1,62 @@
+import pytest
+
+from agents.models import UserInput
+from agents.serializer import COMPACT_FIELDS, RESULT_FIELDS, result_payload
+from agents.streaming import _EventTracker, initial_state, stream_events
+from agents.workflow import create_graph
+
+PROFILE = UserInput(
+    scholarship_name="Summer Research Award",
+    program_type="Undergrad",
+    goal_one_liner="I want to explore computer vision for medical imaging with John Smith in Toronto.",
+    resume_points=["Built a PyTorch object detector and evaluated it on a custom dataset",
+                   "Led a 4-person hackathon team and shipped a web app in 36 hours",
+                   "Tutored calculus for 30 students, call 416-555-1234"],
+)
+
+
+@pytest.fixture
+def fast_llm(offline_models):
+    from agents.fake_llm import FakeChatModel
+    from agents.registry import registry
+    from agents.workflow import set_llm_backend
+
+    saved = registry._factories["llm"]
+    set_llm_backend(lambda: FakeChatModel(latency_s=0.0))
+    yield
+    registry.register("llm", saved)
+
+
+def _final_values(graph, init):
+    # The pre-tracker path: a full-state snapshot after every step.
+    *_, last = graph.stream(init, {"configurable": {}}, stream_mode="values")
+    return last
+
+
+@pytest.mark.parametrize("mode", ["fanout", "batched"])
+@pytest.mark.parametrize("repairs", [False, True], ids=["valid", "repairs"])
+def test_folded_patches_equal_the_values_stream(fast_llm, monkeypatch, mode, repairs):
+    import agents.fake_llm as fake_llm
+
+    if repairs:
+        # An ungrounded number fails beat C on every attempt, up to MAX_ATTEMPT.
+        monkeypatch.setitem(fake_llm._QUESTIONS, "C", (
+            "Who benefited from the 99 hours you put in?",
+            "How would you show that change to someone who was not there?",
+        ))
+    graph = create_graph()
+    values = _final_values(graph, initial_state(PROFILE, mode))
+    assert (values["attempt_count"] > 0) == repairs
+
+    tracker = _EventTracker()
+    init = initial_state(PROFILE, mode)
+    tracker.apply(init)
+    for chunk in graph.stream(init, {"configurable": {}}, stream_mode="updates"):
+        tracker.updates(chunk)
+    # Everything but the audit log, which the tracker forwards without keeping.
+    assert tracker.state == {k: v for k, v in values.items() if k != "audit_log"}
+
+    for fields in (RESULT_FIELDS, COMPACT_FIELDS):
+        events = list(stream_events(graph, initial_state(PROFILE, mode), fields=fields))
+        folded = [e for e in events if e["type"] == "result"][0]["data"]
+        assert folded == result_payload(values, fields)
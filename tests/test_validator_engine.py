@@ -0,0 +1,56 @@
+from random import Random
+
+import pytest
+
+from agents.config import ALL_BEATS
+from agents.models import QuestionObject
+from agents.prompts import _build_canonical_input
+from agents.validation_utils import _norm, _validate_beat
+from agents.validator_engine import Reason, check_beats, messages
+from benchmarks.corpus import make_profiles
+from benchmarks.validator_engine import _beats
+
+SOURCE = _norm("[Resume Point #1] Tutored 30+ students over 2.5 terms; raised scores by 15%")
+
+
+def _q(question: str, intent: str = "tests evidence") -> QuestionObject:
+    return QuestionObject(beat="A", question=question, intent=intent)
+
+
+@pytest.mark.parametrize("question, intent, codes", [
+    ("How did tutoring 30 students change you?", "x", []),
+    ("What did the 15% gain teach you?", "x", []),
+    ("Why 2.5 terms?", "x", []),
+    ("", "x", ["EMPTY_QUESTION"]),
+    ("Why?\nAnd then?", "x", ["MULTILINE"]),
+    ("Describe your tutoring", "x", ["NO_QUESTION_MARK"]),
+    ("- What did you learn?", "x", ["LIST_ITEM"]),
+    ("1) What did you learn?", "x", ["LIST_ITEM"]),
+    ("Did <NAME> help you?", "x", ["PLACEHOLDER"]),
+    ("What did you learn?", "", ["MISSING_INTENT"]),
+    ("Why 45 students?", "x", ["UNGROUNDED_NUMBERS"]),
+    ("Who at a@b.com helped?", "x", ["EMAIL_LIKE"]),
+    ("Would 416-555-0199 answer?", "x", ["PHONE_LIKE", "UNGROUNDED_NUMBERS"]),
+])
+def test_reason_codes_and_reference_parity(question, intent, codes):
+    reasons = check_beats({"A": [_q(question, intent)]}, SOURCE, entities=False)["A"]
+    assert sorted(r.code for r in reasons) == sorted(codes)
+    assert messages(reasons) == _validate_beat([_q(question, intent)], SOURCE)
+
+
+def test_reasons_carry_question_index_and_detail():
+    reasons = check_beats({"A": [_q("Fine?"), _q("Why 45 and 46?")]}, SOURCE, entities=False)["A"]
+    assert reasons == [Reason("UNGROUNDED_NUMBERS", 1, ("45", "46"))]
+    assert check_beats({"B": []}, SOURCE, entities=False)["B"] == [Reason("MISSING_QUESTIONS")]
+
+
+def test_engine_matches_reference_on_generated_failures():
+    rng = Random(0)
+    for profile in make_profiles(40, seed=0):
+        source_norm = _norm(_build_canonical_input(profile))
+        numbers = [t for t in source_norm.split() if t.isdigit()]
+        beats = _beats(rng, numbers)
+        engine = {b: messages(r) for b, r in check_beats(beats, source_norm, entities=False).items()}
+        assert engine == {b: _validate_beat(qs, source_norm) for b, qs in beats.items()}
+        assert set(engine) <= set(ALL_BEATS)
+